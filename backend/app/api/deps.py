@@ -1,16 +1,33 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.utils.security import decode_access_token
+from app.utils.ttl_cache import TTLCache
 from app.services.auth_service import get_user_by_username
+from app.services.access_service import verify_workspace_access
 from app.models.user import User
+from app.utils.metrics import register_cache
+from app.utils.stage_timer import stage
 
 security = HTTPBearer()
 
+# token -> User, skips JWT decoding and the users lookup on repeat requests
+# (a token can outlive its expiry by at most the TTL)
+user_cache = TTLCache(maxsize=4096, ttl=60.0)
+register_cache("users", user_cache)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> User:
-    token = credentials.credentials
+    with stage("auth"):
+        return await _get_user_for_token(credentials.credentials)
+
+
+async def _get_user_for_token(token: str) -> User:
+    user = user_cache.get(token)
+    if user is not None:
+        return user
+
     username = decode_access_token(token)
 
     if username is None:
@@ -24,4 +41,15 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
         )
 
+    user_cache.set(token, user)
     return user
+
+
+async def get_workspace_user(
+    workspace_id: str,
+    current_user: User = Depends(get_current_user),
+) -> User:
+    """Current user, verified as owner of the `workspace_id` path parameter."""
+    with stage("auth"):
+        await verify_workspace_access(workspace_id, str(current_user.id))
+    return current_user
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Query
+
+from app.utils.loop_monitor import loop_monitor
+
+router = APIRouter()
+
+
+@router.get("/loop-stalls")
+async def get_loop_stalls(top: int = Query(20, ge=1, le=200)):
+    """Event-loop stalls per endpoint and the most sampled blocking stacks."""
+    return loop_monitor.report(top)
+
+
+@router.delete("/loop-stalls")
+async def reset_loop_stalls():
+    loop_monitor.reset()
+    return {"detail": "Loop stall report cleared."}
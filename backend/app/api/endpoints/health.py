@@ -0,0 +1,25 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app.services.readiness import get_readiness
+from app.utils.startup_profile import startup_profile
+
+router = APIRouter()
+
+
+@router.get("/ready")
+async def readiness():
+    """200 once the database is connected and preloaded models are in memory."""
+    ready, details = get_readiness()
+    return JSONResponse(
+        details,
+        status_code=(
+            status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
+
+
+@router.get("/startup")
+async def startup_report():
+    """Seconds spent on imports, connections and model loads since boot."""
+    return startup_profile.report()
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 
-from app.schemas.qa import QuestionRequest, AnswerResponse, QAResponse
+from app.schemas.qa import (
+    QuestionRequest,
+    BatchQuestionRequest,
+    BatchAnswerItem,
+    AnswerResponse,
+    QAResponse,
+    ResponseTiming,
+)
 from app.schemas.context_unit import ContextUnitResponse
 from app.models.user import User
-from app.api.deps import get_current_user
+from app.api.deps import get_workspace_user
+from app.services.admission_controller import ask_admission
 from app.services.qa_service import (
     ask_question,
+    ask_questions_batch,
     get_qa_history,
     delete_all_qa_records,
     delete_qa_record,
@@ -19,47 +29,97 @@ router = APIRouter()
 async def ask_question_endpoint(
     workspace_id: str,
     question_data: QuestionRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_workspace_user),
 ):
-    question, answer, context_units, response_time = await ask_question(
-        workspace_id,
-        str(current_user.id),
-        question_data.question,
-        question_data.video_ids,
-        question_data.retriever_type,
-        question_data.generator_type,
-        question_data.embedding_model,
-        question_data.use_reranker,
-        question_data.use_history,
-        question_data.history_count,
+    async with ask_admission.admit(str(current_user.id)):
+        question, answer, sources, response_time, timing = await ask_question(
+            workspace_id,
+            str(current_user.id),
+            question_data.question,
+            question_data.video_ids,
+            question_data.retriever_type,
+            question_data.generator_type,
+            question_data.embedding_model,
+            question_data.use_reranker,
+            question_data.use_history,
+            question_data.history_count,
+            question_data.fusion_method,
+            question_data.fusion_weights,
+            question_data.neighbor_window,
+            question_data.context_token_budget,
+        )
+
+    return _build_answer_response(question, answer, sources, response_time, timing)
+
+
+def _context_unit_response(cu) -> ContextUnitResponse:
+    return ContextUnitResponse(
+        id=cu.id,
+        video_id=cu.video_id,
+        video_path=cu.video_path,
+        text=cu.text,
+        start_time=cu.start_time,
+        end_time=cu.end_time,
     )
 
-    source_contexts = [
-        ContextUnitResponse(
-            id=cu.id,
-            video_id=cu.video_id,
-            video_path=cu.video_path,
-            text=cu.text,
-            start_time=cu.start_time,
-            end_time=cu.end_time,
-        )
-        for cu in context_units
-    ]
 
+def _build_answer_response(question, answer, sources, response_time, timing):
     return AnswerResponse(
         question=question,
         answer=answer,
-        source_contexts=source_contexts,
+        source_contexts=[ContextUnitResponse(**unit) for unit in sources],
         response_time=response_time,
+        timing=ResponseTiming(**timing),
     )
 
 
+@router.post("/{workspace_id}/ask/batch")
+async def ask_batch_endpoint(
+    workspace_id: str,
+    batch_data: BatchQuestionRequest,
+    current_user: User = Depends(get_workspace_user),
+):
+    """Answer many questions, streaming one BatchAnswerItem per NDJSON line."""
+    user_id = str(current_user.id)
+
+    # Admitted for the checks, so overload is still a plain 429 before the
+    # response starts. The slot is released when streaming begins: each
+    # refinement and generation then takes its own slot, like separate
+    # requests from this user would.
+    async with ask_admission.admit(user_id, track_service_time=False):
+        results = await ask_questions_batch(
+            workspace_id,
+            user_id,
+            batch_data.questions,
+            batch_data.max_concurrency,
+        )
+
+    async def stream():
+        async for index, result in results:
+            if isinstance(result, Exception):
+                detail = (
+                    result.detail if isinstance(result, HTTPException) else str(result)
+                )
+                item = BatchAnswerItem(index=index, error=detail)
+            else:
+                item = BatchAnswerItem(
+                    index=index, result=_build_answer_response(*result)
+                )
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get("/{workspace_id}/history", response_model=List[QAResponse])
 async def get_qa_history_endpoint(
     workspace_id: str,
-    current_user: User = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    before: Optional[str] = None,
+    current_user: User = Depends(get_workspace_user),
 ):
-    qas_with_contexts = await get_qa_history(workspace_id, str(current_user.id))
+    qas_with_contexts = await get_qa_history(
+        workspace_id, str(current_user.id), limit, before
+    )
 
     return [
         QAResponse(
@@ -67,18 +127,9 @@ async def get_qa_history_endpoint(
             workspace_id=qa.workspace_id,
             question=qa.question,
             answer=qa.answer,
-            source_contexts=[
-                ContextUnitResponse(
-                    id=cu.id,
-                    video_id=cu.video_id,
-                    video_path=cu.video_path,
-                    text=cu.text,
-                    start_time=cu.start_time,
-                    end_time=cu.end_time,
-                )
-                for cu in context_units
-            ],
+            source_contexts=[_context_unit_response(cu) for cu in context_units],
             response_time=qa.response_time,
+            stage_timings=qa.stage_timings,
             created_at=qa.created_at,
         )
         for qa, context_units in qas_with_contexts
@@ -88,7 +139,7 @@ async def get_qa_history_endpoint(
 @router.delete("/{workspace_id}/history")
 async def delete_qa_history_endpoint(
     workspace_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_workspace_user),
 ):
     await delete_all_qa_records(workspace_id, str(current_user.id))
     return {"detail": "Q&A history deleted successfully."}
@@ -98,7 +149,7 @@ async def delete_qa_history_endpoint(
 async def delete_qa_record_endpoint(
     workspace_id: str,
     qa_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_workspace_user),
 ):
     await delete_qa_record(workspace_id, qa_id, str(current_user.id))
     return {"detail": "Q&A record deleted successfully."}
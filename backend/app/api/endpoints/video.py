@@ -12,15 +12,22 @@ import json
 from pydantic import ValidationError
 
 from app.schemas.video import VideoResponse
-from app.schemas.context_unit import ContextUnitData
+from app.schemas.import_job import ImportJobResponse
+from app.schemas.context_unit import (
+    ContextUnitData,
+    ContextUnitsUpdate,
+    ContextUnitsUpdateResponse,
+)
 from app.models.user import User
-from app.api.deps import get_current_user
+from app.api.deps import get_workspace_user
 from app.services.video_service import (
     upload_video,
     list_videos,
     get_video,
+    update_context_units,
     delete_video,
 )
+from app.services.import_service import create_import, get_import, resume_import
 
 router = APIRouter()
 
@@ -34,7 +41,7 @@ async def upload_video_endpoint(
     workspace_id: str,
     video_file: UploadFile = File(...),
     context_units: str = Form(...),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_workspace_user),
 ):
     if not video_file.content_type.startswith("video/"):
         raise HTTPException(
@@ -59,10 +66,49 @@ async def upload_video_endpoint(
     return video_response
 
 
+@router.post(
+    "/{workspace_id}/imports",
+    response_model=ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_import_endpoint(
+    workspace_id: str,
+    archive: UploadFile = File(...),
+    refine: bool = Form(True),
+    current_user: User = Depends(get_workspace_user),
+):
+    """Import a zip of videos plus a context unit manifest in the background."""
+    return await create_import(workspace_id, str(current_user.id), archive, refine)
+
+
+@router.get("/{workspace_id}/imports/{import_id}", response_model=ImportJobResponse)
+async def get_import_endpoint(
+    workspace_id: str,
+    import_id: str,
+    current_user: User = Depends(get_workspace_user),
+):
+    """Progress of a bulk import."""
+    return await get_import(workspace_id, import_id, str(current_user.id))
+
+
+@router.post(
+    "/{workspace_id}/imports/{import_id}/resume",
+    response_model=ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resume_import_endpoint(
+    workspace_id: str,
+    import_id: str,
+    current_user: User = Depends(get_workspace_user),
+):
+    """Retry the videos of a failed or interrupted import from where they stopped."""
+    return await resume_import(workspace_id, import_id, str(current_user.id))
+
+
 @router.get("/{workspace_id}/videos", response_model=List[VideoResponse])
 async def list_videos_endpoint(
     workspace_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_workspace_user),
 ):
     """List all videos in a workspace."""
     return await list_videos(workspace_id, str(current_user.id))
@@ -75,17 +121,33 @@ async def list_videos_endpoint(
 async def get_video_endpoint(
     workspace_id: str,
     video_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_workspace_user),
 ):
     """Get a specific video by ID."""
     return await get_video(video_id, workspace_id, str(current_user.id))
 
 
+@router.patch(
+    "/{workspace_id}/videos/{video_id}/context-units",
+    response_model=ContextUnitsUpdateResponse,
+)
+async def update_context_units_endpoint(
+    workspace_id: str,
+    video_id: str,
+    update: ContextUnitsUpdate,
+    current_user: User = Depends(get_workspace_user),
+):
+    """Patch, insert or delete context units without re-uploading the video."""
+    return await update_context_units(
+        video_id, workspace_id, str(current_user.id), update
+    )
+
+
 @router.delete("/{workspace_id}/videos/{video_id}")
 async def delete_video_endpoint(
     workspace_id: str,
     video_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_workspace_user),
 ):
     """Delete a video and its related resources."""
     return await delete_video(video_id, workspace_id, str(current_user.id))
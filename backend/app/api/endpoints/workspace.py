@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from typing import List, Optional
+import os
 
 from app.schemas.workspace import WorkspaceCreate, WorkspaceUpdate, WorkspaceResponse
 from app.models.user import User
@@ -12,6 +15,10 @@ from app.services.workspace_service import (
     delete_workspace,
     clone_workspace,
 )
+from app.services.workspace_transfer import (
+    export_workspace_file,
+    import_workspace_upload,
+)
 
 router = APIRouter()
 
@@ -24,6 +31,18 @@ async def create_workspace_endpoint(
     return await create_workspace(workspace_data, str(current_user.id))
 
 
+@router.post(
+    "/import", response_model=WorkspaceResponse, status_code=status.HTTP_201_CREATED
+)
+async def import_workspace_endpoint(
+    archive: UploadFile = File(...),
+    name: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Create a workspace from an export archive, without re-embedding."""
+    return await import_workspace_upload(archive, str(current_user.id), name)
+
+
 @router.get("/", response_model=List[WorkspaceResponse])
 async def list_workspaces_endpoint(
     current_user: User = Depends(get_current_user),
@@ -54,3 +73,35 @@ async def delete_workspace_endpoint(
     current_user: User = Depends(get_current_user),
 ):
     return await delete_workspace(workspace_id, str(current_user.id))
+
+
+@router.post(
+    "/{workspace_id}/clone",
+    response_model=WorkspaceResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def clone_workspace_endpoint(
+    workspace_id: str,
+    full_copy: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+    """Copy-on-write clone by default; full_copy duplicates videos and vectors."""
+    return await clone_workspace(workspace_id, str(current_user.id), full_copy)
+
+
+@router.get("/{workspace_id}/export")
+async def export_workspace_endpoint(
+    workspace_id: str,
+    include_videos: bool = True,
+    current_user: User = Depends(get_current_user),
+):
+    """Download the workspace with its vectors and QA history as one archive."""
+    path, filename = await export_workspace_file(
+        workspace_id, str(current_user.id), include_videos
+    )
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        filename=filename,
+        background=BackgroundTask(os.remove, path),
+    )
@@ -11,6 +11,34 @@ class Settings(BaseSettings):
     upload_dir: str = "./storage/videos"
     chroma_persist_dir: str = "./storage/chroma_db"
     gemini_api_keys: str  # Comma-separated API keys for rotation
+    lexical_tokenizer: str = "vietnamese"  # BM25 tokenizer: vietnamese, whitespace
+    context_token_budget: int = 3000  # Max tokens of retrieved context per prompt
+    password_hash_workers: int = 4  # Threads running bcrypt
+    password_hash_max_pending: int = 64  # Queued logins before answering 429
+    ask_max_concurrent: int = 16  # Questions answered at once (all users)
+    ask_max_per_user: int = 2  # Questions answered at once per user
+    ask_max_queue: int = 64  # Questions allowed to wait for a slot
+    ask_queue_timeout: float = 15.0  # Seconds a question may wait before 429
+    batch_max_questions: int = 200  # Questions accepted by one /ask/batch call
+    batch_generation_concurrency: int = 4  # LLM calls in flight per batch
+    conversation_summary_max_tokens: int = 256  # Size cap of the rolling summary
+    loop_monitor_enabled: bool = False  # Debug: detect blocking calls on the loop
+    loop_stall_threshold: float = 0.1  # Seconds of lag reported as a stall
+    loop_monitor_interval: float = 0.05  # Heartbeat and sampling period (seconds)
+    preload_models: bool = True  # Load embedding models in the background at startup
+    preload_reranker: bool = False  # Also load the reranker in that preload
+    model_server_socket: str = ""  # Shared model server socket; empty: in-process
+    model_server_timeout: float = 30.0  # Seconds to wait for a model server answer
+    model_server_max_batch: int = 64  # Items merged into one model call by the server
+    model_server_batch_wait: float = 0.005  # Seconds the server waits to fill a batch
+    ingest_max_batch: int = 512  # Context units merged into one Chroma write
+    ingest_coalesce_wait: float = 0.05  # Seconds a workspace writer gathers writes
+    bulk_chunk_size: int = 1000  # Ids per batch in bulk clone/delete
+    reaper_enabled: bool = True  # Remove deleted workspaces/videos in the background
+    reaper_interval: float = 10.0  # Seconds between reaper passes
+    reaper_batch_size: int = 100  # Tombstoned documents claimed per pass
+    import_dir: str = "./storage/imports"  # Uploaded archives until their import ends
+    import_stage_workers: int = 2  # Videos each bulk import stage handles at once
 
     class Config:
         env_file = ".env"
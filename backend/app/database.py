@@ -20,6 +20,24 @@ async def connect_to_mongo():
     print("Connected to MongoDB")
 
 
+async def ensure_indexes():
+    database = db.client[settings.mongodb_database]
+    await database.qa.create_index(
+        [("workspace_id", 1), ("created_at", -1), ("_id", -1)]
+    )
+    await database.context_units.create_index("video_id")
+    await database.videos.create_index("workspace_id")
+    await database.videos.create_index("released_from", sparse=True)
+    await database.videos.create_index("deleted_from", sparse=True)
+    await database.workspaces.create_index("user_id")
+    await database.workspaces.create_index("layers.video_ids")
+    await database.workspaces.create_index("deleted_at", sparse=True)
+    await database.users.create_index("username")
+    await database.conversation_summaries.create_index("workspace_id", unique=True)
+    await database.imports.create_index("workspace_id")
+    await database.imports.create_index("status")
+
+
 async def close_mongo_connection():
     db.client.close()
     print("Closed MongoDB connection")
@@ -2,19 +2,67 @@ import os
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from fastapi import FastAPI
+from app.utils.startup_profile import startup_profile
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from pathlib import Path
-from app.database import connect_to_mongo, close_mongo_connection
-from app.api.endpoints import auth, workspace, video, qa
+from app.database import connect_to_mongo, close_mongo_connection, ensure_indexes
+from app.api.endpoints import auth, workspace, video, qa, debug, health
+from app.config import get_settings
+from app.utils.background import drain_background_tasks
+from app.utils.loop_monitor import LoopMonitorMiddleware, loop_monitor
+from app.utils.metrics import register_executor
+from app.utils.stage_timer import start_stage_recording
+from app.services.readiness import preload_models
+from app.services.reaper import reaper
+from app.services.import_service import resume_interrupted_imports, stop_imports
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+settings = get_settings()
+
+# Heavy libraries (torch, transformers, langchain, cv2, google-genai) are
+# imported where first used, so this stays small
+startup_profile.record("import:app", time.perf_counter() - startup_profile.started_at)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await connect_to_mongo()
+    # Explicit default executor so its queue depth can be exported
+    default_executor = ThreadPoolExecutor(thread_name_prefix="default")
+    asyncio.get_running_loop().set_default_executor(default_executor)
+    register_executor("default", default_executor)
+
+    with startup_profile.phase("connect_mongo"):
+        await connect_to_mongo()
+    with startup_profile.phase("ensure_indexes"):
+        await ensure_indexes()
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+    if settings.reaper_enabled:
+        reaper.start()
+    await resume_interrupted_imports()
+
+    # The server accepts requests right away; /ready turns 200 once loaded
+    preload_task = None
+    if settings.preload_models:
+        preload_task = asyncio.create_task(preload_models(), name="preload_models")
+    else:
+        startup_profile.mark_ready()
+
     yield
+
+    if preload_task is not None:
+        preload_task.cancel()
+    await loop_monitor.stop()
+    await reaper.stop()
+    await stop_imports()
+    await drain_background_tasks()
     await close_mongo_connection()
 
 
@@ -28,6 +76,10 @@ app = FastAPI(
     },
 )
 
+if settings.loop_monitor_enabled:
+    # Added first so it is innermost and runs in the task serving the route
+    app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -36,11 +88,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_stages(request: Request, call_next):
+    # Services add their stage timings to this request's dict
+    start_stage_recording()
+    return await call_next(request)
+
+
 # Include API routers
+app.include_router(health.router, tags=["Health"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(workspace.router, prefix="/api/workspaces", tags=["Workspaces"])
 app.include_router(video.router, prefix="/api/workspaces", tags=["Videos"])
 app.include_router(qa.router, prefix="/api/workspaces", tags=["Q&A"])
+if settings.loop_monitor_enabled:
+    app.include_router(debug.router, prefix="/api/debug", tags=["Debug"])
 
 # Mount static file directories for serving videos and thumbnails AFTER API routes
 videos_dir = Path("./storage/videos")
@@ -54,6 +117,11 @@ app.mount(
 )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     return {"message": "Educational Video Q&A API", "version": "1.0.0", "docs": "/docs"}
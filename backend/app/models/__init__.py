@@ -1,7 +1,19 @@
 from .user import User
-from .workspace import Workspace
+from .workspace import Workspace, WorkspaceLayer
 from .video import Video
 from .context_unit import ContextUnit
 from .qa import QA
+from .conversation_summary import ConversationSummary
+from .import_job import ImportJob, ImportVideo
 
-__all__ = ["User", "Workspace", "Video", "ContextUnit", "QA"]
+__all__ = [
+    "User",
+    "Workspace",
+    "WorkspaceLayer",
+    "Video",
+    "ContextUnit",
+    "QA",
+    "ConversationSummary",
+    "ImportJob",
+    "ImportVideo",
+]
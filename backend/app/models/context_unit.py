@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -10,6 +10,8 @@ class ContextUnit(BaseModel):
     text: str  # Refined text for embedding and search
     start_time: float
     end_time: float
+    tokens: List[str] = Field(default_factory=list)  # Lexical tokens for BM25
+    tokenizer: Optional[str] = None  # Tokenizer that produced `tokens`
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Config:
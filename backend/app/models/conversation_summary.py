@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class ConversationSummary(BaseModel):
+    id: Optional[str] = Field(None, alias="_id")
+    workspace_id: str
+    summary: str = ""
+    turns: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Config:
+        populate_by_name = True
@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+# Durable progress of one video, in pipeline order
+IMPORT_STAGES = ["pending", "stored", "inserted", "embedded"]
+
+
+class ImportVideo(BaseModel):
+    filename: str  # Member name inside the archive
+    video_id: Optional[str] = None  # Set as soon as the video document exists
+    stage: str = "pending"
+    error: Optional[str] = None
+
+
+class ImportJob(BaseModel):
+    id: Optional[str] = Field(None, alias="_id")
+    workspace_id: str
+    user_id: str
+    archive_path: str
+    manifest: str  # context_units.jsonl or context_units.parquet
+    refine: bool = True
+    status: str = "pending"  # pending, running, completed, failed, interrupted
+    videos: List[ImportVideo] = Field(default_factory=list)
+    heartbeat_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, Field
 
 
@@ -10,6 +10,8 @@ class QA(BaseModel):
     answer: str
     source_context_ids: List[str] = Field(default_factory=list)
     response_time: float = 0.0
+    # Stage name -> seconds (auth, refinement, embedding, vector_search, ...)
+    stage_timings: Dict[str, float] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Config:
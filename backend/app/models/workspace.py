@@ -1,12 +1,19 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
+class WorkspaceLayer(BaseModel):
+    workspace_id: str  # Owner of the videos' vectors
+    video_ids: List[str]
+
+
 class Workspace(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
     user_id: str
     name: str
+    parent_id: Optional[str] = None  # Workspace this one was cloned from
+    layers: List[WorkspaceLayer] = Field(default_factory=list)  # Inherited videos
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class ContextUnitData(BaseModel):
@@ -20,3 +21,25 @@ class ContextUnitResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ContextUnitEdit(BaseModel):
+    """A unit to patch (with `id`) or insert (without); omitted fields are kept."""
+
+    id: Optional[str] = None
+    text: Optional[str] = None
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+
+
+class ContextUnitsUpdate(BaseModel):
+    upsert: List[ContextUnitEdit] = Field(default_factory=list)
+    delete: List[str] = Field(default_factory=list)
+
+
+class ContextUnitsUpdateResponse(BaseModel):
+    inserted_ids: List[str]
+    updated: int  # Units whose text or timestamps changed
+    reembedded: int  # Units whose vectors were recomputed (new or new text)
+    deleted: int
+    unchanged: int
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class ImportVideoError(BaseModel):
+    filename: str
+    stage: str  # Last stage the video completed
+    error: str
+
+
+class ImportJobResponse(BaseModel):
+    id: str
+    workspace_id: str
+    status: str
+    total_videos: int
+    stages: Dict[str, int]  # Stage -> videos that completed it last
+    failed: List[ImportVideoError]
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
 from app.schemas.context_unit import ContextUnitResponse
 
 
@@ -11,8 +11,33 @@ class QuestionRequest(BaseModel):
     generator_type: str = "gemini"
     embedding_model: str = "dangvantuan"
     use_reranker: bool = False
+    # Refine with the workspace's rolling conversation summary
     use_history: bool = False
+    # Kept for compatibility: the summary is bounded, 0 disables history
     history_count: int = 3
+    # Fusion for hybrid/ensemble
+    fusion_method: Literal["rrf", "minmax", "zscore", "dbsf"] = "rrf"
+    # Keys: "vector", "bm25" or an embedding model name (ensemble only)
+    fusion_weights: Optional[Dict[str, float]] = None
+    # Temporal neighbors added on each side of every retrieved context
+    neighbor_window: int = Field(0, ge=0, le=5)
+    # Overrides settings.context_token_budget for this request; capped below
+    # the smallest generator context (Qwen2.5 32K) to leave room for the prompt
+    context_token_budget: Optional[int] = Field(None, ge=256, le=30000)
+
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[QuestionRequest]
+    # Lowers settings.batch_generation_concurrency for this batch (never raises it)
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
+
+class ResponseTiming(BaseModel):
+    """Per-stage timing (seconds) and prompt size of one answer."""
+
+    stages: Dict[str, float] = {}
+    prompt_tokens: int = 0
+    context_tokens: int = 0
 
 
 class AnswerResponse(BaseModel):
@@ -21,6 +46,15 @@ class AnswerResponse(BaseModel):
     answer: str
     source_contexts: List[ContextUnitResponse]
     response_time: float
+    timing: Optional[ResponseTiming] = None
+
+
+class BatchAnswerItem(BaseModel):
+    """One NDJSON line of a batch: the answer or the error of questions[index]."""
+
+    index: int
+    result: Optional[AnswerResponse] = None
+    error: Optional[str] = None
 
 
 class QAResponse(BaseModel):
@@ -31,6 +65,7 @@ class QAResponse(BaseModel):
     answer: str
     source_contexts: List[ContextUnitResponse]
     response_time: float
+    stage_timings: Dict[str, float] = {}
     created_at: datetime
 
     class Config:
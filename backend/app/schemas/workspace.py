@@ -13,6 +13,7 @@ class WorkspaceResponse(BaseModel):
     id: str
     user_id: str
     name: str
+    parent_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
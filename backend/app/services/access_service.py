@@ -0,0 +1,67 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from app.database import get_database
+from app.services.workspace_layers import layers_cache
+from app.utils.db_helpers import prepare_id_filter
+from app.utils.metrics import register_cache
+from app.utils.ttl_cache import TTLCache
+
+# (user_id, workspace_id) -> True for verified ownership
+workspace_access_cache = TTLCache(maxsize=4096, ttl=30.0)
+register_cache("workspace_access", workspace_access_cache)
+
+# Both caches are per process. Every tombstone (or release) bumps this
+# counter in Mongo, and a worker that sees a new value drops its caches, so
+# a deletion made through any worker is hidden from all of them at once.
+VISIBILITY_EPOCH_ID = "workspace_visibility"
+_seen_epoch: Optional[int] = None
+
+
+async def _sync_visibility_epoch(db) -> None:
+    global _seen_epoch
+    epoch_dict = await db.cache_epochs.find_one(
+        {"_id": VISIBILITY_EPOCH_ID}, {"epoch": 1}
+    )
+    epoch = epoch_dict["epoch"] if epoch_dict else 0
+    if epoch != _seen_epoch:
+        workspace_access_cache.clear()
+        layers_cache.clear()
+        _seen_epoch = epoch
+
+
+async def bump_visibility_epoch() -> None:
+    """Make every worker drop its access and layer caches."""
+    db = await get_database()
+    await db.cache_epochs.update_one(
+        {"_id": VISIBILITY_EPOCH_ID}, {"$inc": {"epoch": 1}}, upsert=True
+    )
+
+
+async def verify_workspace_access(workspace_id: str, user_id: str) -> None:
+    """Raise 404 unless the workspace exists and belongs to the user."""
+    db = await get_database()
+    await _sync_visibility_epoch(db)
+
+    key = (user_id, workspace_id)
+    if workspace_access_cache.get(key):
+        return
+
+    workspace_dict = await db.workspaces.find_one(
+        {
+            "_id": prepare_id_filter(workspace_id),
+            "user_id": user_id,
+            "deleted_at": None,
+        },
+        {"_id": 1},
+    )
+
+    if not workspace_dict:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found"
+        )
+
+    workspace_access_cache.set(key, True)
+
+
+def invalidate_workspace_access(workspace_id: str) -> None:
+    workspace_access_cache.invalidate_where(lambda key: key[1] == workspace_id)
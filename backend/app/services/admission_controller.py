@@ -0,0 +1,163 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+from fastapi import HTTPException, status
+from app.config import get_settings
+from app.utils.metrics import (
+    admission_active_requests,
+    admission_queue_depth,
+    admission_rejections_total,
+    admission_wait_seconds,
+)
+
+settings = get_settings()
+
+
+class _Waiter:
+    __slots__ = ("user_id", "future")
+
+    def __init__(self, user_id: str, future: asyncio.Future):
+        self.user_id = user_id
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Per-user and global concurrency limits with a bounded FIFO wait queue.
+
+    A request is rejected with 429 when the queue is full, when the
+    estimated wait (queue position x average service time) already exceeds
+    the queue timeout, or when it actually waits longer than that timeout.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_per_user: int,
+        max_queue: int,
+        queue_timeout: float,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.active = 0
+        self.active_per_user: Dict[str, int] = {}
+        self.waiters: Deque[_Waiter] = deque()
+
+        # Exponentially weighted average of request service time
+        self.avg_service_time = 1.0
+
+    def _has_capacity(self, user_id: str) -> bool:
+        return (
+            self.active < self.max_concurrent
+            and self.active_per_user.get(user_id, 0) < self.max_per_user
+        )
+
+    def _acquire(self, user_id: str):
+        self.active += 1
+        self.active_per_user[user_id] = self.active_per_user.get(user_id, 0) + 1
+        admission_active_requests.set(self.active)
+
+    def _release(self, user_id: str):
+        self.active -= 1
+        remaining = self.active_per_user.get(user_id, 1) - 1
+        if remaining:
+            self.active_per_user[user_id] = remaining
+        else:
+            self.active_per_user.pop(user_id, None)
+        admission_active_requests.set(self.active)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        # FIFO, skipping users that are still at their own limit
+        for waiter in list(self.waiters):
+            if self.active >= self.max_concurrent:
+                break
+            if waiter.future.done() or not self._has_capacity(waiter.user_id):
+                continue
+            self.waiters.remove(waiter)
+            self._acquire(waiter.user_id)
+            waiter.future.set_result(None)
+        admission_queue_depth.set(len(self.waiters))
+
+    def _reject(self, reason: str, retry_after: float):
+        admission_rejections_total.labels(reason=reason).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def _estimated_wait(self, position: int) -> float:
+        return self.avg_service_time * position / max(self.max_concurrent, 1)
+
+    async def _wait_for_slot(self, user_id: str):
+        if len(self.waiters) >= self.max_queue:
+            self._reject("queue_full", self._estimated_wait(len(self.waiters)))
+
+        estimated_wait = self._estimated_wait(len(self.waiters) + 1)
+        if estimated_wait > self.queue_timeout:
+            self._reject("deadline", estimated_wait)
+
+        waiter = _Waiter(user_id, asyncio.get_running_loop().create_future())
+        self.waiters.append(waiter)
+        admission_queue_depth.set(len(self.waiters))
+
+        start_time = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter.future), timeout=self.queue_timeout
+            )
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                # Granted right as the timeout fired: hand the slot back
+                self._release(user_id)
+            else:
+                waiter.future.cancel()
+                self.waiters.remove(waiter)
+                admission_queue_depth.set(len(self.waiters))
+            self._reject("timeout", self._estimated_wait(len(self.waiters)))
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(user_id)
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+                admission_queue_depth.set(len(self.waiters))
+            raise
+        finally:
+            admission_wait_seconds.observe(time.monotonic() - start_time)
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, track_service_time: bool = True):
+        """
+        Hold one slot for the duration of the block. Pass
+        track_service_time=False for work that is not a single request
+        (a batch's up-front checks), so it does not skew the wait estimates.
+        """
+        # Waiters left in the queue are blocked by a limit, never by ordering
+        if self._has_capacity(user_id):
+            self._acquire(user_id)
+        else:
+            await self._wait_for_slot(user_id)
+
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            if track_service_time:
+                elapsed = time.monotonic() - start_time
+                self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * elapsed
+            self._release(user_id)
+
+
+ask_admission = AdmissionController(
+    max_concurrent=settings.ask_max_concurrent,
+    max_per_user=settings.ask_max_per_user,
+    max_queue=settings.ask_max_queue,
+    queue_timeout=settings.ask_queue_timeout,
+)
@@ -1,15 +1,59 @@
-from typing import Optional
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 from datetime import timedelta
+from fastapi import HTTPException, status
 from app.database import get_database
 from app.models.user import User
 from app.utils.security import get_password_hash, verify_password, create_access_token
 from app.utils.db_helpers import convert_objectid_to_str
+from app.utils.metrics import password_hash_seconds, register_executor
 from app.config import get_settings
 
 settings = get_settings()
 
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+password_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers)
+register_executor("password", password_executor)
+_pending_password_ops = 0
 
-async def authenticate_or_create_user(
+# (username, password digest) -> in-flight login shared by duplicate requests
+_inflight_logins: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+def _timed(operation: str, func, *args):
+    start_time = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        password_hash_seconds.labels(operation=operation).observe(
+            time.perf_counter() - start_time
+        )
+
+
+async def _run_password_op(operation: str, func, *args):
+    global _pending_password_ops
+
+    if _pending_password_ops >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    _pending_password_ops += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            password_executor, _timed, operation, func, *args
+        )
+    finally:
+        _pending_password_ops -= 1
+
+
+async def _authenticate_or_create_user(
     username: str, password: str
 ) -> Optional[tuple[User, str]]:
     db = await get_database()
@@ -19,7 +63,9 @@ async def authenticate_or_create_user(
         user_dict = convert_objectid_to_str(user_dict)
         user = User(**user_dict)
 
-        if not verify_password(password, user.hashed_password):
+        if not await _run_password_op(
+            "verify", verify_password, password, user.hashed_password
+        ):
             return None
 
         access_token = create_access_token(
@@ -28,7 +74,7 @@ async def authenticate_or_create_user(
         )
         return user, access_token
     else:
-        hashed_password = get_password_hash(password)
+        hashed_password = await _run_password_op("hash", get_password_hash, password)
         new_user = User(username=username, hashed_password=hashed_password)
 
         user_dict = new_user.model_dump(by_alias=True, exclude={"id"})
@@ -44,6 +90,22 @@ async def authenticate_or_create_user(
         return created_user, access_token
 
 
+async def authenticate_or_create_user(
+    username: str, password: str
+) -> Optional[tuple[User, str]]:
+    # Concurrent logins with the same credentials share one bcrypt run
+    key = (username, hashlib.sha256(password.encode("utf-8")).hexdigest())
+
+    task = _inflight_logins.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_authenticate_or_create_user(username, password))
+        _inflight_logins[key] = task
+        task.add_done_callback(lambda _: _inflight_logins.pop(key, None))
+
+    # Shielded so one client disconnecting does not cancel the shared login
+    return await asyncio.shield(task)
+
+
 async def get_user_by_username(username: str) -> Optional[User]:
     db = await get_database()
     user_dict = await db.users.find_one({"username": username})
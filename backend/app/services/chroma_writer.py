@@ -0,0 +1,239 @@
+"""
+Single-writer ingestion for the per-workspace Chroma persist directories
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within the process
+    fcntl = None
+
+# Operations merged with their neighbours of the same kind and model
+COALESCED_KINDS = ("add", "upsert", "update_metadata", "delete", "delete_videos")
+
+
+class WriteOp:
+    def __init__(self, kind: str, payload: Dict):
+        self.kind = kind
+        self.payload = payload
+        self.future: Future = Future()
+
+    @property
+    def size(self) -> int:
+        return len(self.payload.get("ids", ())) or 1
+
+    def merges_with(self, other: "WriteOp") -> bool:
+        return (
+            self.kind in COALESCED_KINDS
+            and self.kind == other.kind
+            and self.payload.get("embedding_model")
+            == other.payload.get("embedding_model")
+        )
+
+
+def coalesce(ops: List[WriteOp], max_batch: int) -> List[List[WriteOp]]:
+    """Split queued ops into runs that can be written together, keeping order."""
+    groups: List[List[WriteOp]] = []
+    size = 0
+    for op in ops:
+        if groups and groups[-1][-1].merges_with(op) and size + op.size <= max_batch:
+            groups[-1].append(op)
+            size += op.size
+        else:
+            groups.append([op])
+            size = op.size
+    return groups
+
+
+class WorkspaceWriter:
+    """
+    The one thread writing to a workspace's collections in this process.
+
+    Ops queued within `wait` seconds are coalesced into batched writes. Each
+    batch is first prepared (embedded) without any lock, then written under
+    a file lock next to the persist directories that serializes the writes
+    with other worker processes, so workers embed in parallel and only the
+    storage writes take turns.
+
+    Reads do not go through here and never wait for the lock. Each batched
+    write is atomic per collection, but there is no snapshot across
+    collections or batches: a query running during a write can see one
+    embedding model's collection updated before the other's.
+    """
+
+    def __init__(
+        self,
+        workspace_id: str,
+        lock_path: Path,
+        apply: Callable[[str, str, List[Dict]], None],
+        prepare: Callable[[str, str, List[Dict]], List[Dict]],
+        max_batch: int,
+        wait: float,
+        on_idle: Callable[["WorkspaceWriter"], bool],
+        idle_timeout: float = 30.0,
+    ):
+        self.workspace_id = workspace_id
+        self.lock_path = lock_path
+        self.max_batch = max_batch
+        self.wait = wait
+        self.idle_timeout = idle_timeout
+        self._apply = apply
+        self._prepare_payloads = prepare
+        self._on_idle = on_idle
+        self.queue: "queue.Queue[WriteOp]" = queue.Queue()
+
+        threading.Thread(
+            target=self._run, name=f"chroma-writer-{workspace_id}", daemon=True
+        ).start()
+
+    @contextmanager
+    def _process_lock(self):
+        if fcntl is None:
+            yield
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _drain(self, first: WriteOp) -> List[WriteOp]:
+        ops = [first]
+        size = first.size
+        deadline = time.monotonic() + self.wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                op = self.queue.get(timeout=remaining) if remaining > 0 else None
+            except queue.Empty:
+                op = None
+            if op is None:
+                # Take whatever is already queued without waiting further
+                try:
+                    op = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            ops.append(op)
+            size += op.size
+        return ops
+
+    def _prepare(self, group: List[WriteOp]) -> List[WriteOp]:
+        """Prepare a group's payloads; returns the ops that are ready to write."""
+        kind = group[0].kind
+        try:
+            payloads = self._prepare_payloads(
+                self.workspace_id, kind, [op.payload for op in group]
+            )
+        except Exception as e:
+            if len(group) == 1:
+                group[0].future.set_exception(e)
+                return []
+            print(f"Preparing {kind} of {len(group)} ops failed ({e}), retrying singly")
+            return [ready for op in group for ready in self._prepare([op])]
+
+        for op, payload in zip(group, payloads):
+            op.payload = payload
+        return group
+
+    def _write(self, group: List[WriteOp]):
+        kind = group[0].kind
+        try:
+            self._apply(self.workspace_id, kind, [op.payload for op in group])
+        except Exception as e:
+            if len(group) == 1:
+                group[0].future.set_exception(e)
+                return
+            # One bad op should not fail the ops it was merged with
+            print(f"Batched {kind} of {len(group)} ops failed ({e}), retrying singly")
+            for op in group:
+                self._write([op])
+            return
+
+        for op in group:
+            op.future.set_result(None)
+
+    def _run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                if self._on_idle(self):
+                    return
+                continue
+
+            ops = self._drain(first)
+            # CPU-bound preparation runs before the cross-process lock
+            groups = [
+                ready
+                for ready in map(self._prepare, coalesce(ops, self.max_batch))
+                if ready
+            ]
+            with self._process_lock():
+                for group in groups:
+                    self._write(group)
+
+            if len(ops) > len(groups):
+                print(
+                    f"Workspace {self.workspace_id}: {len(ops)} vector writes "
+                    f"in {len(groups)} batches"
+                )
+
+
+class ChromaWriter:
+    """Routes writes to the per-workspace writer thread, created on demand."""
+
+    def __init__(
+        self,
+        persist_directory: str,
+        apply: Callable[[str, str, List[Dict]], None],
+        prepare: Callable[[str, str, List[Dict]], List[Dict]],
+        max_batch: int = 512,
+        wait: float = 0.05,
+    ):
+        self.persist_directory = Path(persist_directory)
+        self.max_batch = max_batch
+        self.wait = wait
+        self._apply = apply
+        self._prepare = prepare
+        self._writers: Dict[str, WorkspaceWriter] = {}
+        self._lock = threading.Lock()
+
+    def _retire(self, writer: WorkspaceWriter) -> bool:
+        # Under the lock nobody can enqueue, so an empty queue stays empty
+        with self._lock:
+            if not writer.queue.empty():
+                return False
+            if self._writers.get(writer.workspace_id) is writer:
+                del self._writers[writer.workspace_id]
+            return True
+
+    def submit(self, workspace_id: str, kind: str, **payload) -> Future:
+        op = WriteOp(kind, payload)
+        with self._lock:
+            writer: Optional[WorkspaceWriter] = self._writers.get(workspace_id)
+            if writer is None:
+                writer = WorkspaceWriter(
+                    workspace_id,
+                    self.persist_directory / f".workspace_{workspace_id}.lock",
+                    self._apply,
+                    self._prepare,
+                    self.max_batch,
+                    self.wait,
+                    self._retire,
+                )
+                self._writers[workspace_id] = writer
+            writer.queue.put(op)
+        return op.future
+
+    def write(self, workspace_id: str, kind: str, **payload) -> None:
+        """Queue a write and block until it is persisted (or failed)."""
+        self.submit(workspace_id, kind, **payload).result()
@@ -0,0 +1,170 @@
+import asyncio
+import re
+from typing import List, Dict, Tuple
+import numpy as np
+from app.services.generators.base_generator import BaseGenerator
+from app.services.retrievers.base_retriever import source_units
+from app.services.tokenizers import get_tokenizer
+from app.services.vector_store import get_vector_store
+from app.services.workspace_layers import get_workspace_layers
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+class ContextPacker:
+    """
+    Select and trim retrieved contexts so the prompt fits a token budget.
+
+    Passages are ordered with Maximal Marginal Relevance over their stored
+    embeddings (near-duplicates are dropped), then added until the budget is
+    spent; passages that do not fit are cut down to their sentences that
+    overlap most with the query.
+    """
+
+    def __init__(
+        self,
+        mmr_lambda: float = 0.7,
+        duplicate_threshold: float = 0.95,
+        max_passage_share: float = 0.4,
+        min_passage_tokens: int = 48,
+    ):
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.max_passage_share = max_passage_share
+        self.min_passage_tokens = min_passage_tokens
+        self.tokenizer = get_tokenizer()
+
+    def _mmr_order(
+        self, contexts: List[Dict], embeddings: Dict[str, np.ndarray]
+    ) -> List[int]:
+        relevance = np.array(
+            [1.0 - float(ctx.get("distance", 0.0)) for ctx in contexts]
+        )
+        span = relevance.max() - relevance.min()
+        if span > 0:
+            relevance = (relevance - relevance.min()) / span
+        else:
+            relevance = np.ones_like(relevance)
+
+        dim = next((len(e) for e in embeddings.values()), 0)
+        matrix = np.zeros((len(contexts), dim), dtype=np.float32)
+        for i, ctx in enumerate(contexts):
+            if ctx.get("id") in embeddings:
+                matrix[i] = embeddings[ctx["id"]]
+        # Embeddings are stored normalized, so the dot product is cosine similarity
+        similarity = matrix @ matrix.T
+
+        selected: List[int] = []
+        remaining = list(range(len(contexts)))
+        max_similarity = np.full(len(contexts), 0.0)
+
+        while remaining:
+            candidates = np.array(remaining)
+            scores = (
+                self.mmr_lambda * relevance[candidates]
+                - (1 - self.mmr_lambda) * max_similarity[candidates]
+            )
+            best = int(candidates[int(np.argmax(scores))])
+            remaining.remove(best)
+
+            if selected and max_similarity[best] >= self.duplicate_threshold:
+                continue
+
+            selected.append(best)
+            max_similarity = np.maximum(max_similarity, similarity[best])
+
+        return selected
+
+    def _trim(
+        self, text: str, query_tokens: set, budget: int, generator: BaseGenerator
+    ) -> str:
+        """Keep the sentences sharing the most tokens with the query, in order."""
+        sentences = [s.strip() for s in _SENTENCE_BOUNDARY.split(text) if s.strip()]
+
+        overlaps = [
+            len(query_tokens.intersection(self.tokenizer.tokenize(sentence)))
+            for sentence in sentences
+        ]
+        ranked = sorted(range(len(sentences)), key=lambda i: (-overlaps[i], i))
+
+        kept = []
+        used = 0
+        for i in ranked:
+            cost = generator.count_tokens(sentences[i])
+            if used + cost > budget:
+                continue
+            kept.append(i)
+            used += cost
+
+        return " ".join(sentences[i] for i in sorted(kept))
+
+    async def pack(
+        self,
+        query: str,
+        contexts: List[Dict],
+        generator: BaseGenerator,
+        workspace_id: str,
+        token_budget: int,
+        embedding_model: str = "dangvantuan",
+    ) -> Tuple[List[Dict], int]:
+        """
+        Args:
+            query: Question used to pick the relevant sentences
+            contexts: Retrieved contexts in rank order
+            generator: Target generator (its tokenizer defines the budget)
+            workspace_id: Workspace whose stored embeddings are used for MMR
+            token_budget: Maximum tokens for all passages together
+            embedding_model: Collection to read the embeddings from
+
+        Returns:
+            Packed contexts (text possibly trimmed) and their total token count
+        """
+        if not contexts:
+            return [], 0
+
+        layers = await get_workspace_layers(workspace_id)
+        loop = asyncio.get_running_loop()
+        embeddings = await loop.run_in_executor(
+            None,
+            get_vector_store().get_embeddings,
+            workspace_id,
+            [ctx["id"] for ctx in contexts if ctx.get("id")],
+            embedding_model,
+            layers.collection_ids,
+        )
+
+        query_tokens = set(self.tokenizer.tokenize(query))
+        passage_cap = max(
+            int(token_budget * self.max_passage_share), self.min_passage_tokens
+        )
+
+        packed = []
+        used = 0
+        for i in self._mmr_order(contexts, embeddings):
+            remaining = token_budget - used
+            if remaining < self.min_passage_tokens:
+                break
+
+            ctx = contexts[i]
+            text = ctx["text"]
+            cost = generator.count_tokens(text)
+
+            limit = min(remaining, passage_cap)
+            if cost > limit:
+                text = self._trim(text, query_tokens, limit, generator)
+                cost = generator.count_tokens(text)
+                if not text:
+                    continue
+
+            item = ctx.copy()
+            if text != ctx["text"]:
+                # Sources keep the stored text, only the prompt gets the cut
+                item["units"] = source_units(ctx)
+            item["text"] = text
+            packed.append(item)
+            used += cost
+
+        return packed, used
+
+
+context_packer = ContextPacker()
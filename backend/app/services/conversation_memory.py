@@ -0,0 +1,183 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+from app.database import get_database
+from app.services.generators import get_generator
+from app.utils.metrics import register_cache
+from app.utils.ttl_cache import TTLCache
+from app.config import get_settings
+
+settings = get_settings()
+
+# Summary updates retried after losing a race with another worker
+RECORD_TURN_ATTEMPTS = 3
+
+
+def get_summary_update_prompt(summary: str, question: str, answer: str) -> str:
+    previous = summary or "(chưa có)"
+    return f"""
+Cập nhật bản tóm tắt cuộc hội thoại giữa người dùng và trợ lý về nội dung video.
+
+Tóm tắt hiện tại:
+{previous}
+
+Lượt mới:
+Người dùng: {question}
+Trả lời: {answer}
+
+Yêu cầu:
+- Giữ các chủ đề, thuật ngữ và thực thể đã được nhắc đến để hiểu các đại từ ở câu hỏi sau
+- Ưu tiên thông tin của các lượt gần nhất
+- Viết ngắn gọn, tối đa {settings.conversation_summary_max_tokens} token
+- Chỉ trả về bản tóm tắt mới
+
+Tóm tắt mới:
+""".strip()
+
+
+class ConversationMemory:
+    """
+    Rolling per-workspace conversation summary.
+
+    Each answer asked with history folds into the stored summary in the
+    background, so the refinement prompt carries a bounded summary instead
+    of replaying raw QA history.
+
+    The cache and the lock are per process, so the stored summary carries
+    a version: reads check it before trusting the cache, and a turn is
+    written with a compare-and-set on it, refolded if another worker won.
+    """
+
+    def __init__(self, cache_ttl: float = 30.0):
+        self.cache = TTLCache(maxsize=1024, ttl=cache_ttl)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def _workspace_lock(self, workspace_id: str):
+        """Per-workspace lock, dropped once nobody holds or waits for it."""
+        lock = self._locks.setdefault(workspace_id, asyncio.Lock())
+        self._lock_users[workspace_id] = self._lock_users.get(workspace_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[workspace_id] -= 1
+            if not self._lock_users[workspace_id]:
+                del self._lock_users[workspace_id]
+                del self._locks[workspace_id]
+
+    async def _load(self, workspace_id: str) -> Tuple[str, int]:
+        """(summary, version), "" and 0 before the first turn."""
+        db = await get_database()
+        cached = self.cache.get(workspace_id)
+        if cached is not None:
+            version_dict = await db.conversation_summaries.find_one(
+                {"workspace_id": workspace_id}, {"_id": 0, "version": 1}
+            )
+            if (version_dict or {}).get("version", 0) == cached[1]:
+                return cached
+
+        summary_dict = await db.conversation_summaries.find_one(
+            {"workspace_id": workspace_id}, {"summary": 1, "version": 1}
+        )
+        entry = (
+            (summary_dict["summary"], summary_dict.get("version", 0))
+            if summary_dict
+            else ("", 0)
+        )
+        self.cache.set(workspace_id, entry)
+        return entry
+
+    async def get_summary(self, workspace_id: str) -> Optional[str]:
+        summary, _ = await self._load(workspace_id)
+        return summary or None
+
+    async def _store(self, workspace_id: str, version: int, summary: str) -> bool:
+        """Write a folded summary if the stored version is still `version`."""
+        db = await get_database()
+        try:
+            result = await db.conversation_summaries.update_one(
+                {
+                    "workspace_id": workspace_id,
+                    # Summaries stored before versioning have no version field
+                    "version": version if version else {"$in": [0, None]},
+                },
+                {
+                    "$set": {
+                        "summary": summary,
+                        "updated_at": datetime.now(timezone.utc),
+                    },
+                    "$inc": {"turns": 1, "version": 1},
+                },
+                upsert=not version,
+            )
+        except DuplicateKeyError:
+            # Another worker created the summary first
+            return False
+        if not (result.matched_count or result.upserted_id):
+            return False
+        self.cache.set(workspace_id, (summary, version + 1))
+        return True
+
+    def _truncate(self, generator, text: str) -> str:
+        max_chars = int(
+            settings.conversation_summary_max_tokens * generator.chars_per_token
+        )
+        if len(text) <= max_chars:
+            return text
+        # Drop the oldest part, the latest turns matter most for follow-ups
+        return "..." + text[-max_chars:]
+
+    async def record_turn(
+        self,
+        workspace_id: str,
+        question: str,
+        answer: str,
+        generator_type: str = "gemini",
+    ) -> None:
+        # Turns of one workspace are folded in order, one at a time
+        async with self._workspace_lock(workspace_id):
+            generator = get_generator(generator_type)
+            for _ in range(RECORD_TURN_ATTEMPTS):
+                previous, version = await self._load(workspace_id)
+
+                summary = await generator.generate_content(
+                    get_summary_update_prompt(previous, question, answer)
+                )
+                if summary is None:
+                    # Generation blocked: append the turn compactly instead
+                    summary = (
+                        f"{previous}\nNgười dùng: {question}\nTrả lời: {answer[:200]}"
+                    )
+                summary = self._truncate(generator, summary.strip())
+
+                if await self._store(workspace_id, version, summary):
+                    return
+                # Changed by another worker meanwhile: fold into the new summary
+                self.cache.invalidate(workspace_id)
+            print(f"Conversation summary of workspace {workspace_id} kept changing")
+
+    async def reset(self, workspace_id: str) -> None:
+        # Cleared rather than deleted, so a turn in flight on another worker
+        # fails its version check instead of recreating the old summary
+        async with self._workspace_lock(workspace_id):
+            db = await get_database()
+            await db.conversation_summaries.update_one(
+                {"workspace_id": workspace_id},
+                {
+                    "$set": {
+                        "summary": "",
+                        "turns": 0,
+                        "updated_at": datetime.now(timezone.utc),
+                    },
+                    "$inc": {"version": 1},
+                },
+            )
+            self.cache.invalidate(workspace_id)
+
+
+conversation_memory = ConversationMemory()
+register_cache("conversation_summary", conversation_memory.cache)
@@ -1,12 +1,13 @@
 import asyncio
 import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Optional
-
-from google import genai
-from google.genai import types
+from typing import TYPE_CHECKING, List, Optional
 
 from app.config import get_settings
+from app.utils.startup_profile import startup_profile
+
+if TYPE_CHECKING:
+    from google import genai
 
 settings = get_settings()
 
@@ -17,7 +18,11 @@ class GeminiService:
         if not self.api_keys:
             raise ValueError("No Gemini API keys configured")
 
-        self.clients: List[genai.Client] = [
+        # The SDK import is slow, so it happens on first use rather than at startup
+        with startup_profile.phase("import:google.genai"):
+            from google import genai
+
+        self.clients: List["genai.Client"] = [
             genai.Client(api_key=key) for key in self.api_keys
         ]
 
@@ -25,7 +30,7 @@ class GeminiService:
         self._lock = threading.Lock()
         self.executor = ThreadPoolExecutor(max_workers=2)
 
-    def _get_current_client(self) -> genai.Client:
+    def _get_current_client(self) -> "genai.Client":
         with self._lock:
             return self.clients[self.current_key_index]
 
@@ -50,6 +55,8 @@ class GeminiService:
         return status in (401, 403)
 
     def _generate_content_sync(self, prompt: str) -> Optional[str]:
+        from google.genai import types
+
         max_retries = len(self.api_keys)
         last_error: Optional[Exception] = None
 
@@ -111,4 +118,15 @@ class GeminiService:
         return await asyncio.gather(*tasks)
 
 
-gemini_service = GeminiService()
+_gemini_service: Optional[GeminiService] = None
+
+
+def gemini_service_initialized() -> bool:
+    return _gemini_service is not None
+
+
+def get_gemini_service() -> GeminiService:
+    global _gemini_service
+    if _gemini_service is None:
+        _gemini_service = GeminiService()
+    return _gemini_service
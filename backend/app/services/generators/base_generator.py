@@ -1,10 +1,15 @@
 from abc import ABC, abstractmethod
 from typing import Optional
+from app.utils.token_counter import estimate_tokens
 
 
 class BaseGenerator(ABC):
+    chars_per_token: float = 4.0
 
     @abstractmethod
     async def generate_content(self, prompt: str) -> Optional[str]:
 
         pass
+
+    def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
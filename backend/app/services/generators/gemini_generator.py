@@ -1,9 +1,12 @@
 from typing import Optional
 from app.services.generators.base_generator import BaseGenerator
-from app.services.gemini_service import gemini_service
+from app.services.gemini_service import get_gemini_service
 
 
 class GeminiGenerator(BaseGenerator):
+    # Vietnamese diacritics split into more pieces than plain ASCII text
+    chars_per_token = 3.0
+
     async def generate_content(self, prompt: str) -> Optional[str]:
 
-        return await gemini_service.generate_content(prompt)
+        return await get_gemini_service().generate_content(prompt)
@@ -1,10 +1,12 @@
 from typing import Optional
 import asyncio
+import time
 
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
 
 from app.services.generators.base_generator import BaseGenerator
+from app.utils.metrics import model_load_seconds
 
 
 class QwenGenerator(BaseGenerator):
@@ -34,6 +36,7 @@ class QwenGenerator(BaseGenerator):
         if self.initialized:
             return
 
+        start_time = time.time()
         self.tokenizer = AutoTokenizer.from_pretrained(
             self.model_name,
             trust_remote_code=True,
@@ -51,12 +54,17 @@ class QwenGenerator(BaseGenerator):
 
         self.model.eval()
         self.initialized = True
+        model_load_seconds.labels(model=self.model_name).set(time.time() - start_time)
 
     async def generate_content(self, prompt: str) -> Optional[str]:
         self._lazy_init()
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self._generate_sync, prompt)
 
+    def count_tokens(self, text: str) -> int:
+        self._lazy_init()
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
     def _build_messages(self, prompt: str):
         return [
             {
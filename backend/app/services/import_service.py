@@ -0,0 +1,577 @@
+"""
+Bulk import of a packed archive of videos and their context units.
+
+The archive is a zip with the videos and one manifest at its root:
+
+    lecture01.mp4
+    lecture02.mp4
+    context_units.jsonl        (or context_units.parquet)
+
+with one row per context unit:
+
+    {"video": "lecture01.mp4", "text": "...", "start_time": 0.0,
+     "end_time": 30.0, "embeddings": {"dangvantuan": [...], "halong": [...]}}
+
+`embeddings` is optional; in Parquet they are `embedding_<model>` list
+columns. A model whose vectors are given for every unit of a video is not
+run for it, and such videos are not refined (the vectors describe the text
+as given).
+
+Videos flow through store -> refine -> insert -> embed, several videos per
+stage at once. Each video's progress is saved after every durable stage, so
+a failed or interrupted import resumes where each video stopped.
+"""
+
+import asyncio
+import io
+import json
+import shutil
+import zipfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from fastapi import HTTPException, UploadFile, status
+from pydantic import ValidationError
+from pymongo import ReturnDocument
+from app.config import get_settings
+from app.database import get_database
+from app.models.context_unit import ContextUnit
+from app.models.import_job import IMPORT_STAGES, ImportJob, ImportVideo
+from app.models.video import Video
+from app.schemas.context_unit import ContextUnitData
+from app.schemas.import_job import ImportJobResponse, ImportVideoError
+from app.services.access_service import verify_workspace_access
+from app.services.tokenizers import get_tokenizer
+from app.services.vector_store import EMBEDDING_MODELS, get_vector_store
+from app.services.video_service import executor, refine_texts
+from app.utils.background import run_in_background
+from app.utils.db_helpers import prepare_id_filter
+from app.utils.metrics import bulk_units_processed_total
+from app.utils.pipeline import Stage, run_pipeline
+from app.utils.storage import extract_video_thumbnail, save_video_from_archive
+
+settings = get_settings()
+
+MANIFESTS = ("context_units.jsonl", "context_units.parquet")
+
+# A running import that has not saved progress for this long is resumable
+LEASE_SECONDS = 600
+# How often a running import renews its lease while a stage is still busy
+HEARTBEAT_SECONDS = 60
+
+_running: Set[asyncio.Task] = set()
+
+
+def _read_manifest(archive: zipfile.ZipFile, manifest: str) -> List[Dict]:
+    with archive.open(manifest) as f:
+        if manifest.endswith(".jsonl"):
+            return [
+                json.loads(line)
+                for line in io.TextIOWrapper(f, encoding="utf-8")
+                if line.strip()
+            ]
+
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet manifests need pyarrow installed")
+        # Zip members are not seekable, Parquet needs to seek
+        rows = pq.read_table(io.BytesIO(f.read())).to_pylist()
+
+    for row in rows:
+        embeddings = row.get("embeddings") or {}
+        for column in [c for c in row if c.startswith("embedding_")]:
+            vectors = row.pop(column)
+            if vectors is not None:
+                embeddings[column[len("embedding_") :]] = vectors
+        row["embeddings"] = embeddings
+    return rows
+
+
+def inspect_archive(archive_path: str) -> Tuple[str, Dict[str, List[Dict]]]:
+    """Validate an archive; returns its manifest and the units of each video."""
+    try:
+        archive = zipfile.ZipFile(archive_path)
+    except zipfile.BadZipFile:
+        raise ValueError("Archive is not a zip file")
+
+    with archive:
+        names = set(archive.namelist())
+        manifest = next((m for m in MANIFESTS if m in names), None)
+        if manifest is None:
+            raise ValueError(f"Archive has no {' or '.join(MANIFESTS)}")
+
+        units_by_video: Dict[str, List[Dict]] = {}
+        # Videos are stored and listed by base name, which must stay unique
+        member_by_name: Dict[str, str] = {}
+        for line, row in enumerate(_read_manifest(archive, manifest), start=1):
+            video = row.get("video")
+            if video not in names:
+                raise ValueError(f"Row {line}: video {video!r} is not in the archive")
+            name = PurePosixPath(video).name
+            if member_by_name.setdefault(name, video) != video:
+                raise ValueError(
+                    f"Row {line}: videos {member_by_name[name]!r} and {video!r} "
+                    f"share the file name {name!r}"
+                )
+            try:
+                unit = ContextUnitData(**row)
+            except ValidationError as e:
+                raise ValueError(f"Row {line}: {e}")
+            embeddings = row.get("embeddings") or {}
+            unknown = [model for model in embeddings if model not in EMBEDDING_MODELS]
+            if unknown:
+                raise ValueError(f"Row {line}: unknown embedding models {unknown}")
+
+            units_by_video.setdefault(video, []).append(
+                {
+                    "text": unit.text.strip(),
+                    "start_time": unit.start_time,
+                    "end_time": unit.end_time,
+                    "embeddings": embeddings,
+                }
+            )
+
+    if not units_by_video:
+        raise ValueError("Manifest has no context units")
+    return manifest, units_by_video
+
+
+def _to_response(job: Dict) -> ImportJobResponse:
+    stages = {stage: 0 for stage in IMPORT_STAGES}
+    for video in job["videos"]:
+        stages[video["stage"]] += 1
+
+    return ImportJobResponse(
+        id=str(job["_id"]),
+        workspace_id=job["workspace_id"],
+        status=job["status"],
+        total_videos=len(job["videos"]),
+        stages=stages,
+        failed=[
+            ImportVideoError(
+                filename=video["filename"], stage=video["stage"], error=video["error"]
+            )
+            for video in job["videos"]
+            if video.get("error")
+        ],
+        created_at=job["created_at"],
+        completed_at=job.get("completed_at"),
+    )
+
+
+class _ImportItem:
+    """One video moving through the pipeline."""
+
+    def __init__(self, index: int, video: Dict, units: List[Dict]):
+        self.index = index
+        self.filename = video["filename"]
+        self.video_id: Optional[str] = video.get("video_id")
+        self.stage = video["stage"]
+        self.units = units
+        self.texts = [unit["text"] for unit in units]
+        self.file_path: Optional[str] = None
+
+    def reached(self, stage: str) -> bool:
+        return IMPORT_STAGES.index(self.stage) >= IMPORT_STAGES.index(stage)
+
+    def precomputed(self) -> Dict[str, List[List[float]]]:
+        """Models whose vectors the archive gives for every unit."""
+        return {
+            model: [unit["embeddings"][model] for unit in self.units]
+            for model in EMBEDDING_MODELS
+            if all(model in unit["embeddings"] for unit in self.units)
+        }
+
+
+class _ImportRun:
+    def __init__(self, db, job: Dict):
+        self.db = db
+        self.job_id = job["_id"]
+        self.workspace_id = job["workspace_id"]
+        self.archive_path = job["archive_path"]
+        self.refine_texts_enabled = job["refine"]
+        self.tokenizer = get_tokenizer()
+
+    async def _save(self, item: _ImportItem, **fields):
+        prefix = f"videos.{item.index}"
+        await self.db.imports.update_one(
+            {"_id": self.job_id},
+            {
+                "$set": {
+                    **{f"{prefix}.{key}": value for key, value in fields.items()},
+                    "heartbeat_at": datetime.now(timezone.utc),
+                }
+            },
+        )
+
+    async def _advance(self, item: _ImportItem, stage: str):
+        item.stage = stage
+        await self._save(item, stage=stage)
+
+    async def store(self, item: _ImportItem):
+        if item.reached("stored"):
+            video = await self.db.videos.find_one(
+                {"_id": prepare_id_filter(item.video_id)}, {"file_path": 1}
+            )
+            item.file_path = video["file_path"]
+            return
+
+        if item.video_id is None:
+            video = Video(
+                workspace_id=self.workspace_id,
+                filename=PurePosixPath(item.filename).name,
+                file_path="",
+                file_size=0,
+                processing_status="processing",
+            )
+            result = await self.db.videos.insert_one(
+                video.model_dump(by_alias=True, exclude={"id"})
+            )
+            # Recorded right away so a retry reuses this document
+            item.video_id = str(result.inserted_id)
+            await self._save(item, video_id=item.video_id)
+
+        loop = asyncio.get_running_loop()
+        file_path, file_size = await loop.run_in_executor(
+            executor,
+            save_video_from_archive,
+            self.workspace_id,
+            self.archive_path,
+            item.filename,
+            item.video_id,
+        )
+        thumbnail = await loop.run_in_executor(
+            executor,
+            extract_video_thumbnail,
+            file_path,
+            self.workspace_id,
+            item.video_id,
+        )
+        thumbnail_path, duration = thumbnail or (None, None)
+
+        await self.db.videos.update_one(
+            {"_id": prepare_id_filter(item.video_id)},
+            {
+                "$set": {
+                    "file_path": file_path,
+                    "file_size": file_size,
+                    "thumbnail_path": thumbnail_path,
+                    "duration": duration,
+                    "processing_status": "processing",
+                }
+            },
+        )
+        item.file_path = file_path
+        await self._advance(item, "stored")
+
+    async def refine(self, item: _ImportItem):
+        if (
+            item.reached("inserted")
+            or not self.refine_texts_enabled
+            or item.precomputed()
+        ):
+            return
+        item.texts = await refine_texts(item.texts)
+
+    async def insert(self, item: _ImportItem):
+        if item.reached("inserted"):
+            return
+
+        # Units left by an attempt that failed halfway
+        await self.db.context_units.delete_many({"video_id": item.video_id})
+        await self.db.context_units.insert_many(
+            [
+                ContextUnit(
+                    video_id=item.video_id,
+                    video_path=item.file_path,
+                    text=text,
+                    start_time=unit["start_time"],
+                    end_time=unit["end_time"],
+                    tokens=self.tokenizer.tokenize(text),
+                    tokenizer=self.tokenizer.name,
+                ).model_dump(by_alias=True, exclude={"id"})
+                for unit, text in zip(item.units, item.texts)
+            ]
+        )
+        await self._advance(item, "inserted")
+
+    async def embed(self, item: _ImportItem):
+        # insert_many assigns ascending ids, so _id order is archive order
+        units = (
+            await self.db.context_units.find(
+                {"video_id": item.video_id}, {"text": 1, "start_time": 1, "end_time": 1}
+            )
+            .sort("_id", 1)
+            .to_list(None)
+        )
+        context_units = [
+            ContextUnit(
+                _id=str(unit["_id"]),
+                video_id=item.video_id,
+                video_path=item.file_path,
+                text=unit["text"],
+                start_time=unit["start_time"],
+                end_time=unit["end_time"],
+            )
+            for unit in units
+        ]
+        embeddings = item.precomputed() if len(units) == len(item.units) else {}
+
+        await asyncio.get_running_loop().run_in_executor(
+            executor,
+            get_vector_store().upsert_context_units,
+            self.workspace_id,
+            item.video_id,
+            item.file_path,
+            context_units,
+            embeddings,
+        )
+
+        await self.db.videos.update_one(
+            {"_id": prepare_id_filter(item.video_id)},
+            {
+                "$set": {
+                    "processing_status": "completed",
+                    "processed_at": datetime.now(timezone.utc),
+                }
+            },
+        )
+        await self._advance(item, "embedded")
+        bulk_units_processed_total.labels(operation="import").inc(len(units))
+
+    async def on_error(self, item: _ImportItem, stage: str, error: Exception):
+        print(f"Import {self.job_id}: {item.filename} failed at {stage}: {error}")
+        await self._save(item, error=f"{stage}: {error}")
+        if item.video_id is not None:
+            await self.db.videos.update_one(
+                {"_id": prepare_id_filter(item.video_id)},
+                {"$set": {"processing_status": "failed"}},
+            )
+
+    async def run(self, videos: List[Dict], units_by_video: Dict[str, List[Dict]]):
+        items = [
+            _ImportItem(index, video, units_by_video[video["filename"]])
+            for index, video in enumerate(videos)
+            if video["stage"] != "embedded"
+        ]
+        workers = settings.import_stage_workers
+        await run_pipeline(
+            items,
+            [
+                Stage("store", self.store, workers),
+                Stage("refine", self.refine, workers),
+                Stage("insert", self.insert, workers),
+                Stage("embed", self.embed, workers),
+            ],
+            self.on_error,
+        )
+
+
+async def _heartbeat(db, import_id: ObjectId):
+    """Renew the lease so a long store or embed stage is not taken for a crash."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        try:
+            await db.imports.update_one(
+                {"_id": import_id, "status": "running"},
+                {"$set": {"heartbeat_at": datetime.now(timezone.utc)}},
+            )
+        except Exception as e:
+            print(f"Import {import_id}: heartbeat failed: {e}")
+
+
+async def _run_import(import_id: ObjectId):
+    db = await get_database()
+    job = await db.imports.find_one({"_id": import_id})
+
+    # Errors of an earlier attempt are retried now
+    await db.imports.update_one(
+        {"_id": import_id},
+        {"$set": {f"videos.{i}.error": None for i in range(len(job["videos"]))}},
+    )
+
+    heartbeat = asyncio.create_task(_heartbeat(db, import_id))
+    try:
+        _, units_by_video = await asyncio.get_running_loop().run_in_executor(
+            executor, inspect_archive, job["archive_path"]
+        )
+        await _ImportRun(db, job).run(job["videos"], units_by_video)
+    except asyncio.CancelledError:
+        await db.imports.update_one(
+            {"_id": import_id}, {"$set": {"status": "interrupted"}}
+        )
+        raise
+    except Exception as e:
+        print(f"Import {import_id} failed: {e}")
+        await db.imports.update_one(
+            {"_id": import_id}, {"$set": {"status": "failed", "error": str(e)}}
+        )
+        return
+    finally:
+        heartbeat.cancel()
+
+    job = await db.imports.find_one(
+        {"_id": import_id}, {"videos": 1, "archive_path": 1}
+    )
+    if any(video["stage"] != "embedded" for video in job["videos"]):
+        await db.imports.update_one({"_id": import_id}, {"$set": {"status": "failed"}})
+        return
+
+    await db.imports.update_one(
+        {"_id": import_id},
+        {"$set": {"status": "completed", "completed_at": datetime.now(timezone.utc)}},
+    )
+    Path(job["archive_path"]).unlink(missing_ok=True)
+    print(f"Import {import_id} completed: {len(job['videos'])} videos")
+
+
+def _start(import_id: ObjectId):
+    task = run_in_background(_run_import(import_id), name=f"import_{import_id}")
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+def _resumable(now: datetime) -> Dict:
+    stale = now - timedelta(seconds=LEASE_SECONDS)
+    return {
+        "$or": [
+            {"status": {"$in": ["failed", "interrupted"]}},
+            {"status": "running", "heartbeat_at": {"$lt": stale}},
+        ]
+    }
+
+
+async def create_import(
+    workspace_id: str, user_id: str, archive: UploadFile, refine: bool = True
+) -> ImportJobResponse:
+    db = await get_database()
+
+    await verify_workspace_access(workspace_id, user_id)
+
+    import_dir = Path(settings.import_dir)
+    import_dir.mkdir(parents=True, exist_ok=True)
+    import_id = ObjectId()
+    archive_path = str(import_dir / f"{import_id}.zip")
+
+    loop = asyncio.get_running_loop()
+
+    def save_archive():
+        with open(archive_path, "wb") as buffer:
+            shutil.copyfileobj(archive.file, buffer)
+
+    await loop.run_in_executor(executor, save_archive)
+
+    try:
+        manifest, units_by_video = await loop.run_in_executor(
+            executor, inspect_archive, archive_path
+        )
+    except ValueError as e:
+        Path(archive_path).unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid import archive: {e}",
+        )
+
+    job = ImportJob(
+        workspace_id=workspace_id,
+        user_id=user_id,
+        archive_path=archive_path,
+        manifest=manifest,
+        refine=refine,
+        status="running",
+        videos=[ImportVideo(filename=video) for video in units_by_video],
+        heartbeat_at=datetime.now(timezone.utc),
+    )
+    job_dict = job.model_dump(by_alias=True, exclude={"id"})
+    job_dict["_id"] = import_id
+    await db.imports.insert_one(job_dict)
+
+    _start(import_id)
+    return _to_response(job_dict)
+
+
+async def get_import(
+    workspace_id: str, import_id: str, user_id: str
+) -> ImportJobResponse:
+    db = await get_database()
+
+    await verify_workspace_access(workspace_id, user_id)
+
+    job = await db.imports.find_one(
+        {"_id": prepare_id_filter(import_id), "workspace_id": workspace_id}
+    )
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Import not found"
+        )
+    return _to_response(job)
+
+
+async def resume_import(
+    workspace_id: str, import_id: str, user_id: str
+) -> ImportJobResponse:
+    db = await get_database()
+
+    await verify_workspace_access(workspace_id, user_id)
+
+    now = datetime.now(timezone.utc)
+    job = await db.imports.find_one_and_update(
+        {
+            "_id": prepare_id_filter(import_id),
+            "workspace_id": workspace_id,
+            **_resumable(now),
+        },
+        {"$set": {"status": "running", "heartbeat_at": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not job:
+        existing = await db.imports.find_one(
+            {"_id": prepare_id_filter(import_id), "workspace_id": workspace_id},
+            {"status": 1},
+        )
+        if not existing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Import not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Import is {existing['status']}",
+        )
+
+    _start(job["_id"])
+    return _to_response(job)
+
+
+async def resume_interrupted_imports():
+    """Pick up imports cut off by a shutdown or crash (called at startup)."""
+    db = await get_database()
+    while True:
+        now = datetime.now(timezone.utc)
+        # Claimed one at a time so several workers split them
+        job = await db.imports.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "interrupted"},
+                    {
+                        "status": "running",
+                        "heartbeat_at": {"$lt": now - timedelta(seconds=LEASE_SECONDS)},
+                    },
+                ]
+            },
+            {"$set": {"status": "running", "heartbeat_at": now}},
+            {"_id": 1},
+        )
+        if not job:
+            return
+        print(f"Resuming import {job['_id']}")
+        _start(job["_id"])
+
+
+async def stop_imports():
+    """Cancel running imports; they are marked interrupted and resume later."""
+    tasks = list(_running)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
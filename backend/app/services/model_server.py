@@ -0,0 +1,333 @@
+"""
+Shared model server: one copy of the embedding models and the reranker for
+every uvicorn worker on the host.
+
+Start it next to the API and point MODEL_SERVER_SOCKET at the same path:
+
+    python -m app.services.model_server
+
+Workers connect over a Unix socket (authenticated with SECRET_KEY). Requests
+for the same model from all workers are coalesced into one model call. When
+MODEL_SERVER_SOCKET is unset or the server is unreachable, workers load the
+models in-process as before.
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Dict, List, Optional, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+
+# Seconds before retrying a server that failed to answer
+RETRY_INTERVAL = 5.0
+
+
+class ModelServerUnavailable(Exception):
+    pass
+
+
+class ModelServerClient:
+    """Blocking client; one connection per thread (calls run in executors)."""
+
+    def __init__(self, address: str, authkey: bytes, timeout: float = 30.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._healthy = False
+        self._last_failure = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, op: str, *args):
+        try:
+            conn = self._connection()
+            conn.send((op, args))
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"no answer to {op} in {self.timeout}s")
+            status, result = conn.recv()
+        except (OSError, EOFError) as e:
+            # TimeoutError and refused/missing sockets are OSErrors too
+            self._drop_connection()
+            self._healthy = False
+            self._last_failure = time.monotonic()
+            raise ModelServerUnavailable(str(e)) from e
+
+        self._healthy = True
+        if status != "ok":
+            raise RuntimeError(f"Model server error: {result}")
+        return result
+
+    def available(self) -> bool:
+        if self._healthy:
+            return True
+        if time.monotonic() - self._last_failure < RETRY_INTERVAL:
+            return False
+        try:
+            self.call("ping")
+        except ModelServerUnavailable as e:
+            print(f"Model server at {self.address} unavailable: {e}")
+            return False
+        return True
+
+    def embed(self, embedding_model: str, texts: List[str]) -> List[List[float]]:
+        return self.call("embed", embedding_model, texts)
+
+    def rerank(self, model_name: str, pairs: List[List[str]]) -> List[float]:
+        return self.call("rerank", model_name, pairs)
+
+
+_client: Optional[ModelServerClient] = None
+
+
+def get_model_server_client() -> Optional[ModelServerClient]:
+    """None unless MODEL_SERVER_SOCKET is configured."""
+    global _client
+    if _client is None and settings.model_server_socket:
+        _client = ModelServerClient(
+            settings.model_server_socket,
+            settings.secret_key.encode(),
+            settings.model_server_timeout,
+        )
+    return _client
+
+
+def model_server_available() -> bool:
+    client = get_model_server_client()
+    return client is not None and client.available()
+
+
+class _Job:
+    def __init__(self, items: List):
+        self.items = items
+        self.result: Optional[List] = None
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+
+class _Batcher:
+    """
+    Runs one model on its own thread, merging the jobs queued by all
+    connections within `max_wait` seconds (up to `max_batch` items) into a
+    single call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[], Callable[[List], List]],
+        max_batch: int,
+        max_wait: float,
+    ):
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._load = load
+        self._queue: "queue.Queue[_Job]" = queue.Queue()
+
+        threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True).start()
+
+    def submit(self, items: List) -> List:
+        job = _Job(items)
+        self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _collect(self) -> List[_Job]:
+        jobs = [self._queue.get()]
+        size = len(jobs[0].items)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            size += len(job.items)
+        return jobs
+
+    def _run(self):
+        try:
+            run = self._load()
+        except Exception as e:
+            print(f"Failed to load {self.name}: {e}")
+            while True:
+                job = self._queue.get()
+                job.error = RuntimeError(f"{self.name} failed to load: {e}")
+                job.done.set()
+
+        while True:
+            jobs = self._collect()
+            items = [item for job in jobs for item in job.items]
+            try:
+                results = run(items) if items else []
+            except Exception as e:
+                for job in jobs:
+                    job.error = e
+                    job.done.set()
+                continue
+
+            offset = 0
+            for job in jobs:
+                job.result = results[offset : offset + len(job.items)]
+                offset += len(job.items)
+                job.done.set()
+
+            if len(jobs) > 1:
+                print(f"{self.name}: {len(items)} items from {len(jobs)} requests")
+
+
+class ModelServer:
+    def __init__(
+        self,
+        address: str,
+        authkey: bytes,
+        max_batch: int = 64,
+        max_wait: float = 0.005,
+    ):
+        self.address = address
+        self.authkey = authkey
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._batchers: Dict[Tuple[str, str], _Batcher] = {}
+        self._lock = threading.Lock()
+
+    def _load_embedder(self, embedding_model: str):
+        from app.services.vector_store import load_embedding_model
+
+        model = load_embedding_model(embedding_model)
+        return model.embed_documents
+
+    def _load_reranker(self, model_name: str):
+        from app.services.reranker_service import RerankerService
+
+        reranker = RerankerService(model_name)
+        reranker._load_model()
+        return lambda pairs: reranker.model.predict(pairs).tolist()
+
+    def _batcher(self, op: str, model: str) -> _Batcher:
+        key = (op, model)
+        with self._lock:
+            if key not in self._batchers:
+                if op == "embed":
+                    from app.services.vector_store import EMBEDDING_MODELS
+
+                    if model not in EMBEDDING_MODELS:
+                        raise ValueError(f"Unknown embedding model: {model}")
+                    load = lambda: self._load_embedder(model)  # noqa: E731
+                else:
+                    load = lambda: self._load_reranker(model)  # noqa: E731
+                self._batchers[key] = _Batcher(
+                    f"{op}:{model}", load, self.max_batch, self.max_wait
+                )
+            return self._batchers[key]
+
+    def handle(self, op: str, args: Tuple):
+        if op == "ping":
+            return sorted(f"{op}:{model}" for op, model in self._batchers)
+        if op in ("embed", "rerank"):
+            model, items = args
+            return self._batcher(op, model).submit(items)
+        raise ValueError(f"Unknown operation: {op}")
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = ("ok", self.handle(op, args))
+                except Exception as e:
+                    response = ("error", str(e))
+                try:
+                    conn.send(response)
+                except OSError:
+                    return
+
+    def serve_forever(self, preload: List[Tuple[str, str]] = ()):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        # Listen before loading so workers connect (and wait) instead of
+        # falling back to their own copies while the models load
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            for op, model in preload:
+                self._batcher(op, model)
+            print(f"Model server listening on {self.address}")
+
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # Failed handshakes (wrong key, dropped clients) only
+                    print(f"Rejected model server connection: {e}")
+                    continue
+                threading.Thread(
+                    target=self._serve_connection, args=(conn,), daemon=True
+                ).start()
+
+
+def main(argv: Optional[List[str]] = None):
+    from app.services.vector_store import EMBEDDING_MODELS
+    from app.services.reranker_service import DEFAULT_RERANKER_MODEL
+
+    parser = argparse.ArgumentParser(description="Shared model server")
+    parser.add_argument(
+        "--socket",
+        default=settings.model_server_socket,
+        help="Unix socket path (default: MODEL_SERVER_SOCKET)",
+    )
+    parser.add_argument(
+        "--max-batch", type=int, default=settings.model_server_max_batch
+    )
+    parser.add_argument(
+        "--max-wait", type=float, default=settings.model_server_batch_wait
+    )
+    parser.add_argument(
+        "--no-reranker", action="store_true", help="Load the reranker on first use"
+    )
+    args = parser.parse_args(argv)
+    if not args.socket:
+        parser.error("Set MODEL_SERVER_SOCKET or pass --socket")
+
+    preload = [("embed", model) for model in EMBEDDING_MODELS]
+    if not args.no_reranker:
+        preload.append(("rerank", DEFAULT_RERANKER_MODEL))
+
+    server = ModelServer(
+        args.socket, settings.secret_key.encode(), args.max_batch, args.max_wait
+    )
+    server.serve_forever(preload)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    main()
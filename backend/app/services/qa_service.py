@@ -1,38 +1,90 @@
+import asyncio
 import time
-from typing import List, Tuple, Dict, Optional
+from typing import AsyncIterator, List, Tuple, Dict, Optional, Union
 from fastapi import HTTPException, status
 from app.database import get_database
+from app.services.access_service import verify_workspace_access
+from app.services.admission_controller import ask_admission
+from app.services.conversation_memory import conversation_memory
 from app.models.qa import QA
 from app.models.context_unit import ContextUnit
+from app.schemas.qa import QuestionRequest
 from app.services.rag_service import rag_service
+from app.services.workspace_layers import get_workspace_layers
+from app.services.retrievers import RetrievedContext, SourceUnit, source_units
+from app.utils.background import run_in_background
 from app.utils.db_helpers import prepare_id_filter, convert_objectid_to_str
+from app.utils.stage_timer import stage
+from app.config import get_settings
 from datetime import datetime, timezone
 
+settings = get_settings()
 
-async def fetch_context_units_by_ids(db, context_ids: List[str]) -> List[ContextUnit]:
+# Only the fields needed to build ContextUnitResponse (skips stored tokens)
+CONTEXT_UNIT_PROJECTION = {
+    "_id": 1,
+    "video_id": 1,
+    "video_path": 1,
+    "text": 1,
+    "start_time": 1,
+    "end_time": 1,
+}
 
+
+async def fetch_context_units_map(db, context_ids: List[str]) -> Dict[str, ContextUnit]:
+
+    context_ids = list({cid for cid in context_ids if cid})
     if not context_ids:
-        return []
+        return {}
 
     try:
-        object_ids = [prepare_id_filter(cid) for cid in context_ids if cid]
-        contexts = await db.context_units.find({"_id": {"$in": object_ids}}).to_list(
-            None
-        )
+        object_ids = [prepare_id_filter(cid) for cid in context_ids]
+        contexts = await db.context_units.find(
+            {"_id": {"$in": object_ids}}, CONTEXT_UNIT_PROJECTION
+        ).to_list(None)
+
+        return {
+            str(ctx["_id"]): ContextUnit(**convert_objectid_to_str(ctx))
+            for ctx in contexts
+        }
+    except Exception as e:
+        print(f"Error fetching context units: {e}")
+        return {}
 
-        # Convert and maintain order
-        id_to_context = {str(ctx["_id"]): ctx for ctx in contexts}
-        ordered_contexts = []
 
-        for cid in context_ids:
-            if cid and cid in id_to_context:
-                ctx_dict = convert_objectid_to_str(id_to_context[cid])
-                ordered_contexts.append(ContextUnit(**ctx_dict))
+def collect_sources(contexts: List[RetrievedContext]) -> List[SourceUnit]:
+    """
+    Every stored unit behind the packed contexts, merged windows included,
+    with its untrimmed text: the same units /history later loads by id.
+    """
+    units: Dict[str, SourceUnit] = {}
+    for ctx in contexts:
+        for unit in source_units(ctx):
+            units.setdefault(unit["id"], unit)
+    return list(units.values())
 
-        return ordered_contexts
-    except Exception as e:
-        print(f"Error fetching context units: {e}")
-        return []
+
+async def _persist_qa(
+    db, qa: QA, generator_type: str, remember_turn: bool = False
+) -> None:
+    qa_dict = qa.model_dump(by_alias=True, exclude={"id"})
+
+    # Runs after the response, so it only reaches the histogram
+    with stage("persistence", {}):
+        await asyncio.gather(
+            db.qa.insert_one(qa_dict),
+            db.workspaces.update_one(
+                {"_id": prepare_id_filter(qa.workspace_id)},
+                {"$set": {"updated_at": datetime.now(timezone.utc)}},
+            ),
+        )
+
+    # The summary costs a generation call, so only conversations that read
+    # it keep it up to date
+    if remember_turn:
+        await conversation_memory.record_turn(
+            qa.workspace_id, qa.question, qa.answer, generator_type
+        )
 
 
 async def ask_question(
@@ -46,21 +98,18 @@ async def ask_question(
     use_reranker: bool = False,
     use_history: bool = False,
     history_count: int = 3,
-) -> Tuple[str, str, List[ContextUnit], float]:
+    fusion_method: str = "rrf",
+    fusion_weights: Optional[Dict[str, float]] = None,
+    neighbor_window: int = 0,
+    context_token_budget: Optional[int] = None,
+) -> Tuple[str, str, List[SourceUnit], float, Dict]:
     db = await get_database()
 
-    workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
-    )
-
-    if not workspace_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Workspace not found",
-        )
+    await verify_workspace_access(workspace_id, user_id)
 
+    layers = await get_workspace_layers(workspace_id)
     videos_count = await db.videos.count_documents(
-        {"workspace_id": workspace_id, "processing_status": "completed"}
+        {**layers.video_filter(), "processing_status": "completed"}
     )
 
     if videos_count == 0:
@@ -69,23 +118,15 @@ async def ask_question(
             detail="No processed videos available in this workspace",
         )
 
-    conversation_history = None
+    # history_count is kept for compatibility, 0 still disables history
+    conversation_summary = None
     if use_history and history_count > 0:
-        history_records = (
-            await db.qa.find({"workspace_id": workspace_id})
-            .sort("created_at", -1)
-            .limit(history_count)
-            .to_list(history_count)
-        )
-
-        conversation_history = [
-            {"question": record["question"], "answer": record["answer"]}
-            for record in reversed(history_records)
-        ]
+        with stage("history"):
+            conversation_summary = await conversation_memory.get_summary(workspace_id)
 
     # Measure response time
     start_time = time.time()
-    answer, context_ids = await rag_service.answer_question(
+    answer, contexts, timing = await rag_service.answer_question(
         workspace_id,
         question,
         video_ids,
@@ -93,92 +134,219 @@ async def ask_question(
         generator_type,
         embedding_model,
         use_reranker,
-        conversation_history,
+        conversation_summary,
+        fusion_method,
+        fusion_weights,
+        neighbor_window,
+        context_token_budget,
     )
     response_time = time.time() - start_time
 
+    # Sources are the stored units, not the trimmed or merged prompt passages,
+    # so /ask and /history list the same contexts
+    sources = collect_sources(contexts)
+
     # Save Q&A record
     qa = QA(
         workspace_id=workspace_id,
         question=question,
         answer=answer,
-        source_context_ids=context_ids,
+        source_context_ids=[unit["id"] for unit in sources],
         response_time=response_time,
+        stage_timings=timing["stages"],
     )
-    qa_dict = qa.model_dump(by_alias=True, exclude={"id"})
-    result = await db.qa.insert_one(qa_dict)
 
-    await db.workspaces.update_one(
-        {"_id": prepare_id_filter(workspace_id)},
-        {"$set": {"updated_at": datetime.now(timezone.utc)}},
+    # The writes run in the background instead of delaying the answer
+    run_in_background(
+        _persist_qa(db, qa, generator_type, use_history and history_count > 0),
+        name="persist_qa",
     )
 
-    # Fetch full context unit data for response
-    context_units = await fetch_context_units_by_ids(db, context_ids)
+    return question, answer, sources, response_time, timing
 
-    return question, answer, context_units, response_time
 
+async def _stream_batch_answers(
+    db,
+    workspace_id: str,
+    requests: List[QuestionRequest],
+    conversation_summaries: List[Optional[str]],
+    max_concurrency: int,
+    user_id: str,
+) -> AsyncIterator[Tuple[int, Union[Tuple, Exception]]]:
+    start_time = time.time()
+    async for index, result in rag_service.answer_questions_batch(
+        workspace_id,
+        requests,
+        conversation_summaries,
+        max_concurrency,
+        # Charged like separate requests, one slot per LLM call
+        lambda: ask_admission.admit(user_id),
+    ):
+        if isinstance(result, Exception):
+            yield index, result
+            continue
+
+        answer, contexts, timing = result
+        response_time = time.time() - start_time
+
+        sources = collect_sources(contexts)
+        qa = QA(
+            workspace_id=workspace_id,
+            question=requests[index].question,
+            answer=answer,
+            source_context_ids=[unit["id"] for unit in sources],
+            response_time=response_time,
+            stage_timings=timing["stages"],
+        )
+        run_in_background(
+            _persist_qa(
+                db,
+                qa,
+                requests[index].generator_type,
+                conversation_summaries[index] is not None,
+            ),
+            name="persist_qa",
+        )
+
+        yield index, (
+            requests[index].question,
+            answer,
+            sources,
+            response_time,
+            timing,
+        )
 
-async def get_qa_history(
-    workspace_id: str, user_id: str
-) -> List[Tuple[QA, List[ContextUnit]]]:
 
+async def ask_questions_batch(
+    workspace_id: str,
+    user_id: str,
+    requests: List[QuestionRequest],
+    max_concurrency: Optional[int] = None,
+) -> AsyncIterator[Tuple[int, Union[Tuple, Exception]]]:
+    """
+    Validate a batch once and return an iterator of (index, result).
+
+    Results arrive in completion order; each is either the same tuple as
+    ask_question or the exception that question failed with. Checks run
+    before the iterator is returned so they can still fail the request.
+    """
     db = await get_database()
 
-    # Verify workspace exists and user has access
-    workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
-    )
+    await verify_workspace_access(workspace_id, user_id)
 
-    if not workspace_dict:
+    if not requests or len(requests) > settings.batch_max_questions:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Workspace not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch takes between 1 and {settings.batch_max_questions} questions",
         )
 
-    # Get Q&A history from database
-    qa_cursor = db.qa.find({"workspace_id": workspace_id}).sort("created_at", 1)
-    qas_with_contexts = []
+    layers = await get_workspace_layers(workspace_id)
+    videos_count = await db.videos.count_documents(
+        {**layers.video_filter(), "processing_status": "completed"}
+    )
 
-    async for qa_dict in qa_cursor:
-        qa_dict = convert_objectid_to_str(qa_dict)
-        qa = QA(**qa_dict)
+    if videos_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No processed videos available in this workspace",
+        )
 
-        context_units = await fetch_context_units_by_ids(db, qa.source_context_ids)
+    # One summary read serves every question that asks for history
+    summary = None
+    if any(r.use_history and r.history_count > 0 for r in requests):
+        with stage("history"):
+            summary = await conversation_memory.get_summary(workspace_id)
 
-        qas_with_contexts.append((qa, context_units))
+    conversation_summaries = [
+        summary if r.use_history and r.history_count > 0 else None for r in requests
+    ]
 
-    return qas_with_contexts
+    return _stream_batch_answers(
+        db,
+        workspace_id,
+        requests,
+        conversation_summaries,
+        min(
+            max_concurrency or settings.batch_generation_concurrency,
+            settings.batch_generation_concurrency,
+        ),
+        user_id,
+    )
 
 
-async def delete_all_qa_records(workspace_id: str, user_id: str) -> None:
+async def get_qa_history(
+    workspace_id: str,
+    user_id: str,
+    limit: Optional[int] = None,
+    before: Optional[str] = None,
+) -> List[Tuple[QA, List[ContextUnit]]]:
+    """
+    Q&A history page in chronological order.
+
+    Pages walk backwards with a (created_at, _id) cursor: `before` is the id
+    of the oldest record of the previous page. Source contexts of the whole
+    page are fetched with one query.
+    """
     db = await get_database()
 
-    workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
+    # Verify workspace exists and user has access
+    await verify_workspace_access(workspace_id, user_id)
+
+    query = {"workspace_id": workspace_id}
+
+    if before:
+        cursor_qa = await db.qa.find_one(
+            {"_id": prepare_id_filter(before), "workspace_id": workspace_id},
+            {"created_at": 1},
+        )
+        if not cursor_qa:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid history cursor",
+            )
+        query["$or"] = [
+            {"created_at": {"$lt": cursor_qa["created_at"]}},
+            {"created_at": cursor_qa["created_at"], "_id": {"$lt": cursor_qa["_id"]}},
+        ]
+
+    # Newest first so the limit keeps the latest records, then restore order
+    qa_cursor = db.qa.find(query).sort([("created_at", -1), ("_id", -1)])
+    if limit:
+        qa_cursor = qa_cursor.limit(limit)
+
+    qas = [QA(**convert_objectid_to_str(qa_dict)) async for qa_dict in qa_cursor]
+    qas.reverse()
+
+    id_to_context = await fetch_context_units_map(
+        db, [cid for qa in qas for cid in qa.source_context_ids]
     )
 
-    if not workspace_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Workspace not found",
+    return [
+        (
+            qa,
+            [
+                id_to_context[cid]
+                for cid in qa.source_context_ids
+                if cid in id_to_context
+            ],
         )
+        for qa in qas
+    ]
+
+
+async def delete_all_qa_records(workspace_id: str, user_id: str) -> None:
+    db = await get_database()
+
+    await verify_workspace_access(workspace_id, user_id)
 
     await db.qa.delete_many({"workspace_id": workspace_id})
+    await conversation_memory.reset(workspace_id)
 
 
 async def delete_qa_record(workspace_id: str, qa_id: str, user_id: str) -> None:
     db = await get_database()
 
-    workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
-    )
-
-    if not workspace_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Workspace not found",
-        )
+    await verify_workspace_access(workspace_id, user_id)
 
     result = await db.qa.delete_one(
         {
@@ -1,45 +1,51 @@
 import asyncio
-from typing import List, Tuple, Optional, Dict
-import time
-from app.services.retrievers import get_retriever
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from app.services.retrievers import get_retriever, RetrievedContext
 from app.services.generators import get_generator
-from app.services.reranker_service import reranker_service
+from app.services.reranker_service import get_reranker_service
+from app.services.temporal_index import temporal_index
+from app.services.context_packer import context_packer
+from app.schemas.qa import QuestionRequest
+from app.utils.stage_timer import current_stages, stage, start_stage_recording
+from app.config import get_settings
 
+settings = get_settings()
+
+# Contexts fetched for the reranker, and kept for the prompt
+RERANK_RETRIEVAL_COUNT = 20
+FINAL_COUNT = 8
 
-def format_conversation_history(history: List[Dict[str, str]]) -> str:
-    if not history:
-        return ""
 
-    history_text = "\nLịch sử hội thoại trước đó:\n"
-    for i, qa in enumerate(history, 1):
-        question = qa.get("question", "")
-        answer = qa.get("answer", "")
-        if len(answer) > 200:
-            answer = answer[:200] + "..."
-        history_text += f"[{i}] Người dùng: {question}\n"
-        history_text += f"    Trả lời: {answer}\n\n"
+def format_conversation_summary(summary: Optional[str]) -> str:
+    if not summary:
+        return ""
 
-    return history_text
+    return f"\nTóm tắt hội thoại trước đó:\n{summary}\n"
 
 
 def get_query_refinement_prompt(
     retriever_type: str,
     query: str,
-    conversation_history: Optional[List[Dict[str, str]]] = None,
+    conversation_summary: Optional[str] = None,
 ) -> str:
 
-    history_section = (
-        format_conversation_history(conversation_history)
-        if conversation_history
-        else ""
-    )
+    history_section = format_conversation_summary(conversation_summary)
 
     history_instruction = ""
     if history_section:
         history_instruction = """
-- Dựa vào lịch sử hội thoại để hiểu ngữ cảnh
-- Thay thế các đại từ (nó, này, đó, mạng đó, phương pháp này...) bằng danh từ cụ thể từ lịch sử
-- Câu viết lại phải độc lập, không cần lịch sử vẫn hiểu được"""
+- Dựa vào tóm tắt hội thoại để hiểu ngữ cảnh
+- Thay thế các đại từ (nó, này, đó, mạng đó, phương pháp này...) bằng danh từ cụ thể từ tóm tắt
+- Câu viết lại phải độc lập, không cần tóm tắt vẫn hiểu được"""
 
     if retriever_type == "vector":
         return f"""
@@ -71,7 +77,7 @@ Yêu cầu:
 Query đã tối ưu:
 """.strip()
 
-    elif retriever_type == "hybrid":
+    elif retriever_type in ("hybrid", "ensemble"):
         return f"""
 Viết lại câu hỏi phù hợp với semantic search (vector) và text search (BM25).
 {history_section}
@@ -132,61 +138,69 @@ Câu hỏi: {question}
 Trả lời:
 """
 
-    async def answer_question(
+    async def _refine_query(
         self,
-        workspace_id: str,
+        generator,
+        retriever_type: str,
         question: str,
-        video_ids: Optional[List[str]] = None,
-        retriever_type: str = "vector",
-        generator_type: str = "gemini",
-        embedding_model: str = "dangvantuan",
-        use_reranker: bool = False,
-        conversation_history: Optional[List[Dict[str, str]]] = None,
-    ) -> Tuple[str, List[str]]:
-        # Get retriever and generator instances
-        retriever = get_retriever(retriever_type, embedding_model)
-        generator = get_generator(generator_type)
-
-        # Refine query for better vector search (with conversation history if available)
+        conversation_summary: Optional[str],
+        stages: Dict[str, float],
+    ) -> str:
+        # Refine query for better vector search (with conversation summary if available)
         query_refinement_prompt = get_query_refinement_prompt(
-            retriever_type, question, conversation_history
+            retriever_type, question, conversation_summary
         )
 
-        start_time = time.time()
-        refined_query = await generator.generate_content(query_refinement_prompt)
-        end_time = time.time()
-        print(f"Query refinement took {(end_time - start_time):.2f} seconds.")
+        with stage("refinement", stages):
+            refined_query = await generator.generate_content(query_refinement_prompt)
+        print(f"Query refinement took {stages['refinement']:.2f} seconds.")
         print(f"Refined query: {refined_query}")
 
         # Use refined query if available, otherwise use original
-        search_query = refined_query if refined_query is not None else question
+        return refined_query if refined_query is not None else question
 
-        retrieval_count = 20 if use_reranker else 8
-        final_count = 8
-
-        start_time = time.time()
-        retrieved_contexts = await retriever.query_similar_contexts(
-            workspace_id, search_query, retrieval_count, video_ids
-        )
-        end_time = time.time()
-        print(f"Retrieval took {(end_time - start_time):.2f} seconds.")
-
-        if use_reranker and retrieved_contexts:
-            retrieved_contexts = reranker_service.rerank(
-                query=search_query,
-                contexts=retrieved_contexts,
-                top_n=final_count,
-            )
+    async def _complete_answer(
+        self,
+        workspace_id: str,
+        question: str,
+        search_query: str,
+        retrieved_contexts: List[RetrievedContext],
+        generator,
+        embedding_model: str,
+        neighbor_window: int,
+        context_token_budget: Optional[int],
+        timing: Dict,
+    ) -> Tuple[str, List[RetrievedContext], Dict]:
+        """Expansion, packing and generation for already ranked contexts."""
+        stages = timing["stages"]
+
+        if neighbor_window > 0 and retrieved_contexts:
+            with stage("expansion", stages):
+                retrieved_contexts = await temporal_index.expand(
+                    retrieved_contexts, neighbors=neighbor_window
+                )
+
+        if retrieved_contexts:
+            with stage("packing", stages):
+                retrieved_contexts, context_tokens = await context_packer.pack(
+                    search_query,
+                    retrieved_contexts,
+                    generator,
+                    workspace_id,
+                    context_token_budget or settings.context_token_budget,
+                    embedding_model,
+                )
+            timing["context_tokens"] = context_tokens
 
         if not retrieved_contexts:
             return (
                 "I don't have enough information from the uploaded videos to answer this question.",
                 [],
+                timing,
             )
 
-        # Build context text and collect context IDs
+        # Build context text
         context_text = ""
-        context_ids = []
 
         for idx, ctx in enumerate(retrieved_contexts):
             context_text += f"\n[Context {idx+1}]\n"
@@ -194,25 +208,225 @@ Trả lời:
             context_text += f"Time: {ctx['metadata']['start_time']:.2f}s - {ctx['metadata']['end_time']:.2f}s\n"
             context_text += f"Content: {ctx['text']}\n"
 
-            # Collect context ID if available
-            if "id" in ctx:
-                context_ids.append(ctx["id"])
-            elif "_id" in ctx["metadata"]:
-                context_ids.append(str(ctx["metadata"]["_id"]))
-
         # Generate answer using selected generator
         prompt = self.prompt_template.format(context=context_text, question=question)
+        timing["prompt_tokens"] = generator.count_tokens(prompt)
 
-        start_time = time.time()
-        answer = await generator.generate_content(prompt)
-        end_time = time.time()
-        print(f"Answer generation took {(end_time - start_time):.2f} seconds.")
+        with stage("generation", stages):
+            answer = await generator.generate_content(prompt)
+        print(f"Answer generation took {stages['generation']:.2f} seconds.")
 
         # Handle case where Gemini returns None (blocked by safety/copyright)
         if answer is None:
             answer = "Xin lỗi, tôi không thể tạo câu trả lời lúc này. Vui lòng thử diễn đạt lại câu hỏi."
 
-        return answer, context_ids
+        return answer, retrieved_contexts, timing
+
+    async def answer_question(
+        self,
+        workspace_id: str,
+        question: str,
+        video_ids: Optional[List[str]] = None,
+        retriever_type: str = "vector",
+        generator_type: str = "gemini",
+        embedding_model: str = "dangvantuan",
+        use_reranker: bool = False,
+        conversation_summary: Optional[str] = None,
+        fusion_method: str = "rrf",
+        fusion_weights: Optional[Dict[str, float]] = None,
+        neighbor_window: int = 0,
+        context_token_budget: Optional[int] = None,
+    ) -> Tuple[str, List[RetrievedContext], Dict]:
+        # Get retriever and generator instances
+        retriever = get_retriever(
+            retriever_type, embedding_model, fusion_method, fusion_weights
+        )
+        generator = get_generator(generator_type)
+
+        # Shared with the request, so auth and retriever internals land here too
+        stages = current_stages()
+        timing = {"stages": stages, "prompt_tokens": 0, "context_tokens": 0}
+
+        search_query = await self._refine_query(
+            generator, retriever_type, question, conversation_summary, stages
+        )
+
+        retrieval_count = RERANK_RETRIEVAL_COUNT if use_reranker else FINAL_COUNT
+
+        with stage("retrieval", stages):
+            retrieved_contexts = await retriever.query_similar_contexts(
+                workspace_id, search_query, retrieval_count, video_ids
+            )
+        print(f"Retrieval took {stages['retrieval']:.2f} seconds.")
+
+        if use_reranker and retrieved_contexts:
+            with stage("rerank", stages):
+                retrieved_contexts = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    get_reranker_service().rerank,
+                    search_query,
+                    retrieved_contexts,
+                    FINAL_COUNT,
+                )
+
+        return await self._complete_answer(
+            workspace_id,
+            question,
+            search_query,
+            retrieved_contexts,
+            generator,
+            embedding_model,
+            neighbor_window,
+            context_token_budget,
+            timing,
+        )
+
+    async def answer_questions_batch(
+        self,
+        workspace_id: str,
+        requests: List[QuestionRequest],
+        conversation_summaries: List[Optional[str]],
+        max_concurrency: int,
+        admit: Callable[[], AsyncContextManager],
+    ) -> AsyncIterator[
+        Tuple[int, Union[Tuple[str, List[RetrievedContext], Dict], Exception]]
+    ]:
+        """
+        Answer many questions, yielding (index, result) in completion order.
+
+        Questions sharing a retriever configuration form a group that is
+        refined concurrently, retrieved in one batch (one embedding pass per
+        model) and reranked in one CrossEncoder call. Each question then
+        goes on to generation by itself, so a group's answers stream while
+        other groups are still retrieving. Every LLM call holds its own
+        `admit()` slot, and at most max_concurrency run at once. A failing
+        question yields its exception instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        loop = asyncio.get_running_loop()
+        results: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Future] = []
+
+        timings = [
+            {"stages": {}, "prompt_tokens": 0, "context_tokens": 0} for _ in requests
+        ]
+
+        # Every task records stages into its own dict, never the request's
+        async def refine(i: int) -> Optional[str]:
+            request = requests[i]
+            start_stage_recording(timings[i]["stages"])
+            try:
+                async with semaphore, admit():
+                    return await self._refine_query(
+                        get_generator(request.generator_type),
+                        request.retriever_type,
+                        request.question,
+                        conversation_summaries[i],
+                        timings[i]["stages"],
+                    )
+            except Exception as e:
+                results.put_nowait((i, e))
+                return None
+
+        async def complete(
+            i: int, search_query: str, retrieved_contexts: List[RetrievedContext]
+        ):
+            request = requests[i]
+            start_stage_recording(timings[i]["stages"])
+            try:
+                async with semaphore, admit():
+                    result = await self._complete_answer(
+                        workspace_id,
+                        request.question,
+                        search_query,
+                        retrieved_contexts,
+                        get_generator(request.generator_type),
+                        request.embedding_model,
+                        request.neighbor_window,
+                        request.context_token_budget,
+                        timings[i],
+                    )
+            except Exception as e:
+                result = e
+            results.put_nowait((i, result))
+
+        async def run_group(indices: List[int]):
+            # Shared retrieval work is timed once and charged to each question
+            group_stages = start_stage_recording()
+
+            search_queries = await asyncio.gather(*(refine(i) for i in indices))
+            refined = [
+                (i, query)
+                for i, query in zip(indices, search_queries)
+                if query is not None
+            ]
+            if not refined:
+                return
+            indices = [i for i, _ in refined]
+            search_queries = [query for _, query in refined]
+
+            first = requests[indices[0]]
+            retrieval_count = (
+                RERANK_RETRIEVAL_COUNT if first.use_reranker else FINAL_COUNT
+            )
+            try:
+                retriever = get_retriever(
+                    first.retriever_type,
+                    first.embedding_model,
+                    first.fusion_method,
+                    first.fusion_weights,
+                )
+                with stage("retrieval", group_stages):
+                    retrieved = await retriever.query_similar_contexts_batch(
+                        workspace_id,
+                        search_queries,
+                        retrieval_count,
+                        [requests[i].video_ids for i in indices],
+                    )
+                print(
+                    f"Batch retrieval of {len(indices)} questions took "
+                    f"{group_stages['retrieval']:.2f} seconds."
+                )
+
+                if first.use_reranker and any(retrieved):
+                    with stage("rerank", group_stages):
+                        retrieved = await loop.run_in_executor(
+                            None,
+                            get_reranker_service().rerank_batch,
+                            search_queries,
+                            retrieved,
+                            FINAL_COUNT,
+                        )
+            except Exception as e:
+                for i in indices:
+                    results.put_nowait((i, e))
+                return
+
+            for i, search_query, contexts in zip(indices, search_queries, retrieved):
+                timings[i]["stages"].update(group_stages)
+                tasks.append(asyncio.ensure_future(complete(i, search_query, contexts)))
+
+        # Questions sharing a retriever configuration are retrieved together
+        groups: Dict[Tuple, List[int]] = {}
+        for i, request in enumerate(requests):
+            key = (
+                request.retriever_type,
+                request.embedding_model,
+                request.fusion_method,
+                tuple(sorted((request.fusion_weights or {}).items())),
+                request.use_reranker,
+            )
+            groups.setdefault(key, []).append(i)
+
+        tasks.extend(asyncio.ensure_future(run_group(g)) for g in groups.values())
+        try:
+            # Each question puts exactly one result
+            for _ in requests:
+                yield await results.get()
+        finally:
+            # Client went away: stop the work nobody will read
+            for task in tasks:
+                task.cancel()
 
 
 # Global instance
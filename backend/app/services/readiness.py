@@ -0,0 +1,52 @@
+import asyncio
+from typing import Dict, Tuple
+from app.database import db
+from app.services.vector_store import EMBEDDING_MODELS, get_vector_store
+from app.services.reranker_service import get_reranker_service, reranker_loaded
+from app.services.gemini_service import gemini_service_initialized
+from app.services.model_server import get_model_server_client, model_server_available
+from app.utils.startup_profile import startup_profile
+from app.config import get_settings
+
+settings = get_settings()
+
+
+async def preload_models() -> None:
+    """Load models off the event loop after the server is already accepting."""
+    loop = asyncio.get_running_loop()
+    vector_store = get_vector_store()
+
+    try:
+        for embedding_model in EMBEDDING_MODELS:
+            await loop.run_in_executor(
+                None, vector_store.get_embedding_model, embedding_model
+            )
+        # With the model server up, the reranker already lives there
+        if settings.preload_reranker and not model_server_available():
+            await loop.run_in_executor(None, get_reranker_service()._load_model)
+    except Exception as e:
+        # Requests will retry the load lazily; readiness keeps reporting it
+        print(f"Model preload failed: {e}")
+        return
+
+    startup_profile.mark_ready()
+    print(f"Startup profile: {startup_profile.report()}")
+
+
+def get_readiness() -> Tuple[bool, Dict]:
+    loaded = get_vector_store().embedding_models
+    models = {f"embedding:{model}": model in loaded for model in EMBEDDING_MODELS}
+    models["reranker"] = reranker_loaded()
+    if get_model_server_client() is not None:
+        models["model_server"] = model_server_available()
+        models["reranker"] = models["reranker"] or models["model_server"]
+    models["gemini"] = gemini_service_initialized()
+
+    database = db.client is not None
+    # Only the preloaded models gate readiness; the rest load on first use
+    required = [models[f"embedding:{model}"] for model in EMBEDDING_MODELS]
+    if settings.preload_models and settings.preload_reranker:
+        required.append(models["reranker"])
+    ready = database and (not settings.preload_models or all(required))
+
+    return ready, {"ready": ready, "database": database, "models": models}
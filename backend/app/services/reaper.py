@@ -0,0 +1,189 @@
+"""
+Background reaper for tombstoned workspaces and videos.
+
+Deleting a workspace or a video only marks it (`deleted_at`, or
+`deleted_from` for videos) so the request returns at once; this loop does
+the physical removal: vectors, context units, files, collections.
+
+Each document is claimed with a lease (`reap_after`) before work starts, so
+several API workers can run the reaper side by side without doing the same
+work twice. A crashed or failed attempt simply lets the lease expire; the
+next lease is longer each time a document fails (`reap_attempts`).
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from app.database import get_database
+from app.config import get_settings
+from app.utils.metrics import (
+    reaper_backlog,
+    reaper_failures_total,
+    reaper_reaped_total,
+)
+
+settings = get_settings()
+
+# Seconds a claim is held while reaping, and the cap on the retry backoff
+LEASE_SECONDS = 600
+MAX_BACKOFF_SECONDS = 3600
+
+
+def _claimable(now: datetime) -> Dict:
+    return {"$or": [{"reap_after": None}, {"reap_after": {"$lte": now}}]}
+
+
+class Reaper:
+    def __init__(self, interval: float = 10.0, batch_size: int = 100):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="reaper")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def wake(self):
+        """Start a pass now instead of at the next interval."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Reaper pass failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run_once(self) -> int:
+        """Reap what is claimable now; returns the number of items removed."""
+        reaped = await self._reap_workspaces()
+        reaped += await self._reap_videos()
+        await self._update_backlog()
+        return reaped
+
+    async def _claim(self, collection, query: Dict) -> List[Dict]:
+        now = datetime.now(timezone.utc)
+        token = uuid.uuid4().hex
+        candidates = (
+            await collection.find({**query, **_claimable(now)}, {"_id": 1})
+            .limit(self.batch_size)
+            .to_list(None)
+        )
+        if not candidates:
+            return []
+
+        # Only the worker whose token landed owns a document
+        await collection.update_many(
+            {"_id": {"$in": [c["_id"] for c in candidates]}, **_claimable(now)},
+            {
+                "$set": {
+                    "reap_token": token,
+                    "reap_after": now + timedelta(seconds=LEASE_SECONDS),
+                }
+            },
+        )
+        return await collection.find({"reap_token": token}).to_list(None)
+
+    async def _release(self, collection, ids: List, kind: str, error: Exception):
+        """Record a failure; the lease becomes the backoff before the retry."""
+        reaper_failures_total.labels(kind=kind).inc(len(ids))
+        docs = await collection.find(
+            {"_id": {"$in": ids}}, {"reap_attempts": 1}
+        ).to_list(None)
+        now = datetime.now(timezone.utc)
+        for doc in docs:
+            attempts = doc.get("reap_attempts", 0) + 1
+            backoff = min(self.interval * 2**attempts, MAX_BACKOFF_SECONDS)
+            await collection.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "reap_attempts": attempts,
+                        "reap_error": str(error),
+                        "reap_after": now + timedelta(seconds=backoff),
+                    }
+                },
+            )
+
+    async def _reap_workspaces(self) -> int:
+        from app.services.workspace_service import purge_workspace
+
+        db = await get_database()
+        reaped = 0
+        for workspace in await self._claim(
+            db.workspaces, {"deleted_at": {"$ne": None}}
+        ):
+            workspace_id = str(workspace["_id"])
+            try:
+                await purge_workspace(workspace_id)
+            except Exception as e:
+                print(f"Reaper: workspace {workspace_id} failed: {e}")
+                await self._release(db.workspaces, [workspace["_id"]], "workspace", e)
+                continue
+            reaped += 1
+            reaper_reaped_total.labels(kind="workspace").inc()
+            print(f"Reaper: purged workspace {workspace_id}")
+        return reaped
+
+    async def _reap_videos(self) -> int:
+        from app.services.video_service import (
+            delete_videos_batch,
+            drop_orphaned_storage,
+        )
+        from app.services.workspace_layers import invalidate_layers
+
+        db = await get_database()
+        videos = await self._claim(db.videos, {"deleted_from": {"$ne": None}})
+
+        # Vectors live in the collections of the workspace the video came from
+        by_owner: Dict[str, List] = {}
+        for video in videos:
+            by_owner.setdefault(video["deleted_from"], []).append(video["_id"])
+
+        reaped = 0
+        for owner_id, ids in by_owner.items():
+            try:
+                await delete_videos_batch(owner_id, [str(vid) for vid in ids])
+            except Exception as e:
+                print(f"Reaper: {len(ids)} videos of {owner_id} failed: {e}")
+                await self._release(db.videos, ids, "video", e)
+                continue
+            invalidate_layers(owner_id)
+            await drop_orphaned_storage(owner_id)
+            reaped += len(ids)
+            reaper_reaped_total.labels(kind="video").inc(len(ids))
+        return reaped
+
+    async def _update_backlog(self):
+        db = await get_database()
+        reaper_backlog.labels(kind="workspace").set(
+            await db.workspaces.count_documents({"deleted_at": {"$ne": None}})
+        )
+        reaper_backlog.labels(kind="video").set(
+            await db.videos.count_documents({"deleted_from": {"$ne": None}})
+        )
+
+
+reaper = Reaper(settings.reaper_interval, settings.reaper_batch_size)
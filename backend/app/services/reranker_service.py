@@ -1,18 +1,23 @@
-from typing import List, Dict
-import torch
-from sentence_transformers import CrossEncoder
+from typing import List, Dict, Optional
+import threading
 import time
+from app.utils.metrics import model_load_seconds
+from app.utils.startup_profile import startup_profile
+from app.services.model_server import ModelServerUnavailable, get_model_server_client
+
+DEFAULT_RERANKER_MODEL = "BAAI/bge-reranker-base"
 
 
 class RerankerService:
 
-    def __init__(self, model_name: str = "BAAI/bge-reranker-base"):
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL):
 
         self.model_name = model_name
         self.model = None
-        self._device = self._get_device()
+        self._load_lock = threading.Lock()
 
     def _get_device(self) -> str:
+        import torch
 
         if torch.cuda.is_available():
             return "cuda"
@@ -22,19 +27,42 @@ class RerankerService:
             return "cpu"
 
     def _load_model(self):
-        if self.model is None:
-            print(f"Loading reranker model: {self.model_name} on {self._device}")
+        if self.model is not None:
+            return
+
+        with self._load_lock:
+            if self.model is not None:
+                return
+
+            from sentence_transformers import CrossEncoder
+
+            device = self._get_device()
+            print(f"Loading reranker model: {self.model_name} on {device}")
             start_time = time.time()
 
             self.model = CrossEncoder(
                 self.model_name,
                 max_length=512,
-                device=self._device,
+                device=device,
             )
 
             load_time = time.time() - start_time
+            model_load_seconds.labels(model=self.model_name).set(load_time)
+            startup_profile.record(f"load:{self.model_name}", load_time)
             print(f"Reranker model loaded in {load_time:.2f} seconds")
 
+    def _predict(self, pairs: List[List[str]]):
+        # Score on the shared model server unless we already hold a local copy
+        client = get_model_server_client()
+        if self.model is None and client is not None and client.available():
+            try:
+                return client.rerank(self.model_name, pairs)
+            except ModelServerUnavailable:
+                pass
+
+        self._load_model()
+        return self.model.predict(pairs)
+
     def rerank(
         self,
         query: str,
@@ -45,9 +73,6 @@ class RerankerService:
         if not contexts:
             return []
 
-        # Lazy load model
-        self._load_model()
-
         # Prepare (query, text) pairs for scoring
         pairs = [[query, ctx["text"]] for ctx in contexts]
 
@@ -55,7 +80,7 @@ class RerankerService:
         print(f"Reranking {len(contexts)} contexts...")
         start_time = time.time()
 
-        scores = self.model.predict(pairs)
+        scores = self._predict(pairs)
 
         rerank_time = time.time() - start_time
         print(f"Reranking completed in {rerank_time:.2f} seconds")
@@ -74,5 +99,57 @@ class RerankerService:
         print(f"Returned top {len(reranked_contexts)} contexts after reranking")
         return reranked_contexts
 
+    def rerank_batch(
+        self,
+        queries: List[str],
+        contexts_list: List[List[Dict]],
+        top_n: int = None,
+    ) -> List[List[Dict]]:
+        """Rerank several queries with a single CrossEncoder call."""
+        if not any(contexts_list):
+            return [[] for _ in queries]
+
+        pairs = [
+            [query, ctx["text"]]
+            for query, contexts in zip(queries, contexts_list)
+            for ctx in contexts
+        ]
+
+        print(f"Reranking {len(pairs)} contexts for {len(queries)} queries...")
+        start_time = time.time()
+
+        scores = self._predict(pairs)
+
+        rerank_time = time.time() - start_time
+        print(f"Batch reranking completed in {rerank_time:.2f} seconds")
+
+        reranked_list = []
+        offset = 0
+        for contexts in contexts_list:
+            for i, ctx in enumerate(contexts):
+                ctx["rerank_score"] = float(scores[offset + i])
+                ctx["distance"] = -float(scores[offset + i])
+            offset += len(contexts)
+
+            reranked_contexts = sorted(
+                contexts, key=lambda x: x["rerank_score"], reverse=True
+            )
+            if top_n is not None:
+                reranked_contexts = reranked_contexts[:top_n]
+            reranked_list.append(reranked_contexts)
+
+        return reranked_list
+
+
+_reranker_service: Optional[RerankerService] = None
+
+
+def reranker_loaded() -> bool:
+    return _reranker_service is not None and _reranker_service.model is not None
+
 
-reranker_service = RerankerService()
+def get_reranker_service() -> RerankerService:
+    global _reranker_service
+    if _reranker_service is None:
+        _reranker_service = RerankerService()
+    return _reranker_service
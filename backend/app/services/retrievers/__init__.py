@@ -1,30 +1,67 @@
-from app.services.retrievers.base_retriever import BaseRetriever
+from typing import Dict, Optional
+from app.services.retrievers.base_retriever import (
+    BaseRetriever,
+    ContextMetadata,
+    RetrievedContext,
+    SourceUnit,
+    source_units,
+)
 from app.services.retrievers.vector_retriever import VectorRetriever
 from app.services.retrievers.bm25_retriever import BM25Retriever
 from app.services.retrievers.hybrid_retriever import HybridRetriever
+from app.services.retrievers.ensemble_retriever import EnsembleRetriever
+from app.services.retrievers.fusion import FUSION_METHODS, fuse_results
+from app.services.vector_store import EMBEDDING_MODELS
 
 
 def get_retriever(
-    retriever_type: str = "vector", embedding_model: str = "dangvantuan"
+    retriever_type: str = "vector",
+    embedding_model: str = "dangvantuan",
+    fusion_method: str = "rrf",
+    fusion_weights: Optional[Dict[str, float]] = None,
 ) -> BaseRetriever:
     print(f"Initializing retriever of type: {retriever_type}")
+    weights = fusion_weights or {}
     if retriever_type == "vector":
         return VectorRetriever(embedding_model)
     elif retriever_type == "bm25":
         return BM25Retriever()
     elif retriever_type == "hybrid":
-        return HybridRetriever(embedding_model=embedding_model)
+        return HybridRetriever(
+            weight_vector=weights.get("vector", 1.0),
+            weight_bm25=weights.get("bm25", 1.0),
+            embedding_model=embedding_model,
+            fusion_method=fusion_method,
+        )
+    elif retriever_type == "ensemble":
+        # Per-model weights fall back to the generic "vector" weight
+        embedding_weights = {
+            model: weights.get(model, weights.get("vector", 1.0))
+            for model in EMBEDDING_MODELS.keys()
+        }
+        return EnsembleRetriever(
+            embedding_weights=embedding_weights,
+            weight_bm25=weights.get("bm25", 1.0),
+            fusion_method=fusion_method,
+        )
     else:
         raise ValueError(
             f"Unknown retriever type: {retriever_type}. "
-            f"Supported types: 'vector', 'bm25', 'hybrid'"
+            f"Supported types: 'vector', 'bm25', 'hybrid', 'ensemble'"
         )
 
 
 __all__ = [
     "BaseRetriever",
+    "ContextMetadata",
+    "RetrievedContext",
+    "SourceUnit",
+    "source_units",
     "VectorRetriever",
     "BM25Retriever",
     "HybridRetriever",
+    "EnsembleRetriever",
+    "FUSION_METHODS",
+    "fuse_results",
     "get_retriever",
 ]
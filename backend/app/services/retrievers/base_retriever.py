@@ -1,5 +1,60 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Optional, TypedDict
+
+
+class ContextMetadata(TypedDict):
+    video_id: str
+    video_path: str
+    start_time: float
+    end_time: float
+
+
+class _RetrievedContextBase(TypedDict):
+    id: str
+    text: str
+    metadata: ContextMetadata
+    distance: float
+
+
+class SourceUnit(TypedDict):
+    """A stored context unit as it was retrieved, untrimmed."""
+
+    id: str
+    video_id: str
+    video_path: str
+    text: str
+    start_time: float
+    end_time: float
+
+
+class RetrievedContext(_RetrievedContextBase, total=False):
+    """
+    Context record produced by retrievers and carried through reranking,
+    expansion and packing up to the API response.
+    """
+
+    rerank_score: float
+    # Stored units behind this record when expansion merged them or packing
+    # trimmed its text; absent while the record is the unit itself
+    units: List[SourceUnit]
+
+
+def source_units(ctx: RetrievedContext) -> List[SourceUnit]:
+    """The stored units a (possibly merged or trimmed) record stands for."""
+    if "units" in ctx:
+        return ctx["units"]
+    metadata = ctx["metadata"]
+    return [
+        SourceUnit(
+            id=ctx["id"],
+            video_id=metadata["video_id"],
+            video_path=metadata["video_path"],
+            text=ctx["text"],
+            start_time=metadata["start_time"],
+            end_time=metadata["end_time"],
+        )
+    ]
 
 
 class BaseRetriever(ABC):
@@ -10,5 +65,25 @@ class BaseRetriever(ABC):
         query_text: str,
         n_results: int = 5,
         video_ids: Optional[List[str]] = None,
-    ) -> List[Dict]:
+    ) -> List[RetrievedContext]:
         pass
+
+    async def query_similar_contexts_batch(
+        self,
+        workspace_id: str,
+        query_texts: List[str],
+        n_results: int = 5,
+        video_ids_list: Optional[List[Optional[List[str]]]] = None,
+    ) -> List[List[RetrievedContext]]:
+        """Results per query; retrievers override this to share work."""
+        video_ids_list = video_ids_list or [None] * len(query_texts)
+        return list(
+            await asyncio.gather(
+                *[
+                    self.query_similar_contexts(
+                        workspace_id, query_text, n_results, video_ids
+                    )
+                    for query_text, video_ids in zip(query_texts, video_ids_list)
+                ]
+            )
+        )
@@ -1,34 +1,61 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 from rank_bm25 import BM25Okapi
-from app.services.retrievers.base_retriever import BaseRetriever
+from app.services.retrievers.base_retriever import BaseRetriever, RetrievedContext
+from app.services.tokenizers import get_tokenizer
 from app.database import get_database
+from app.services.workspace_layers import get_workspace_layers
+from app.utils.db_helpers import prepare_id_filter
+from app.utils.stage_timer import stage
 
 
 class BM25Retriever(BaseRetriever):
-    async def query_similar_contexts(
-        self,
-        workspace_id: str,
-        query_text: str,
-        n_results: int = 5,
-        video_ids: Optional[List[str]] = None,
-    ) -> List[Dict]:
+    def __init__(self, tokenizer_type: Optional[str] = None):
+        self.tokenizer = get_tokenizer(tokenizer_type)
+
+    def _document_tokens(self, ctx: Dict) -> List[str]:
+        # Token streams are stored at ingestion; only legacy units are tokenized here
+        if ctx.get("tokenizer") == self.tokenizer.name:
+            return ctx.get("tokens", [])
+        return self.tokenizer.tokenize(ctx["text"])
+
+    async def _build_index(
+        self, workspace_id: str, video_ids: Optional[List[str]]
+    ) -> Tuple[List[Dict], Optional[BM25Okapi]]:
         db = await get_database()
 
-        filter_dict = {}
-        if video_ids and len(video_ids) > 0:
-            filter_dict["video_id"] = {"$in": video_ids}
+        # Context units only reference their video, so scope via the videos
+        # visible here: clones see the ones they inherited too, tombstoned
+        # and released ones are gone even when asked for explicitly
+        layers = await get_workspace_layers(workspace_id)
+        query = layers.video_filter()
+        if video_ids:
+            requested = {"_id": {"$in": [prepare_id_filter(vid) for vid in video_ids]}}
+            query = {"$and": [query, requested]}
+        videos = await db.videos.find(query, {"_id": 1}).to_list(None)
+        video_ids = [str(v["_id"]) for v in videos]
+
+        if not video_ids:
+            return [], None
 
-        contexts = await db.context_units.find(filter_dict).to_list(None)
+        contexts = await db.context_units.find(
+            {"video_id": {"$in": video_ids}}
+        ).to_list(None)
 
         if not contexts:
-            return []
+            return [], None
+
+        corpus = [self._document_tokens(ctx) for ctx in contexts]
 
-        corpus = [ctx["text"].lower().split() for ctx in contexts]
+        if not any(corpus):
+            return [], None
 
-        bm25 = BM25Okapi(corpus)
+        return contexts, BM25Okapi(corpus)
 
-        tokenized_query = query_text.lower().split()
+    def _rank(
+        self, contexts: List[Dict], bm25: BM25Okapi, query_text: str, n_results: int
+    ) -> List[RetrievedContext]:
+        tokenized_query = self.tokenizer.tokenize(query_text)
         scores = bm25.get_scores(tokenized_query)
 
         top_n = min(n_results, len(scores))
@@ -57,3 +84,48 @@ class BM25Retriever(BaseRetriever):
             )
 
         return results
+
+    async def query_similar_contexts(
+        self,
+        workspace_id: str,
+        query_text: str,
+        n_results: int = 5,
+        video_ids: Optional[List[str]] = None,
+    ) -> List[RetrievedContext]:
+        with stage("bm25"):
+            contexts, bm25 = await self._build_index(workspace_id, video_ids)
+
+            if bm25 is None:
+                return []
+
+            return self._rank(contexts, bm25, query_text, n_results)
+
+    async def query_similar_contexts_batch(
+        self,
+        workspace_id: str,
+        query_texts: List[str],
+        n_results: int = 5,
+        video_ids_list: Optional[List[Optional[List[str]]]] = None,
+    ) -> List[List[RetrievedContext]]:
+        video_ids_list = video_ids_list or [None] * len(query_texts)
+
+        # One corpus load and index build per distinct video filter
+        groups: Dict[Optional[Tuple[str, ...]], List[int]] = {}
+        for i, video_ids in enumerate(video_ids_list):
+            key = tuple(sorted(video_ids)) if video_ids else None
+            groups.setdefault(key, []).append(i)
+
+        batch_results: List[List[RetrievedContext]] = [[] for _ in query_texts]
+        with stage("bm25"):
+            for key, indices in groups.items():
+                contexts, bm25 = await self._build_index(
+                    workspace_id, list(key) if key else None
+                )
+                if bm25 is None:
+                    continue
+                for i in indices:
+                    batch_results[i] = self._rank(
+                        contexts, bm25, query_texts[i], n_results
+                    )
+
+        return batch_results
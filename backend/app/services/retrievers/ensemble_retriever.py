@@ -0,0 +1,128 @@
+from typing import List, Dict, Optional
+import asyncio
+from app.services.retrievers.base_retriever import BaseRetriever, RetrievedContext
+from app.services.retrievers.bm25_retriever import BM25Retriever
+from app.services.retrievers.fusion import fuse_results, adaptive_fetch_count
+from app.services.vector_store import EMBEDDING_MODELS, get_vector_store
+from app.services.workspace_layers import WorkspaceLayers, get_workspace_layers
+from app.utils.stage_timer import bind_context, stage
+
+
+class EnsembleRetriever(BaseRetriever):
+    """
+    Ensemble retriever querying every embedding collection plus BM25 in one
+    pass and fusing them (Weighted RRF by default).
+    """
+
+    def __init__(
+        self,
+        k: int = 60,
+        embedding_weights: Optional[Dict[str, float]] = None,
+        weight_bm25: float = 1.0,
+        fusion_method: str = "rrf",
+    ):
+        self.bm25_retriever = BM25Retriever()
+
+        self.k = k
+        self.embedding_weights = embedding_weights or {
+            model: 1.0 for model in EMBEDDING_MODELS.keys()
+        }
+        self.weight_bm25 = weight_bm25
+        self.fusion_method = fusion_method
+
+        self.vector_fetch_factor = 2.0
+        self.bm25_fetch_factor = 3.0
+
+    async def _query_vector_batch(
+        self,
+        embedding_model: str,
+        workspace_id: str,
+        query_texts: List[str],
+        n_results: int,
+        video_ids_list: List[Optional[List[str]]],
+        layers: WorkspaceLayers,
+    ) -> List[List[Dict]]:
+        # Each model encodes the queries on its own thread so both run in parallel
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            bind_context(
+                get_vector_store().query_similar_contexts_batch,
+                workspace_id,
+                query_texts,
+                n_results,
+                video_ids_list,
+                embedding_model,
+                [layers.scopes(video_ids) for video_ids in video_ids_list],
+            ),
+        )
+
+    async def query_similar_contexts(
+        self,
+        workspace_id: str,
+        query_text: str,
+        n_results: int = 5,
+        video_ids: Optional[List[str]] = None,
+    ) -> List[RetrievedContext]:
+        results = await self.query_similar_contexts_batch(
+            workspace_id, [query_text], n_results, [video_ids]
+        )
+        return results[0]
+
+    async def query_similar_contexts_batch(
+        self,
+        workspace_id: str,
+        query_texts: List[str],
+        n_results: int = 5,
+        video_ids_list: Optional[List[Optional[List[str]]]] = None,
+    ) -> List[List[RetrievedContext]]:
+
+        models = list(self.embedding_weights.keys())
+        layers = await get_workspace_layers(workspace_id)
+        video_ids_list = video_ids_list or [None] * len(query_texts)
+        corpus_size = await asyncio.get_running_loop().run_in_executor(
+            None,
+            get_vector_store().count_context_units,
+            workspace_id,
+            models[0],
+            layers.collection_ids,
+        )
+        vector_count = adaptive_fetch_count(
+            n_results, corpus_size, self.vector_fetch_factor
+        )
+        bm25_count = adaptive_fetch_count(
+            n_results, corpus_size, self.bm25_fetch_factor
+        )
+
+        # One batch per source: [model_1, ..., model_n, bm25][query]
+        batches_per_source = await asyncio.gather(
+            *[
+                self._query_vector_batch(
+                    model,
+                    workspace_id,
+                    query_texts,
+                    vector_count,
+                    video_ids_list,
+                    layers,
+                )
+                for model in models
+            ],
+            self.bm25_retriever.query_similar_contexts_batch(
+                workspace_id, query_texts, bm25_count, video_ids_list
+            ),
+        )
+
+        weights = [self.embedding_weights[model] for model in models]
+        weights.append(self.weight_bm25)
+
+        with stage("fusion"):
+            return [
+                fuse_results(
+                    [batch[i] for batch in batches_per_source],
+                    weights,
+                    n_results,
+                    method=self.fusion_method,
+                    k=self.k,
+                )
+                for i in range(len(query_texts))
+            ]
@@ -0,0 +1,134 @@
+import math
+from typing import List, Dict, Optional
+import numpy as np
+
+FUSION_METHODS = ("rrf", "minmax", "zscore", "dbsf")
+
+
+def adaptive_fetch_count(
+    n_results: int, corpus_size: Optional[int], min_factor: float = 2.0
+) -> int:
+    """
+    Number of candidates to fetch from one retriever before fusion.
+
+    Small corpora are fetched entirely; larger ones grow logarithmically with
+    the corpus size instead of a fixed multiple of n_results.
+    """
+    if not corpus_size:
+        return max(n_results * 2, 10)
+
+    if corpus_size <= n_results * 4:
+        return corpus_size
+
+    depth = n_results * max(min_factor, math.log2(corpus_size / n_results))
+    return int(min(corpus_size, math.ceil(depth)))
+
+
+def _normalize(scores: np.ndarray, present: np.ndarray, method: str) -> np.ndarray:
+    """Row-wise score normalization; missing candidates contribute 0."""
+    masked = np.where(present, scores, np.nan)
+    normalized = np.zeros_like(scores)
+    low = np.nanmin(masked, axis=1, keepdims=True)
+    high = np.nanmax(masked, axis=1, keepdims=True)
+
+    if method == "minmax":
+        span = np.where(high - low > 0, high - low, 1.0)
+        normalized = (masked - low) / span
+    elif method == "zscore":
+        mean = np.nanmean(masked, axis=1, keepdims=True)
+        std = np.nanstd(masked, axis=1, keepdims=True)
+        std = np.where(std > 0, std, 1.0)
+        z = (masked - mean) / std
+        # Shift so the weakest candidate of each source sits at 0
+        normalized = z - np.nanmin(z, axis=1, keepdims=True)
+    elif method == "dbsf":
+        # Distribution-based score fusion: map [mean - 3σ, mean + 3σ] onto [0, 1]
+        mean = np.nanmean(masked, axis=1, keepdims=True)
+        std = np.nanstd(masked, axis=1, keepdims=True)
+        lower = mean - 3 * std
+        span = np.where(std > 0, 6 * std, 1.0)
+        normalized = np.clip((masked - lower) / span, 0.0, 1.0)
+
+    # A single candidate or all-equal scores carry no spread to normalize;
+    # they are the source's best matches, not its worst
+    normalized = np.where(high - low > 0, normalized, 1.0)
+
+    return np.where(present, normalized, 0.0)
+
+
+def fuse_results(
+    result_lists: List[List[Dict]],
+    weights: List[float],
+    n_results: int,
+    method: str = "rrf",
+    k: int = 60,
+) -> List[Dict]:
+    """
+    Fuse ranked result lists from several retrievers into one list.
+
+    Args:
+        result_lists: One ranked list per retriever, each item carrying "id" and "distance"
+        weights: Weight per retriever, aligned with result_lists
+        n_results: Number of fused results to return
+        method: "rrf", "minmax", "zscore" (convex combination of normalized scores) or "dbsf"
+        k: RRF rank constant
+
+    Returns:
+        Fused results, deduplicated by context id, with a 0–1 "distance"
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(
+            f"Unknown fusion method: {method}. Supported: {list(FUSION_METHODS)}"
+        )
+
+    # Empty sources carry no signal and would break row-wise normalization
+    sources = [(r, w) for r, w in zip(result_lists, weights) if r]
+    if not sources:
+        return []
+    result_lists = [r for r, _ in sources]
+    weights = [w for _, w in sources]
+
+    # Candidate index: first occurrence wins so metadata stays from the best source
+    candidates = {}
+    for results in result_lists:
+        for r in results:
+            if r["id"] not in candidates:
+                candidates[r["id"]] = r
+
+    column = {doc_id: i for i, doc_id in enumerate(candidates)}
+    shape = (len(result_lists), len(candidates))
+
+    ranks = np.full(shape, np.inf)
+    scores = np.zeros(shape)
+    present = np.zeros(shape, dtype=bool)
+
+    for row, results in enumerate(result_lists):
+        cols = np.fromiter((column[r["id"]] for r in results), dtype=int)
+        ranks[row, cols] = np.arange(1, len(results) + 1)
+        scores[row, cols] = [1.0 - r.get("distance", 0.0) for r in results]
+        present[row, cols] = True
+
+    weight_vector = np.asarray(weights, dtype=float)
+
+    if method == "rrf":
+        fused = weight_vector @ (1.0 / (k + ranks))
+        distances = 1.0 / (1.0 + fused * 10)
+    else:
+        fused = weight_vector @ _normalize(scores, present, method)
+        # z-scores are unbounded, so scale by the best fused score instead
+        if method == "zscore":
+            total = max(float(fused.max()), 1e-9)
+        else:
+            total = max(float(weight_vector.sum()), 1e-9)
+        distances = 1.0 - fused / total
+
+    top = np.argsort(-fused, kind="stable")[:n_results]
+
+    ids = list(candidates.keys())
+    final_results = []
+    for col in top:
+        item = candidates[ids[col]].copy()
+        item["distance"] = float(distances[col])
+        final_results.append(item)
+
+    return final_results
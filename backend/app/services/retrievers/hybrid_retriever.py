@@ -1,14 +1,20 @@
-from typing import List, Dict, Optional
+from typing import List, Optional
 import asyncio
-from app.services.retrievers.base_retriever import BaseRetriever
+from app.services.retrievers.base_retriever import BaseRetriever, RetrievedContext
 from app.services.retrievers.vector_retriever import VectorRetriever
 from app.services.retrievers.bm25_retriever import BM25Retriever
+from app.services.retrievers.fusion import fuse_results, adaptive_fetch_count
+from app.services.vector_store import get_vector_store
+from app.services.workspace_layers import get_workspace_layers
+from app.utils.stage_timer import stage
 
 
 class HybridRetriever(BaseRetriever):
     """
-    Hybrid retriever combining vector (semantic) and BM25 (lexical) search
-    using Weighted Reciprocal Rank Fusion (RRF).
+    Hybrid retriever combining vector (semantic) and BM25 (lexical) search.
+
+    Fusion defaults to Weighted Reciprocal Rank Fusion (RRF); score-based
+    methods ("minmax", "zscore", "dbsf") are available through fusion_method.
     """
 
     def __init__(
@@ -17,6 +23,7 @@ class HybridRetriever(BaseRetriever):
         weight_vector: float = 1.0,
         weight_bm25: float = 1.0,
         embedding_model: str = "dangvantuan",
+        fusion_method: str = "rrf",
     ):
         self.vector_retriever = VectorRetriever(embedding_model)
         self.bm25_retriever = BM25Retriever()
@@ -24,6 +31,12 @@ class HybridRetriever(BaseRetriever):
         self.k = k
         self.weight_vector = weight_vector
         self.weight_bm25 = weight_bm25
+        self.embedding_model = embedding_model
+        self.fusion_method = fusion_method
+
+        # BM25 scores the whole corpus anyway, so it can afford a deeper list
+        self.vector_fetch_factor = 2.0
+        self.bm25_fetch_factor = 3.0
 
     async def query_similar_contexts(
         self,
@@ -31,19 +44,77 @@ class HybridRetriever(BaseRetriever):
         query_text: str,
         n_results: int = 5,
         video_ids: Optional[List[str]] = None,
-    ) -> List[Dict]:
-
-        retrieval_count = max(n_results * 2, 10)
+    ) -> List[RetrievedContext]:
+
+        layers = await get_workspace_layers(workspace_id)
+        corpus_size = await asyncio.get_running_loop().run_in_executor(
+            None,
+            get_vector_store().count_context_units,
+            workspace_id,
+            self.embedding_model,
+            layers.collection_ids,
+        )
 
         vector_results, bm25_results = await asyncio.gather(
             self.vector_retriever.query_similar_contexts(
-                workspace_id, query_text, retrieval_count, video_ids
+                workspace_id,
+                query_text,
+                adaptive_fetch_count(n_results, corpus_size, self.vector_fetch_factor),
+                video_ids,
             ),
             self.bm25_retriever.query_similar_contexts(
-                workspace_id, query_text, retrieval_count, video_ids
+                workspace_id,
+                query_text,
+                adaptive_fetch_count(n_results, corpus_size, self.bm25_fetch_factor),
+                video_ids,
             ),
         )
 
+        return self._fuse(vector_results, bm25_results, n_results)
+
+    async def query_similar_contexts_batch(
+        self,
+        workspace_id: str,
+        query_texts: List[str],
+        n_results: int = 5,
+        video_ids_list: Optional[List[Optional[List[str]]]] = None,
+    ) -> List[List[RetrievedContext]]:
+
+        layers = await get_workspace_layers(workspace_id)
+        corpus_size = await asyncio.get_running_loop().run_in_executor(
+            None,
+            get_vector_store().count_context_units,
+            workspace_id,
+            self.embedding_model,
+            layers.collection_ids,
+        )
+
+        vector_batch, bm25_batch = await asyncio.gather(
+            self.vector_retriever.query_similar_contexts_batch(
+                workspace_id,
+                query_texts,
+                adaptive_fetch_count(n_results, corpus_size, self.vector_fetch_factor),
+                video_ids_list,
+            ),
+            self.bm25_retriever.query_similar_contexts_batch(
+                workspace_id,
+                query_texts,
+                adaptive_fetch_count(n_results, corpus_size, self.bm25_fetch_factor),
+                video_ids_list,
+            ),
+        )
+
+        return [
+            self._fuse(vector_results, bm25_results, n_results)
+            for vector_results, bm25_results in zip(vector_batch, bm25_batch)
+        ]
+
+    def _fuse(
+        self,
+        vector_results: List[RetrievedContext],
+        bm25_results: List[RetrievedContext],
+        n_results: int,
+    ) -> List[RetrievedContext]:
         if not vector_results and not bm25_results:
             return []
         if not vector_results:
@@ -51,40 +122,11 @@ class HybridRetriever(BaseRetriever):
         if not bm25_results:
             return vector_results[:n_results]
 
-        vector_ranks = {r["id"]: i + 1 for i, r in enumerate(vector_results)}
-        bm25_ranks = {r["id"]: i + 1 for i, r in enumerate(bm25_results)}
-
-        all_results = {}
-        for r in vector_results:
-            all_results[r["id"]] = r
-        for r in bm25_results:
-            if r["id"] not in all_results:
-                all_results[r["id"]] = r
-
-        rrf_scores = {}
-        all_ids = set(vector_ranks.keys()) | set(bm25_ranks.keys())
-
-        for doc_id in all_ids:
-            score = 0.0
-            if doc_id in vector_ranks:
-                score += self.weight_vector * (1.0 / (self.k + vector_ranks[doc_id]))
-            if doc_id in bm25_ranks:
-                score += self.weight_bm25 * (1.0 / (self.k + bm25_ranks[doc_id]))
-            rrf_scores[doc_id] = score
-
-        sorted_ids = sorted(
-            rrf_scores.keys(), key=lambda x: rrf_scores[x], reverse=True
-        )
-        top_ids = sorted_ids[:n_results]
-
-        final_results = []
-        for doc_id in top_ids:
-            item = all_results[doc_id].copy()
-            score = rrf_scores[doc_id]
-
-            # Convert score to 0–1 distance
-            item["distance"] = 1.0 / (1.0 + score * 10)
-
-            final_results.append(item)
-
-        return final_results
+        with stage("fusion"):
+            return fuse_results(
+                [vector_results, bm25_results],
+                [self.weight_vector, self.weight_bm25],
+                n_results,
+                method=self.fusion_method,
+                k=self.k,
+            )
@@ -1,6 +1,9 @@
-from typing import List, Dict, Optional
-from app.services.retrievers.base_retriever import BaseRetriever
-from app.services.vector_store import vector_store
+import asyncio
+from typing import List, Optional
+from app.services.retrievers.base_retriever import BaseRetriever, RetrievedContext
+from app.services.vector_store import get_vector_store
+from app.services.workspace_layers import get_workspace_layers
+from app.utils.stage_timer import bind_context
 
 
 class VectorRetriever(BaseRetriever):
@@ -13,7 +16,41 @@ class VectorRetriever(BaseRetriever):
         query_text: str,
         n_results: int = 5,
         video_ids: Optional[List[str]] = None,
-    ) -> List[Dict]:
-        return vector_store.query_similar_contexts(
-            workspace_id, query_text, n_results, video_ids, self.embedding_model
+    ) -> List[RetrievedContext]:
+        layers = await get_workspace_layers(workspace_id)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            bind_context(
+                get_vector_store().query_similar_contexts,
+                workspace_id,
+                query_text,
+                n_results,
+                video_ids,
+                self.embedding_model,
+                layers.scopes(video_ids),
+            ),
+        )
+
+    async def query_similar_contexts_batch(
+        self,
+        workspace_id: str,
+        query_texts: List[str],
+        n_results: int = 5,
+        video_ids_list: Optional[List[Optional[List[str]]]] = None,
+    ) -> List[List[RetrievedContext]]:
+        layers = await get_workspace_layers(workspace_id)
+        video_ids_list = video_ids_list or [None] * len(query_texts)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            bind_context(
+                get_vector_store().query_similar_contexts_batch,
+                workspace_id,
+                query_texts,
+                n_results,
+                video_ids_list,
+                self.embedding_model,
+                [layers.scopes(video_ids) for video_ids in video_ids_list],
+            ),
         )
@@ -0,0 +1,216 @@
+from bisect import bisect_left
+from itertools import accumulate
+from typing import List, Dict, Iterable, Optional
+from app.database import get_database
+from app.utils.metrics import register_cache
+from app.utils.token_counter import estimate_tokens
+from app.utils.ttl_cache import TTLCache
+
+
+class VideoIntervals:
+    """Context units of one video sorted by start time, with token prefix sums."""
+
+    def __init__(self, video_id: str, units: List[Dict]):
+        units = sorted(units, key=lambda u: (u["start_time"], u["end_time"]))
+
+        self.video_id = video_id
+        self.ids = [str(u["_id"]) for u in units]
+        self.video_paths = [u.get("video_path", "") for u in units]
+        self.starts = [float(u["start_time"]) for u in units]
+        self.ends = [float(u["end_time"]) for u in units]
+        self.texts = [u["text"] for u in units]
+        self._token_prefix = [0] + list(
+            accumulate(estimate_tokens(t) for t in self.texts)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def locate(self, context_id: str, start_time: float) -> Optional[int]:
+        """Position of a unit via binary search on start time."""
+        position = bisect_left(self.starts, start_time)
+        while position < len(self.ids) and self.starts[position] == start_time:
+            if self.ids[position] == context_id:
+                return position
+            position += 1
+        return None
+
+    def tokens_between(self, lo: int, hi: int) -> int:
+        return self._token_prefix[hi + 1] - self._token_prefix[lo]
+
+
+class TemporalIndex:
+    """
+    In-process per-video interval index over context units.
+
+    Each video is loaded from Mongo once (all missing videos of a request in a
+    single query) and kept in an LRU cache, so expanding hits to their
+    temporal neighbors costs O(log n) per hit and no per-request queries.
+    Edits made through another worker are picked up once the entry expires.
+    """
+
+    def __init__(self, max_videos: int = 512, ttl: float = 30.0):
+        self.cache = TTLCache(maxsize=max_videos, ttl=ttl)
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def invalidate(self, video_ids: Iterable[str]):
+        for video_id in video_ids:
+            self.cache.invalidate(video_id)
+
+    async def _ensure_loaded(
+        self, video_ids: Iterable[str]
+    ) -> Dict[str, VideoIntervals]:
+        loaded = {}
+        missing = []
+        for vid in set(video_ids):
+            intervals = self.cache.get(vid)
+            if intervals is None:
+                missing.append(vid)
+            else:
+                loaded[vid] = intervals
+
+        if missing:
+            db = await get_database()
+            units = await db.context_units.find(
+                {"video_id": {"$in": missing}},
+                {
+                    "_id": 1,
+                    "video_id": 1,
+                    "video_path": 1,
+                    "text": 1,
+                    "start_time": 1,
+                    "end_time": 1,
+                },
+            ).to_list(None)
+
+            grouped = {vid: [] for vid in missing}
+            for unit in units:
+                grouped[unit["video_id"]].append(unit)
+
+            for vid, video_units in grouped.items():
+                loaded[vid] = VideoIntervals(vid, video_units)
+                self.cache.set(vid, loaded[vid])
+
+        return loaded
+
+    @staticmethod
+    def _grow(
+        intervals: VideoIntervals, position: int, neighbors: int, token_budget: int
+    ) -> List[int]:
+        """Extend [position, position] outward, nearest neighbor first."""
+        lo = hi = position
+        for _ in range(neighbors):
+            grown = False
+            if lo > 0 and intervals.tokens_between(lo - 1, hi) <= token_budget:
+                lo -= 1
+                grown = True
+            if (
+                hi < len(intervals) - 1
+                and intervals.tokens_between(lo, hi + 1) <= token_budget
+            ):
+                hi += 1
+                grown = True
+            if not grown:
+                break
+        return [lo, hi]
+
+    async def expand(
+        self,
+        contexts: List[Dict],
+        neighbors: int = 1,
+        token_budget: int = 1024,
+    ) -> List[Dict]:
+        """
+        Expand retrieved contexts to their temporal neighbors and merge
+        overlapping/adjacent units of the same video into one window.
+
+        Args:
+            contexts: Retrieved contexts in rank order
+            neighbors: Units to add on each side of a hit
+            token_budget: Maximum estimated tokens per merged window
+
+        Returns:
+            One context per window in the rank order of its best hit. The
+            window keeps the hit's "id" and lists every unit in "units".
+        """
+        if neighbors <= 0 or not contexts:
+            return contexts
+
+        videos = await self._ensure_loaded(
+            ctx["metadata"]["video_id"] for ctx in contexts
+        )
+
+        # video_id -> list of [lo, hi, best_rank, hit_position]
+        windows: Dict[str, List[List[int]]] = {}
+        passthrough = []
+
+        for rank, ctx in enumerate(contexts):
+            metadata = ctx["metadata"]
+            intervals = videos[metadata["video_id"]]
+            position = (
+                intervals.locate(ctx["id"], float(metadata["start_time"]))
+                if len(intervals)
+                else None
+            )
+            if position is None:
+                passthrough.append((rank, ctx))
+                continue
+            lo, hi = self._grow(intervals, position, neighbors, token_budget)
+            windows.setdefault(metadata["video_id"], []).append(
+                [lo, hi, rank, position]
+            )
+
+        merged_windows = []
+        for video_id, video_windows in windows.items():
+            intervals = videos[video_id]
+            video_windows.sort()
+
+            current = video_windows[0]
+            for lo, hi, rank, position in video_windows[1:]:
+                fits = intervals.tokens_between(current[0], hi) <= token_budget
+                if position <= current[1]:
+                    # Hit already inside the current window
+                    current[2] = min(current[2], rank)
+                    if hi > current[1] and fits:
+                        current[1] = hi
+                elif lo <= current[1] + 1 and fits:
+                    current[1] = hi
+                    current[2] = min(current[2], rank)
+                else:
+                    merged_windows.append((video_id, current))
+                    current = [max(lo, current[1] + 1), hi, rank, position]
+            merged_windows.append((video_id, current))
+
+        expanded = list(passthrough)
+        for video_id, (lo, hi, rank, _) in merged_windows:
+            intervals = videos[video_id]
+            hit = contexts[rank]
+            item = hit.copy()
+            item["text"] = "\n".join(intervals.texts[lo : hi + 1])
+            item["metadata"] = {
+                **hit["metadata"],
+                "start_time": intervals.starts[lo],
+                "end_time": max(intervals.ends[lo : hi + 1]),
+            }
+            # SourceUnit records (kept as plain dicts to stay import-light)
+            item["units"] = [
+                {
+                    "id": intervals.ids[i],
+                    "video_id": video_id,
+                    "video_path": intervals.video_paths[i],
+                    "text": intervals.texts[i],
+                    "start_time": intervals.starts[i],
+                    "end_time": intervals.ends[i],
+                }
+                for i in range(lo, hi + 1)
+            ]
+            expanded.append((rank, item))
+
+        expanded.sort(key=lambda pair: pair[0])
+        return [item for _, item in expanded]
+
+
+temporal_index = TemporalIndex()
+register_cache("temporal_index", temporal_index.cache)
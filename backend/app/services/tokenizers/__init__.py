@@ -0,0 +1,31 @@
+from app.services.tokenizers.base_tokenizer import BaseTokenizer
+from app.services.tokenizers.whitespace_tokenizer import WhitespaceTokenizer
+from app.services.tokenizers.vietnamese_tokenizer import (
+    VietnameseTokenizer,
+    fold_diacritics,
+)
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def get_tokenizer(tokenizer_type: str = None) -> BaseTokenizer:
+    tokenizer_type = tokenizer_type or settings.lexical_tokenizer
+    if tokenizer_type == "vietnamese":
+        return VietnameseTokenizer()
+    elif tokenizer_type == "whitespace":
+        return WhitespaceTokenizer()
+    else:
+        raise ValueError(
+            f"Unknown tokenizer type: {tokenizer_type}. "
+            f"Supported types: 'vietnamese', 'whitespace'"
+        )
+
+
+__all__ = [
+    "BaseTokenizer",
+    "WhitespaceTokenizer",
+    "VietnameseTokenizer",
+    "fold_diacritics",
+    "get_tokenizer",
+]
@@ -0,0 +1,10 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class BaseTokenizer(ABC):
+    name: str = "base"
+
+    @abstractmethod
+    def tokenize(self, text: str) -> List[str]:
+        pass
@@ -0,0 +1,72 @@
+import re
+import unicodedata
+from typing import List, Tuple
+from app.services.tokenizers.base_tokenizer import BaseTokenizer
+
+VIETNAMESE_STOPWORDS = frozenset(
+    """
+    à ạ ai bị bởi cả các cái cần cho chỉ chứ có của cũng đã đang đây để đến
+    đều điều do đó được gì hay hoặc khi không là lại lên mà một nào này nên
+    nếu như những nhưng nó ở ra rằng rất rồi sau sẽ sự tại thì theo thế trên
+    trong từ và vào vẫn về vì với vậy
+    """.split()
+)
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Punctuation ends a phrase; n-grams never span two phrases
+_PHRASE_BOUNDARY = re.compile(r"[^\w\s]+", re.UNICODE)
+
+
+def fold_diacritics(text: str) -> str:
+    """Strip Vietnamese tone and vowel marks: "học máy" -> "hoc may"."""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+
+
+class VietnameseTokenizer(BaseTokenizer):
+    """
+    Syllable tokenizer for Vietnamese text.
+
+    Vietnamese words span several space-separated syllables ("học máy"), so
+    adjacent syllables are also emitted as n-grams ("học_máy"). Stopwords are
+    dropped from unigrams and n-grams never bridge a stopword.
+    """
+
+    name = "vietnamese"
+
+    def __init__(
+        self,
+        ngram_range: Tuple[int, int] = (1, 2),
+        fold: bool = True,
+        remove_stopwords: bool = True,
+    ):
+        self.ngram_range = ngram_range
+        self.fold = fold
+        self.remove_stopwords = remove_stopwords
+
+    def _phrases(self, text: str) -> List[List[str]]:
+        text = unicodedata.normalize("NFC", text.lower())
+        return [
+            _WORD_PATTERN.findall(phrase) for phrase in _PHRASE_BOUNDARY.split(text)
+        ]
+
+    def tokenize(self, text: str) -> List[str]:
+        min_n, max_n = self.ngram_range
+        tokens = []
+
+        for syllables in self._phrases(text):
+            is_stopword = [
+                self.remove_stopwords and s in VIETNAMESE_STOPWORDS
+                for s in syllables
+            ]
+            if self.fold:
+                syllables = [fold_diacritics(s) for s in syllables]
+
+            for n in range(min_n, max_n + 1):
+                for i in range(len(syllables) - n + 1):
+                    if any(is_stopword[i : i + n]):
+                        continue
+                    tokens.append("_".join(syllables[i : i + n]))
+
+        return tokens
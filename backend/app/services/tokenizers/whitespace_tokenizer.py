@@ -0,0 +1,11 @@
+from typing import List
+from app.services.tokenizers.base_tokenizer import BaseTokenizer
+
+
+class WhitespaceTokenizer(BaseTokenizer):
+    """Lowercase + whitespace split (the original BM25 behaviour)."""
+
+    name = "whitespace"
+
+    def tokenize(self, text: str) -> List[str]:
+        return text.lower().split()
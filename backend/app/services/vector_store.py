@@ -1,52 +1,140 @@
 import os
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Callable, List, Dict, Optional
 from app.config import get_settings
 from app.models.context_unit import ContextUnit
+from app.services.chroma_writer import ChromaWriter
+from app.services.workspace_layers import Scope
+from app.services.model_server import (
+    ModelServerClient,
+    ModelServerUnavailable,
+    get_model_server_client,
+)
+from app.utils.metrics import model_load_seconds
+from app.utils.stage_timer import stage
+from app.utils.startup_profile import startup_profile
 import numpy as np
 import shutil
 from pathlib import Path
 
-import torch
-
 settings = get_settings()
 
+# Collection suffix -> HuggingFace model; every workspace is indexed with all
+EMBEDDING_MODELS = {
+    "dangvantuan": "dangvantuan/vietnamese-embedding",
+    "halong": "hiieu/halong_embedding",
+}
+
+
+def _get_device() -> str:
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    elif torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def load_embedding_model(embedding_model: str):
+    """Load an embedding model in this process."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    model_name = EMBEDDING_MODELS[embedding_model]
+    print(f"Loading embedding model: {model_name}")
+    start_time = time.time()
+    model = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": _get_device()},
+        encode_kwargs={"normalize_embeddings": True},
+    )
+    load_time = time.time() - start_time
+    model_load_seconds.labels(model=model_name).set(load_time)
+    startup_profile.record(f"load:{model_name}", load_time)
+    print(f"Embedding model {model_name} loaded in {load_time:.2f} seconds")
+    return model
+
+
+class RemoteEmbeddings:
+    """Embeddings from the shared model server, loading locally if it goes away."""
+
+    def __init__(
+        self, client: ModelServerClient, embedding_model: str, load_local: Callable
+    ):
+        self.client = client
+        self.embedding_model = embedding_model
+        self._load_local = load_local
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.client.available():
+            try:
+                return self.client.embed(self.embedding_model, list(texts))
+            except ModelServerUnavailable:
+                pass
+        return self._load_local().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
 
 class VectorStore:
     def __init__(self):
         self.persist_directory = settings.chroma_persist_dir
 
-        if torch.cuda.is_available():
-            device = "cuda"
-        elif torch.backends.mps.is_available():
-            device = "mps"
-        else:
-            device = "cpu"
-
-        # Initialize both embedding models
-        self.embedding_models = {
-            "dangvantuan": HuggingFaceEmbeddings(
-                model_name="dangvantuan/vietnamese-embedding",
-                model_kwargs={"device": device},
-                encode_kwargs={"normalize_embeddings": True},
-            ),
-            "halong": HuggingFaceEmbeddings(
-                model_name="hiieu/halong_embedding",
-                model_kwargs={"device": device},
-                encode_kwargs={"normalize_embeddings": True},
-            ),
-        }
+        # Embedding models load on first use (or from the startup preload);
+        # with a model server configured these are RemoteEmbeddings
+        self.embedding_models = {}
+        self._local_models = {}
+        self._load_lock = threading.Lock()
 
         self._chroma_instances = {}
 
+        # Every add/delete/clone/drop goes through one writer per workspace
+        self.writer = ChromaWriter(
+            self.persist_directory,
+            self._apply_writes,
+            self._embed_writes,
+            max_batch=settings.ingest_max_batch,
+            wait=settings.ingest_coalesce_wait,
+        )
+
+    def _get_local_model(self, embedding_model: str):
+        model = self._local_models.get(embedding_model)
+        if model is not None:
+            return model
+
+        with self._load_lock:
+            if embedding_model not in self._local_models:
+                self._local_models[embedding_model] = load_embedding_model(
+                    embedding_model
+                )
+        return self._local_models[embedding_model]
+
+    def get_embedding_model(self, embedding_model: str):
+        model = self.embedding_models.get(embedding_model)
+        if model is not None:
+            return model
+
+        client = get_model_server_client()
+        if client is not None and client.available():
+            model = RemoteEmbeddings(
+                client,
+                embedding_model,
+                lambda: self._get_local_model(embedding_model),
+            )
+        else:
+            model = self._get_local_model(embedding_model)
+
+        return self.embedding_models.setdefault(embedding_model, model)
+
     def get_or_create_collection(
         self, workspace_id: str, embedding_model: str = "dangvantuan"
     ):
 
-        if embedding_model not in self.embedding_models:
+        if embedding_model not in EMBEDDING_MODELS:
             raise ValueError(
-                f"Unknown embedding model: {embedding_model}. Supported: {list(self.embedding_models.keys())}"
+                f"Unknown embedding model: {embedding_model}. Supported: {list(EMBEDDING_MODELS.keys())}"
             )
 
         collection_name = f"workspace_{workspace_id}_{embedding_model}"
@@ -56,9 +144,11 @@ class VectorStore:
 
         workspace_persist_dir = str(Path(self.persist_directory) / collection_name)
 
+        from langchain_chroma import Chroma
+
         chroma_instance = Chroma(
             collection_name=collection_name,
-            embedding_function=self.embedding_models[embedding_model],
+            embedding_function=self.get_embedding_model(embedding_model),
             persist_directory=workspace_persist_dir,
         )
 
@@ -66,6 +156,33 @@ class VectorStore:
 
         return chroma_instance
 
+    def count_context_units(
+        self,
+        workspace_id: str,
+        embedding_model: str = "dangvantuan",
+        collection_ids: Optional[List[str]] = None,
+    ) -> int:
+        total = 0
+        for collection_workspace_id in collection_ids or [workspace_id]:
+            chroma = self.get_or_create_collection(
+                collection_workspace_id, embedding_model
+            )
+            try:
+                total += chroma._collection.count()
+            except Exception as e:
+                print(f"Error counting context units for {embedding_model}: {e}")
+        return total
+
+    @staticmethod
+    def _metadata(context_unit: ContextUnit, video_id: str, video_path: str) -> Dict:
+        return {
+            "id": str(context_unit.id),  # Store ID in metadata for retrieval
+            "video_id": video_id,
+            "video_path": video_path,
+            "start_time": float(context_unit.start_time),
+            "end_time": float(context_unit.end_time),
+        }
+
     def add_context_units(
         self,
         workspace_id: str,
@@ -78,48 +195,124 @@ class VectorStore:
         ids = []
 
         for context_unit in context_units:
-            context_id = str(context_unit.id)
-            text = context_unit.text
-
-            texts.append(text)
-            ids.append(context_id)
+            texts.append(context_unit.text)
+            ids.append(str(context_unit.id))
+            metadatas.append(self._metadata(context_unit, video_id, video_path))
 
-            metadatas.append(
-                {
-                    "id": context_id,  # Store ID in metadata for retrieval
-                    "video_id": video_id,
-                    "video_path": video_path,
-                    "start_time": float(context_unit.start_time),
-                    "end_time": float(context_unit.end_time),
-                }
-            )
+        self.writer.write(
+            workspace_id, "add", ids=ids, texts=texts, metadatas=metadatas
+        )
 
-        # Save to BOTH embedding models
-        for embedding_model in self.embedding_models.keys():
-            chroma = self.get_or_create_collection(workspace_id, embedding_model)
-            chroma.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+    def upsert_context_units(
+        self,
+        workspace_id: str,
+        video_id: str,
+        video_path: str,
+        context_units: List[ContextUnit],
+        embeddings: Optional[Dict[str, List[List[float]]]] = None,
+    ):
+        """
+        Embed (or re-embed) the given units in both models, replacing old vectors.
+        `embeddings` holds precomputed vectors per model; other models embed.
+        """
+        self.writer.write(
+            workspace_id,
+            "upsert",
+            ids=[str(unit.id) for unit in context_units],
+            texts=[unit.text for unit in context_units],
+            metadatas=[
+                self._metadata(unit, video_id, video_path) for unit in context_units
+            ],
+            embeddings=embeddings or {},
+        )
 
-    def query_similar_contexts(
+    def update_context_metadata(
         self,
         workspace_id: str,
-        query_text: str,
-        n_results: int = 5,
-        video_ids: Optional[List[str]] = None,
-        embedding_model: str = "dangvantuan",
+        video_id: str,
+        video_path: str,
+        context_units: List[ContextUnit],
+    ):
+        """Rewrite metadata (timestamps) only; the stored vectors are kept."""
+        self.writer.write(
+            workspace_id,
+            "update_metadata",
+            ids=[str(unit.id) for unit in context_units],
+            metadatas=[
+                self._metadata(unit, video_id, video_path) for unit in context_units
+            ],
+        )
+
+    def _embed_writes(
+        self, workspace_id: str, kind: str, payloads: List[Dict]
     ) -> List[Dict]:
-        print(f"Querying vector store with embedding model: {embedding_model}")
+        """
+        Fill in every model's vectors for a coalesced add/upsert batch.
 
-        chroma = self.get_or_create_collection(workspace_id, embedding_model)
+        Runs in the writer thread before the cross-process lock is taken,
+        with one model call per model for all merged payloads that lack
+        precomputed vectors. Other kinds pass through unchanged.
+        """
+        if kind not in ("add", "upsert"):
+            return payloads
+
+        embedded = [
+            {**payload, "embeddings": dict(payload.get("embeddings") or {})}
+            for payload in payloads
+        ]
+        for embedding_model in EMBEDDING_MODELS.keys():
+            pending = [p for p in embedded if embedding_model not in p["embeddings"]]
+            texts = [text for payload in pending for text in payload["texts"]]
+            if not texts:
+                continue
+            computed = iter(
+                self.get_embedding_model(embedding_model).embed_documents(texts)
+            )
+            for payload in pending:
+                payload["embeddings"][embedding_model] = [
+                    next(computed) for _ in payload["texts"]
+                ]
+        return embedded
+
+    def _write_vectors(self, workspace_id: str, payloads: List[Dict], method: str):
+        texts = [text for payload in payloads for text in payload["texts"]]
+        metadatas = [m for payload in payloads for m in payload["metadatas"]]
+        ids = [context_id for payload in payloads for context_id in payload["ids"]]
+
+        # Save to BOTH embedding models, with the vectors prepared beforehand
+        for embedding_model in EMBEDDING_MODELS.keys():
+            chroma = self.get_or_create_collection(workspace_id, embedding_model)
+            embeddings = [
+                vector
+                for payload in payloads
+                for vector in payload["embeddings"][embedding_model]
+            ]
+            getattr(chroma._collection, method)(
+                ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas
+            )
 
-        filter_dict = None
-        if video_ids is not None and len(video_ids) > 0:
-            filter_dict = {"video_id": {"$in": video_ids}}
+    def _add(self, workspace_id: str, payloads: List[Dict]):
+        self._write_vectors(workspace_id, payloads, "add")
 
-        results = chroma.similarity_search_with_relevance_scores(
-            query=query_text, k=n_results, filter=filter_dict
-        )
-        print(f"Retrieved {len(results)} contexts from vector store.")
+    def _upsert(self, workspace_id: str, payloads: List[Dict]):
+        self._write_vectors(workspace_id, payloads, "upsert")
+
+    def _update_metadata(self, workspace_id: str, payloads: List[Dict]):
+        metadatas = [m for payload in payloads for m in payload["metadatas"]]
+        ids = [context_id for payload in payloads for context_id in payload["ids"]]
+
+        for embedding_model in EMBEDDING_MODELS.keys():
+            chroma = self.get_or_create_collection(workspace_id, embedding_model)
+            chroma._collection.update(ids=ids, metadatas=metadatas)
 
+    @staticmethod
+    def _video_filter(video_ids: Optional[List[str]]) -> Optional[Dict]:
+        if video_ids is not None and len(video_ids) > 0:
+            return {"video_id": {"$in": video_ids}}
+        return None
+
+    @staticmethod
+    def _to_contexts(results) -> List[Dict]:
         retrieved_contexts = []
         for doc, score in results:
             retrieved_contexts.append(
@@ -135,9 +328,130 @@ class VectorStore:
                     "distance": 1 - score,
                 }
             )
-
         return retrieved_contexts
 
+    def _search(
+        self,
+        embedding: List[float],
+        scopes: List[Scope],
+        n_results: int,
+        embedding_model: str,
+    ) -> List[Dict]:
+        """Top results across the scopes' collections (one for plain workspaces)."""
+        results = []
+        for collection_workspace_id, video_ids in scopes:
+            chroma = self.get_or_create_collection(
+                collection_workspace_id, embedding_model
+            )
+            # The by-vector search returns raw distances
+            relevance_fn = chroma._select_relevance_score_fn()
+            results.extend(
+                (doc, relevance_fn(distance))
+                for doc, distance in chroma.similarity_search_by_vector_with_relevance_scores(
+                    embedding=embedding,
+                    k=n_results,
+                    filter=self._video_filter(video_ids),
+                )
+            )
+
+        if len(scopes) > 1:
+            results = sorted(results, key=lambda item: item[1], reverse=True)
+            results = results[:n_results]
+        return self._to_contexts(results)
+
+    def query_similar_contexts(
+        self,
+        workspace_id: str,
+        query_text: str,
+        n_results: int = 5,
+        video_ids: Optional[List[str]] = None,
+        embedding_model: str = "dangvantuan",
+        scopes: Optional[List[Scope]] = None,
+    ) -> List[Dict]:
+        """`scopes` (from WorkspaceLayers) replace workspace_id/video_ids for clones."""
+        print(f"Querying vector store with embedding model: {embedding_model}")
+        scopes = scopes if scopes is not None else [(workspace_id, video_ids)]
+
+        with stage("embedding"):
+            query_embedding = self.get_embedding_model(embedding_model).embed_query(
+                query_text
+            )
+
+        with stage("vector_search"):
+            contexts = self._search(query_embedding, scopes, n_results, embedding_model)
+        print(f"Retrieved {len(contexts)} contexts from vector store.")
+
+        return contexts
+
+    def query_similar_contexts_batch(
+        self,
+        workspace_id: str,
+        query_texts: List[str],
+        n_results: int = 5,
+        video_ids_list: Optional[List[Optional[List[str]]]] = None,
+        embedding_model: str = "dangvantuan",
+        scopes_list: Optional[List[List[Scope]]] = None,
+    ) -> List[List[Dict]]:
+        """Encode all queries in one model call, then search per query."""
+        if not query_texts:
+            return []
+
+        if scopes_list is None:
+            video_ids_list = video_ids_list or [None] * len(query_texts)
+            scopes_list = [[(workspace_id, video_ids)] for video_ids in video_ids_list]
+
+        with stage("embedding"):
+            query_embeddings = self.get_embedding_model(
+                embedding_model
+            ).embed_documents(query_texts)
+
+        with stage("vector_search"):
+            batch_results = [
+                self._search(embedding, scopes, n_results, embedding_model)
+                for embedding, scopes in zip(query_embeddings, scopes_list)
+            ]
+
+        print(
+            f"Retrieved contexts for {len(query_texts)} queries from vector store "
+            f"({embedding_model})."
+        )
+        return batch_results
+
+    def get_embeddings(
+        self,
+        workspace_id: str,
+        context_ids: List[str],
+        embedding_model: str = "dangvantuan",
+        collection_ids: Optional[List[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Stored embeddings by context ID (no re-embedding).
+
+        collection_ids lists every workspace to read from (clones read their
+        inherited vectors from the owners' collections).
+        """
+        if not context_ids:
+            return {}
+
+        embeddings = {}
+        missing = list(context_ids)
+        for collection_workspace_id in collection_ids or [workspace_id]:
+            chroma = self.get_or_create_collection(
+                collection_workspace_id, embedding_model
+            )
+            try:
+                data = chroma.get(ids=missing, include=["embeddings"])
+            except Exception as e:
+                print(f"Error fetching embeddings from {embedding_model}: {e}")
+                continue
+
+            for context_id, embedding in zip(data["ids"], data["embeddings"]):
+                embeddings[context_id] = np.asarray(embedding, dtype=np.float32)
+            missing = [cid for cid in missing if cid not in embeddings]
+            if not missing:
+                break
+
+        return embeddings
+
     def delete_context_units(
         self,
         workspace_id: str,
@@ -151,21 +465,37 @@ class VectorStore:
             context_ids: List of context IDs to delete
             embedding_model: Specific model to delete from. If None, deletes from ALL models.
         """
-        if embedding_model:
-            # Delete from specific model only
+        self.writer.write(
+            workspace_id, "delete", ids=context_ids, embedding_model=embedding_model
+        )
+
+    def _delete(self, workspace_id: str, payloads: List[Dict]):
+        # Coalesced deletes all target the same model(s)
+        context_ids = [
+            context_id for payload in payloads for context_id in payload["ids"]
+        ]
+        embedding_model = payloads[0]["embedding_model"]
+        models = [embedding_model] if embedding_model else EMBEDDING_MODELS.keys()
+
+        for model in models:
             try:
-                chroma = self.get_or_create_collection(workspace_id, embedding_model)
+                chroma = self.get_or_create_collection(workspace_id, model)
                 chroma.delete(ids=context_ids)
             except Exception as e:
-                print(f"Error deleting context units from {embedding_model}: {e}")
-        else:
-            # Delete from ALL embedding models
-            for model in self.embedding_models.keys():
-                try:
-                    chroma = self.get_or_create_collection(workspace_id, model)
-                    chroma.delete(ids=context_ids)
-                except Exception as e:
-                    print(f"Error deleting context units from {model}: {e}")
+                print(f"Error deleting context units from {model}: {e}")
+
+    def delete_videos(self, workspace_id: str, video_ids: List[str]):
+        """Delete every vector of the given videos (matched by metadata)."""
+        self.writer.write(workspace_id, "delete_videos", video_ids=video_ids)
+
+    def _delete_videos(self, workspace_id: str, payloads: List[Dict]):
+        video_ids = [vid for payload in payloads for vid in payload["video_ids"]]
+        for model in EMBEDDING_MODELS.keys():
+            try:
+                chroma = self.get_or_create_collection(workspace_id, model)
+                chroma._collection.delete(where={"video_id": {"$in": video_ids}})
+            except Exception as e:
+                print(f"Error deleting video vectors from {model}: {e}")
 
     def clone_workspace_collection(
         self,
@@ -174,8 +504,23 @@ class VectorStore:
         context_id_mapping: Dict[str, str],  # old_context_id -> new_context_id
         video_id_mapping: Dict[str, str],  # old_video_id -> new_video_id
     ):
+        # Reads the source as-is; only the target's writer is involved
+        self.writer.write(
+            target_workspace_id,
+            "clone",
+            source_workspace_id=source_workspace_id,
+            context_id_mapping=context_id_mapping,
+            video_id_mapping=video_id_mapping,
+        )
 
-        for model in self.embedding_models.keys():
+    def _clone(
+        self,
+        source_workspace_id: str,
+        target_workspace_id: str,
+        context_id_mapping: Dict[str, str],
+        video_id_mapping: Dict[str, str],
+    ):
+        for model in EMBEDDING_MODELS.keys():
             try:
                 source_chroma = self.get_or_create_collection(
                     source_workspace_id, model
@@ -215,7 +560,7 @@ class VectorStore:
                     new_metadatas.append(new_metadata)
 
                 # Add to target with pre-computed embeddings (no re-embedding!)
-                target_chroma.add(
+                target_chroma._collection.add(
                     ids=new_ids,
                     embeddings=source_data["embeddings"],
                     documents=source_data["documents"],
@@ -230,7 +575,11 @@ class VectorStore:
 
     def delete_workspace_collection(self, workspace_id: str):
         """Delete all collections for a workspace (all embedding models)."""
-        for model in self.embedding_models.keys():
+        # Queued behind pending writes so nothing lands in a removed directory
+        self.writer.write(workspace_id, "drop")
+
+    def _drop(self, workspace_id: str):
+        for model in EMBEDDING_MODELS.keys():
             collection_name = f"workspace_{workspace_id}_{model}"
 
             if collection_name in self._chroma_instances:
@@ -243,5 +592,36 @@ class VectorStore:
             except Exception as e:
                 print(f"Error deleting workspace collection {collection_name}: {e}")
 
+    def _apply_writes(self, workspace_id: str, kind: str, payloads: List[Dict]):
+        """Run a coalesced batch from the workspace's single writer thread."""
+        if kind == "add":
+            self._add(workspace_id, payloads)
+        elif kind == "upsert":
+            self._upsert(workspace_id, payloads)
+        elif kind == "update_metadata":
+            self._update_metadata(workspace_id, payloads)
+        elif kind == "delete":
+            self._delete(workspace_id, payloads)
+        elif kind == "delete_videos":
+            self._delete_videos(workspace_id, payloads)
+        elif kind == "clone":
+            self._clone(target_workspace_id=workspace_id, **payloads[0])
+        elif kind == "drop":
+            self._drop(workspace_id)
+        else:
+            raise ValueError(f"Unknown vector store write: {kind}")
+
+
+_vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
+
 
-vector_store = VectorStore()
+def get_vector_store() -> VectorStore:
+    global _vector_store
+    if _vector_store is None:
+        # Executor threads may race here; a second instance would start its
+        # own writer threads for the same workspaces
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = VectorStore()
+    return _vector_store
@@ -2,27 +2,97 @@ from typing import List, Optional
 from datetime import datetime, timezone
 from fastapi import HTTPException, status, UploadFile
 from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
 from app.database import get_database
+from app.services.access_service import bump_visibility_epoch, verify_workspace_access
 from app.models.video import Video
 from app.models.context_unit import ContextUnit
 from app.schemas.video import VideoResponse
-from app.schemas.context_unit import ContextUnitData
+from app.schemas.context_unit import (
+    ContextUnitData,
+    ContextUnitsUpdate,
+    ContextUnitsUpdateResponse,
+)
 from app.utils.db_helpers import convert_objectid_to_str, prepare_id_filter
 from app.utils.storage import (
     save_video_file,
-    delete_video_file,
     delete_video_files_batch,
     extract_video_thumbnail,
 )
-from app.services.vector_store import vector_store
-from app.services.gemini_service import gemini_service
+from app.services.vector_store import get_vector_store
+from app.services.gemini_service import get_gemini_service
+from app.services.tokenizers import get_tokenizer
+from app.services.temporal_index import temporal_index
+from app.utils.metrics import bulk_units_processed_total
+from app.config import get_settings
+from app.services.workspace_layers import (
+    get_workspace_layers,
+    invalidate_layers,
+    shared_video_ids,
+)
+from app.utils.storage import delete_workspace_files
+from app.services.reaper import reaper
+
+settings = get_settings()
 
 executor = ThreadPoolExecutor(max_workers=2)
 
 
+# Transformative instructions to avoid copyright detection
+REFINE_PROMPT_TEMPLATE = """Hãy đọc kỹ đoạn nội dung sau (bao gồm visual_text + audio_text). 
+Hãy hiểu ý chính và DIỄN GIẢI LẠI HOÀN TOÀN theo cách của bạn, không sao chép.
+
+Nhiệm vụ:
+- Trích lọc & tổng hợp các thông tin LIÊN QUAN TỚI BÀI GIẢNG (kiến thức, lý thuyết, công thức, ví dụ, quan hệ, định nghĩa…)
+- Giữ NGUYÊN đầy đủ các nội dung học thuật xuất hiện trên slide (ý chính, công thức, thuật ngữ, quan hệ từ vựng…)
+- Loại bỏ toàn bộ phần không mang kiến thức: mô tả hình ảnh giảng viên, màu nền, bố cục, logo, intro, filler.
+- Ghép audio + slide thành một bản DIỄN GIẢI RÕ RÀNG – LOGIC – TỐI ƯU CHO SEMANTIC SEARCH.
+- Viết lại bằng ngôn ngữ tự nhiên, rõ nghĩa, tránh lặp lại văn bản gốc để hạn chế kiểm tra bản quyền.
+- Giữ nguyên các ký hiệu toán học, vector, công thức (không được lược bỏ).
+- Các ví dụ trên slide (như king–queen, Berlin–Germany, apples–apple+car…) phải được giữ lại đầy đủ.
+- Ưu tiên diễn giải theo dạng "giải thích khái niệm + công thức + ví dụ + kết luận".
+
+Đầu ra:
+- Một đoạn văn tóm lược – diễn giải mới hoàn toàn, mạch lạc, rõ ràng
+- Có thể dùng làm context cho Educational Video QA hoặc semantic RAG search
+- Không để sót bất kỳ nội dung kiến thức nào trong đoạn gốc
+
+Nội dung cần diễn giải:
+{text}
+
+Nội dung đã diễn giải:
+"""
+
+
+async def refine_texts(original_texts: List[str]) -> List[str]:
+    """Rewrite context unit texts with Gemini, keeping the original on failure."""
+    if not original_texts:
+        return []
+
+    prompts = [REFINE_PROMPT_TEMPLATE.format(text=text) for text in original_texts]
+
+    # Refine all texts in batch
+    refined_texts_raw = await get_gemini_service().generate_contents_batch(prompts)
+
+    # Fallback to original text if refinement failed (None)
+    refined_texts = [
+        refined if refined is not None else original
+        for refined, original in zip(refined_texts_raw, original_texts)
+    ]
+
+    # Log refinement results for debugging
+    failed_count = sum(1 for r in refined_texts_raw if r is None)
+    if failed_count > 0:
+        print(
+            f"Text refinement: {failed_count}/{len(refined_texts_raw)} texts failed, using original"
+        )
+
+    return refined_texts
+
+
 async def upload_video(
     workspace_id: str,
     user_id: str,
@@ -32,14 +102,7 @@ async def upload_video(
 
     db = await get_database()
 
-    workspace = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
-    )
-
-    if not workspace:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found"
-        )
+    await verify_workspace_access(workspace_id, user_id)
 
     file_path, file_size = await save_video_file(workspace_id, video_file)
 
@@ -78,54 +141,12 @@ async def upload_video(
     created_video.duration = duration
 
     # Refine texts using Gemini before saving
-    if context_units_data:
-        # Extract original texts
-        original_texts = [unit.text.strip() for unit in context_units_data]
-
-        # Create refinement prompts with more transformative instructions to avoid copyright detection
-        refine_prompt_template = """Hãy đọc kỹ đoạn nội dung sau (bao gồm visual_text + audio_text). 
-Hãy hiểu ý chính và DIỄN GIẢI LẠI HOÀN TOÀN theo cách của bạn, không sao chép.
-
-Nhiệm vụ:
-- Trích lọc & tổng hợp các thông tin LIÊN QUAN TỚI BÀI GIẢNG (kiến thức, lý thuyết, công thức, ví dụ, quan hệ, định nghĩa…)
-- Giữ NGUYÊN đầy đủ các nội dung học thuật xuất hiện trên slide (ý chính, công thức, thuật ngữ, quan hệ từ vựng…)
-- Loại bỏ toàn bộ phần không mang kiến thức: mô tả hình ảnh giảng viên, màu nền, bố cục, logo, intro, filler.
-- Ghép audio + slide thành một bản DIỄN GIẢI RÕ RÀNG – LOGIC – TỐI ƯU CHO SEMANTIC SEARCH.
-- Viết lại bằng ngôn ngữ tự nhiên, rõ nghĩa, tránh lặp lại văn bản gốc để hạn chế kiểm tra bản quyền.
-- Giữ nguyên các ký hiệu toán học, vector, công thức (không được lược bỏ).
-- Các ví dụ trên slide (như king–queen, Berlin–Germany, apples–apple+car…) phải được giữ lại đầy đủ.
-- Ưu tiên diễn giải theo dạng "giải thích khái niệm + công thức + ví dụ + kết luận".
-
-Đầu ra:
-- Một đoạn văn tóm lược – diễn giải mới hoàn toàn, mạch lạc, rõ ràng
-- Có thể dùng làm context cho Educational Video QA hoặc semantic RAG search
-- Không để sót bất kỳ nội dung kiến thức nào trong đoạn gốc
-
-Nội dung cần diễn giải:
-{text}
-
-Nội dung đã diễn giải:
-"""
-
-        prompts = [refine_prompt_template.format(text=text) for text in original_texts]
-
-        # Refine all texts in batch
-        refined_texts_raw = await gemini_service.generate_contents_batch(prompts)
-
-        # Fallback to original text if refinement failed (None)
-        refined_texts = [
-            refined if refined is not None else original
-            for refined, original in zip(refined_texts_raw, original_texts)
-        ]
+    refined_texts = await refine_texts(
+        [unit.text.strip() for unit in context_units_data]
+    )
 
-        # Log refinement results for debugging
-        failed_count = sum(1 for r in refined_texts_raw if r is None)
-        if failed_count > 0:
-            print(
-                f"Text refinement: {failed_count}/{len(refined_texts_raw)} texts failed, using original"
-            )
-    else:
-        refined_texts = []
+    # Token streams are computed once here so BM25 only tokenizes the query
+    tokenizer = get_tokenizer()
 
     context_dicts = [
         ContextUnit(
@@ -134,6 +155,8 @@ Nội dung đã diễn giải:
             text=refined_text,
             start_time=unit_data.start_time,
             end_time=unit_data.end_time,
+            tokens=tokenizer.tokenize(refined_text),
+            tokenizer=tokenizer.name,
         ).model_dump(by_alias=True, exclude={"id"})
         for unit_data, refined_text in zip(context_units_data, refined_texts)
     ]
@@ -148,7 +171,7 @@ Nội dung đã diễn giải:
 
         await asyncio.get_running_loop().run_in_executor(
             executor,
-            vector_store.add_context_units,
+            get_vector_store().add_context_units,
             workspace_id,
             video_id,
             video_path,
@@ -174,23 +197,16 @@ Nội dung đã diễn giải:
 async def list_videos(workspace_id: str, user_id: str) -> List[VideoResponse]:
     db = await get_database()
 
-    workspace = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
-    )
-
-    if not workspace:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found"
-        )
+    await verify_workspace_access(workspace_id, user_id)
 
-    videos_cursor = db.videos.find({"workspace_id": workspace_id}).sort(
-        "created_at", -1
-    )
+    layers = await get_workspace_layers(workspace_id)
+    videos_cursor = db.videos.find(layers.video_filter()).sort("created_at", -1)
     videos = []
 
     async for video_dict in videos_cursor:
         video_dict = convert_objectid_to_str(video_dict)
-        video = Video(**video_dict)
+        # Inherited videos are listed as the clone's own
+        video = Video(**{**video_dict, "workspace_id": workspace_id})
         videos.append(
             VideoResponse(
                 id=video.id,
@@ -212,17 +228,11 @@ async def list_videos(workspace_id: str, user_id: str) -> List[VideoResponse]:
 async def get_video(video_id: str, workspace_id: str, user_id: str) -> VideoResponse:
     db = await get_database()
 
-    workspace = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
-    )
-
-    if not workspace:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found"
-        )
+    await verify_workspace_access(workspace_id, user_id)
 
+    layers = await get_workspace_layers(workspace_id)
     video_dict = await db.videos.find_one(
-        {"_id": prepare_id_filter(video_id), "workspace_id": workspace_id}
+        {"_id": prepare_id_filter(video_id), **layers.video_filter()}
     )
 
     if not video_dict:
@@ -231,7 +241,7 @@ async def get_video(video_id: str, workspace_id: str, user_id: str) -> VideoResp
         )
 
     video_dict = convert_objectid_to_str(video_dict)
-    video = Video(**video_dict)
+    video = Video(**{**video_dict, "workspace_id": workspace_id})
 
     return VideoResponse(
         id=video.id,
@@ -247,79 +257,444 @@ async def get_video(video_id: str, workspace_id: str, user_id: str) -> VideoResp
     )
 
 
-async def delete_video(video_id: str, workspace_id: str, user_id: str) -> dict:
+async def _write_unit_vectors(
+    workspace_id: str,
+    video_id: str,
+    video_path: str,
+    reembed: List[ContextUnit],
+    retimed: List[ContextUnit],
+    delete_ids: List[str],
+) -> None:
+    loop = asyncio.get_running_loop()
+    vector_store = get_vector_store()
+    if reembed:
+        await loop.run_in_executor(
+            executor,
+            vector_store.upsert_context_units,
+            workspace_id,
+            video_id,
+            video_path,
+            reembed,
+        )
+    if retimed:
+        await loop.run_in_executor(
+            executor,
+            vector_store.update_context_metadata,
+            workspace_id,
+            video_id,
+            video_path,
+            retimed,
+        )
+    if delete_ids:
+        await loop.run_in_executor(
+            executor, vector_store.delete_context_units, workspace_id, delete_ids
+        )
+
+
+async def _restore_context_units(
+    db,
+    workspace_id: str,
+    video_id: str,
+    video_path: str,
+    previous: List[dict],
+    retimed_ids: set,
+    inserted_ids: List[str],
+    mongo_written: bool,
+) -> None:
+    """Best-effort undo of a failed unit edit, in the vectors and in Mongo."""
+    try:
+        if mongo_written and previous:
+            await db.context_units.bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in previous],
+                ordered=False,
+            )
+        if mongo_written and inserted_ids:
+            await db.context_units.delete_many(
+                {"_id": {"$in": [ObjectId(cid) for cid in inserted_ids]}}
+            )
+
+        units = [
+            ContextUnit(
+                _id=str(doc["_id"]),
+                video_id=video_id,
+                video_path=video_path,
+                text=doc["text"],
+                start_time=doc["start_time"],
+                end_time=doc["end_time"],
+            )
+            for doc in previous
+        ]
+        await _write_unit_vectors(
+            workspace_id,
+            video_id,
+            video_path,
+            [unit for unit in units if unit.id not in retimed_ids],
+            [unit for unit in units if unit.id in retimed_ids],
+            inserted_ids,
+        )
+    except Exception as e:
+        print(f"Restoring context units of video {video_id} failed: {e}")
+
+
+async def update_context_units(
+    video_id: str, workspace_id: str, user_id: str, update: ContextUnitsUpdate
+) -> ContextUnitsUpdateResponse:
+    """
+    Patch, insert and delete single context units of a video. Edits are
+    diffed against the stored units: only new or re-worded units are
+    re-tokenized and re-embedded, timestamp-only edits just rewrite vector
+    metadata, and untouched units are not written at all. Texts are stored
+    as given (no Gemini refinement).
+    """
     db = await get_database()
 
-    workspace = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
-    )
+    await verify_workspace_access(workspace_id, user_id)
 
-    if not workspace:
+    layers = await get_workspace_layers(workspace_id)
+    if layers.owner_of(video_id) is not None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Video is shared with the workspace this one was cloned from",
+        )
+    # Clones read the owner's units and vectors, so an edit would leak into them
+    if await shared_video_ids([video_id]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Video is still shared with clones of this workspace",
         )
 
     video_dict = await db.videos.find_one(
-        {"_id": prepare_id_filter(video_id), "workspace_id": workspace_id}
+        {"_id": prepare_id_filter(video_id), "workspace_id": workspace_id},
+        {"file_path": 1},
     )
-
     if not video_dict:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Video not found"
         )
+    video_path = video_dict["file_path"]
 
-    context_ids_to_delete = await db.context_units.find(
-        {"video_id": video_id}, {"_id": 1}
-    ).to_list(None)
+    stored = {
+        str(unit["_id"]): unit
+        async for unit in db.context_units.find(
+            {"video_id": video_id}, {"text": 1, "start_time": 1, "end_time": 1}
+        )
+    }
 
-    if context_ids_to_delete:
-        context_ids = [str(ctx["_id"]) for ctx in context_ids_to_delete]
-        await asyncio.get_running_loop().run_in_executor(
-            executor,
-            vector_store.delete_context_units,
+    edits = [edit for edit in update.upsert if edit.id is not None]
+    new_units = [edit for edit in update.upsert if edit.id is None]
+
+    unknown = [
+        cid for cid in [e.id for e in edits] + update.delete if cid not in stored
+    ]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Context units not found in this video: {', '.join(unknown)}",
+        )
+    if set(e.id for e in edits) & set(update.delete):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A context unit cannot be both updated and deleted",
+        )
+    if any(
+        e.text is None or e.start_time is None or e.end_time is None for e in new_units
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="New context units need text, start_time and end_time",
+        )
+
+    tokenizer = get_tokenizer()
+    mongo_updates = []
+    reembed: List[ContextUnit] = []
+    retimed: List[ContextUnit] = []
+
+    for edit in edits:
+        current = stored[edit.id]
+        text = edit.text.strip() if edit.text is not None else current["text"]
+        start_time = (
+            edit.start_time if edit.start_time is not None else current["start_time"]
+        )
+        end_time = edit.end_time if edit.end_time is not None else current["end_time"]
+        if start_time > end_time:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Context unit {edit.id} ends before it starts",
+            )
+
+        text_changed = text != current["text"]
+        times_changed = (start_time, end_time) != (
+            current["start_time"],
+            current["end_time"],
+        )
+        if not text_changed and not times_changed:
+            continue
+
+        changes = {"start_time": start_time, "end_time": end_time}
+        if text_changed:
+            # Only re-worded units get a new token stream for BM25
+            changes.update(
+                text=text, tokens=tokenizer.tokenize(text), tokenizer=tokenizer.name
+            )
+        mongo_updates.append(UpdateOne({"_id": current["_id"]}, {"$set": changes}))
+
+        unit = ContextUnit(
+            _id=edit.id,
+            video_id=video_id,
+            video_path=video_path,
+            text=text,
+            start_time=start_time,
+            end_time=end_time,
+        )
+        (reembed if text_changed else retimed).append(unit)
+
+    for edit in new_units:
+        if edit.start_time > edit.end_time:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A new context unit ends before it starts",
+            )
+
+    # Ids are minted here so the vectors can be written before Mongo
+    new_dicts = []
+    for edit in new_units:
+        context_dict = ContextUnit(
+            video_id=video_id,
+            video_path=video_path,
+            text=edit.text.strip(),
+            start_time=edit.start_time,
+            end_time=edit.end_time,
+            tokens=tokenizer.tokenize(edit.text.strip()),
+            tokenizer=tokenizer.name,
+        ).model_dump(by_alias=True, exclude={"id"})
+        context_dict["_id"] = ObjectId()
+        new_dicts.append(context_dict)
+        reembed.append(ContextUnit(**{**context_dict, "_id": str(context_dict["_id"])}))
+    inserted_ids = [str(context_dict["_id"]) for context_dict in new_dicts]
+
+    # Full copies of every unit about to change, to put back on failure
+    touched = [unit.id for unit in reembed + retimed if unit.id in stored]
+    previous = []
+    if touched or update.delete:
+        previous = await db.context_units.find(
+            {"_id": {"$in": [stored[cid]["_id"] for cid in touched + update.delete]}}
+        ).to_list(None)
+
+    # Vectors first, then Mongo, so a failed re-embed leaves Mongo untouched
+    mongo_written = False
+    try:
+        await _write_unit_vectors(
+            workspace_id, video_id, video_path, reembed, retimed, update.delete
+        )
+        mongo_written = True
+        if mongo_updates:
+            await db.context_units.bulk_write(mongo_updates, ordered=False)
+        if new_dicts:
+            await db.context_units.insert_many(new_dicts)
+        if update.delete:
+            await db.context_units.delete_many(
+                {"_id": {"$in": [stored[cid]["_id"] for cid in update.delete]}}
+            )
+    except Exception:
+        await _restore_context_units(
+            db,
             workspace_id,
-            context_ids,
+            video_id,
+            video_path,
+            previous,
+            {unit.id for unit in retimed},
+            inserted_ids,
+            mongo_written,
         )
+        raise
+
+    updated = len(mongo_updates)
+    if updated or inserted_ids or update.delete:
+        temporal_index.invalidate([video_id])
+
+    return ContextUnitsUpdateResponse(
+        inserted_ids=inserted_ids,
+        updated=updated,
+        reembedded=len(reembed),
+        deleted=len(update.delete),
+        unchanged=len(edits) - updated,
+    )
+
+
+async def delete_video(video_id: str, workspace_id: str, user_id: str) -> dict:
+    db = await get_database()
 
-    await db.context_units.delete_many({"video_id": video_id})
+    await verify_workspace_access(workspace_id, user_id)
 
-    await asyncio.get_running_loop().run_in_executor(
-        executor, delete_video_file, video_dict["file_path"]
+    layers = await get_workspace_layers(workspace_id)
+    if layers.owner_of(video_id) is not None:
+        # Inherited from the workspace this one was cloned from
+        await drop_inherited_videos(workspace_id, [video_id])
+        return {"message": "Video deleted successfully"}
+
+    video_dict = await db.videos.find_one(
+        {"_id": prepare_id_filter(video_id), "workspace_id": workspace_id},
+        {"_id": 1},
     )
 
-    await db.videos.delete_one({"_id": prepare_id_filter(video_id)})
+    if not video_dict:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Video not found"
+        )
+
+    # Tombstoned for the reaper (released if a clone still inherits it)
+    await delete_own_videos(workspace_id, [video_id])
 
     return {"message": "Video deleted successfully"}
 
 
 async def delete_videos_batch(workspace_id: str, video_ids: List[str]) -> None:
+    """
+    Physically delete videos in chunks: vectors by video filter, then context
+    units and video documents server-side. Context ids are never loaded.
+    """
     if not video_ids:
         return
 
     db = await get_database()
+    loop = asyncio.get_running_loop()
+    chunk_size = settings.bulk_chunk_size
 
-    video_object_ids = [prepare_id_filter(vid) for vid in video_ids]
-    videos = await db.videos.find({"_id": {"$in": video_object_ids}}).to_list(None)
-
-    context_ids_cursor = db.context_units.find(
-        {"video_id": {"$in": video_ids}}, {"_id": 1}
-    )
-    context_ids = [str(ctx["_id"]) async for ctx in context_ids_cursor]
+    for start in range(0, len(video_ids), chunk_size):
+        chunk = video_ids[start : start + chunk_size]
+        video_object_ids = [prepare_id_filter(vid) for vid in chunk]
 
-    if context_ids:
-        await asyncio.get_running_loop().run_in_executor(
-            executor,
-            vector_store.delete_context_units,
-            workspace_id,
-            context_ids,
+        await loop.run_in_executor(
+            executor, get_vector_store().delete_videos, workspace_id, chunk
         )
 
-    await db.context_units.delete_many({"video_id": {"$in": video_ids}})
+        await db.context_units.delete_many({"video_id": {"$in": chunk}})
+        temporal_index.invalidate(chunk)
 
-    file_paths = [v["file_path"] for v in videos]
-    if file_paths:
-        await asyncio.get_running_loop().run_in_executor(
-            executor, delete_video_files_batch, file_paths
+        file_paths = [
+            video["file_path"]
+            async for video in db.videos.find(
+                {"_id": {"$in": video_object_ids}}, {"file_path": 1}
+            )
+        ]
+        if file_paths:
+            await loop.run_in_executor(executor, delete_video_files_batch, file_paths)
+
+        await db.videos.delete_many({"_id": {"$in": video_object_ids}})
+
+        bulk_units_processed_total.labels(operation="delete").inc(len(chunk))
+        if len(video_ids) > chunk_size:
+            print(
+                f"Deleted {start + len(chunk)}/{len(video_ids)} videos "
+                f"from workspace {workspace_id}"
+            )
+
+
+async def delete_own_videos(workspace_id: str, video_ids: List[str]) -> None:
+    """
+    Delete a workspace's own videos: ones clones still use are released,
+    the rest tombstoned for the reaper. Both disappear from the workspace
+    right away.
+    """
+    if not video_ids:
+        return
+
+    db = await get_database()
+    shared = set(await shared_video_ids(video_ids))
+    if shared:
+        # Hidden from the owner; data stays until no clone references it
+        await db.videos.update_many(
+            {"_id": {"$in": [prepare_id_filter(vid) for vid in shared]}},
+            {"$set": {"workspace_id": None, "released_from": workspace_id}},
         )
+        await bump_visibility_epoch()
+
+    await tombstone_videos(
+        workspace_id, [vid for vid in video_ids if vid not in shared]
+    )
+    invalidate_layers(workspace_id)
+
+
+async def tombstone_videos(workspace_id: str, video_ids: List[str]) -> None:
+    """Hide videos and leave their physical deletion to the reaper."""
+    if not video_ids:
+        return
 
-    await db.videos.delete_many({"_id": {"$in": video_object_ids}})
+    db = await get_database()
+    await db.videos.update_many(
+        {"_id": {"$in": [prepare_id_filter(vid) for vid in video_ids]}},
+        {
+            "$set": {
+                "workspace_id": None,
+                "deleted_from": workspace_id,
+                "deleted_at": datetime.now(timezone.utc),
+            },
+            "$unset": {"released_from": ""},
+        },
+    )
+    invalidate_layers(workspace_id)
+    await bump_visibility_epoch()
+    reaper.wake()
+
+
+async def drop_inherited_videos(workspace_id: str, video_ids: List[str]) -> None:
+    """Remove inherited videos from a clone without touching the shared data."""
+    db = await get_database()
+    workspace_filter = {"_id": prepare_id_filter(workspace_id)}
+    await db.workspaces.update_one(
+        workspace_filter, {"$pull": {"layers.$[].video_ids": {"$in": video_ids}}}
+    )
+    await db.workspaces.update_one(
+        workspace_filter, {"$pull": {"layers": {"video_ids": {"$size": 0}}}}
+    )
+    invalidate_layers(workspace_id)
+    await bump_visibility_epoch()
+
+    await collect_released_videos(video_ids)
+
+
+async def collect_released_videos(video_ids: List[str]) -> None:
+    """Tombstone released videos that no clone inherits any more."""
+    if not video_ids:
+        return
+
+    db = await get_database()
+    released = await db.videos.find(
+        {
+            "_id": {"$in": [prepare_id_filter(vid) for vid in video_ids]},
+            "released_from": {"$exists": True},
+        },
+        {"released_from": 1},
+    ).to_list(None)
+    if not released:
+        return
+
+    still_shared = set(await shared_video_ids([str(v["_id"]) for v in released]))
+    by_owner = {}
+    for video in released:
+        if str(video["_id"]) not in still_shared:
+            by_owner.setdefault(video["released_from"], []).append(str(video["_id"]))
+
+    for owner_id, owner_video_ids in by_owner.items():
+        await tombstone_videos(owner_id, owner_video_ids)
+
+
+async def drop_orphaned_storage(workspace_id: str) -> None:
+    """Remove a deleted workspace's collections and files once nothing needs them."""
+    db = await get_database()
+    if await db.workspaces.find_one(
+        {"_id": prepare_id_filter(workspace_id)}, {"_id": 1}
+    ):
+        return
+    # Released videos are still in use; tombstoned ones are still being reaped
+    if await db.videos.find_one(
+        {"$or": [{"released_from": workspace_id}, {"deleted_from": workspace_id}]},
+        {"_id": 1},
+    ):
+        return
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        None, get_vector_store().delete_workspace_collection, workspace_id
+    )
+    await loop.run_in_executor(None, delete_workspace_files, workspace_id)
@@ -0,0 +1,144 @@
+"""
+Copy-on-write view of a workspace: its own videos plus those it inherited.
+
+A clone does not copy anything. It stores layers pointing at the videos it
+shares with the workspace it was cloned from; their context units stay
+where they are and their vectors stay in the owner's Chroma collections.
+The clone only writes its own entries once it diverges (uploads go to its
+own collections, deleting an inherited video drops the reference).
+
+When an owner deletes a video a clone still uses, the video is released
+(hidden from the owner, kept for the clones) and physically removed once
+the last reference is gone.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from app.database import get_database
+from app.utils.db_helpers import prepare_id_filter
+from app.utils.metrics import register_cache
+from app.utils.ttl_cache import TTLCache
+
+# (workspace whose collections hold the vectors, video filter or None for all)
+Scope = Tuple[str, Optional[List[str]]]
+
+layers_cache = TTLCache(maxsize=4096, ttl=30.0)
+register_cache("workspace_layers", layers_cache)
+
+
+class WorkspaceLayers:
+    def __init__(
+        self,
+        workspace_id: str,
+        inherited: Optional[List[Dict]] = None,
+        own_video_ids: Optional[List[str]] = None,
+    ):
+        self.workspace_id = workspace_id
+        # [{"workspace_id": owner, "video_ids": [...]}]
+        self.inherited = inherited or []
+        # Only listed when some own vectors belong to hidden videos
+        self.own_video_ids = own_video_ids
+
+    @property
+    def is_plain(self) -> bool:
+        return not self.inherited and self.own_video_ids is None
+
+    @property
+    def inherited_video_ids(self) -> List[str]:
+        return [vid for layer in self.inherited for vid in layer["video_ids"]]
+
+    @property
+    def collection_ids(self) -> List[str]:
+        """Workspaces whose collections hold this workspace's vectors."""
+        ids = [self.workspace_id]
+        for layer in self.inherited:
+            if layer["workspace_id"] not in ids:
+                ids.append(layer["workspace_id"])
+        return ids
+
+    def owner_of(self, video_id: str) -> Optional[str]:
+        for layer in self.inherited:
+            if video_id in layer["video_ids"]:
+                return layer["workspace_id"]
+        return None
+
+    def scopes(self, video_ids: Optional[List[str]] = None) -> List[Scope]:
+        """Collections to search, each with the videos visible through it."""
+        if self.is_plain:
+            return [(self.workspace_id, video_ids)]
+
+        wanted = set(video_ids) if video_ids else None
+        scopes: List[Scope] = []
+
+        if self.own_video_ids is None:
+            scopes.append((self.workspace_id, video_ids))
+        else:
+            own = [v for v in self.own_video_ids if wanted is None or v in wanted]
+            if own:
+                scopes.append((self.workspace_id, own))
+
+        # An empty filter would mean "everything", so empty layers are skipped
+        for layer in self.inherited:
+            visible = [v for v in layer["video_ids"] if wanted is None or v in wanted]
+            if visible:
+                scopes.append((layer["workspace_id"], visible))
+
+        return scopes
+
+    def video_filter(self) -> Dict:
+        """Mongo filter on `videos` matching every video visible here."""
+        if not self.inherited:
+            return {"workspace_id": self.workspace_id}
+        return {
+            "$or": [
+                {"workspace_id": self.workspace_id},
+                {
+                    "_id": {
+                        "$in": [
+                            prepare_id_filter(vid) for vid in self.inherited_video_ids
+                        ]
+                    }
+                },
+            ]
+        }
+
+
+async def get_workspace_layers(workspace_id: str) -> WorkspaceLayers:
+    layers = layers_cache.get(workspace_id)
+    if layers is not None:
+        return layers
+
+    db = await get_database()
+    workspace_dict = await db.workspaces.find_one(
+        {"_id": prepare_id_filter(workspace_id)}, {"layers": 1}
+    )
+    inherited = (workspace_dict or {}).get("layers") or []
+
+    own_video_ids = None
+    # Released and tombstoned videos keep vectors in our collections until
+    # they are reaped, so our own videos must then be listed explicitly
+    hidden = {"$or": [{"released_from": workspace_id}, {"deleted_from": workspace_id}]}
+    if await db.videos.find_one(hidden, {"_id": 1}):
+        videos = await db.videos.find(
+            {"workspace_id": workspace_id}, {"_id": 1}
+        ).to_list(None)
+        own_video_ids = [str(v["_id"]) for v in videos]
+
+    layers = WorkspaceLayers(workspace_id, inherited, own_video_ids)
+    layers_cache.set(workspace_id, layers)
+    return layers
+
+
+def invalidate_layers(workspace_id: str) -> None:
+    layers_cache.invalidate(workspace_id)
+
+
+async def shared_video_ids(video_ids: List[str]) -> List[str]:
+    """The given videos that some clone still inherits."""
+    if not video_ids:
+        return []
+    db = await get_database()
+    shared = await db.workspaces.distinct(
+        "layers.video_ids", {"layers.video_ids": {"$in": video_ids}}
+    )
+    wanted = set(video_ids)
+    return [vid for vid in shared if vid in wanted]
@@ -3,12 +3,27 @@ from datetime import datetime, timezone
 from fastapi import HTTPException, status
 import asyncio
 from app.database import get_database
-from app.models.workspace import Workspace
+from app.models.workspace import Workspace, WorkspaceLayer
 from app.schemas.workspace import WorkspaceCreate, WorkspaceUpdate, WorkspaceResponse
 from app.utils.db_helpers import convert_objectid_to_str, prepare_id_filter
-from app.services.vector_store import vector_store
-from app.utils.storage import delete_workspace_files
-from app.services.video_service import delete_videos_batch
+from app.services.vector_store import get_vector_store
+from app.services.video_service import (
+    collect_released_videos,
+    delete_own_videos,
+    drop_orphaned_storage,
+)
+from app.services.workspace_layers import get_workspace_layers, invalidate_layers
+from app.services.conversation_memory import conversation_memory
+from app.services.reaper import reaper
+from app.utils.metrics import bulk_units_processed_total
+from app.config import get_settings
+from app.services.access_service import (
+    verify_workspace_access,
+    invalidate_workspace_access,
+    bump_visibility_epoch,
+)
+
+settings = get_settings()
 
 
 async def create_workspace(
@@ -31,7 +46,9 @@ async def create_workspace(
 async def list_workspaces(user_id: str) -> List[WorkspaceResponse]:
     db = await get_database()
 
-    workspaces_cursor = db.workspaces.find({"user_id": user_id}).sort("updated_at", -1)
+    workspaces_cursor = db.workspaces.find(
+        {"user_id": user_id, "deleted_at": None}
+    ).sort("updated_at", -1)
     workspaces = []
 
     async for workspace_dict in workspaces_cursor:
@@ -41,6 +58,7 @@ async def list_workspaces(user_id: str) -> List[WorkspaceResponse]:
                 id=workspace.id,
                 user_id=workspace.user_id,
                 name=workspace.name,
+                parent_id=workspace.parent_id,
                 created_at=workspace.created_at,
                 updated_at=workspace.updated_at,
             )
@@ -53,7 +71,11 @@ async def get_workspace(workspace_id: str, user_id: str) -> WorkspaceResponse:
     db = await get_database()
 
     workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
+        {
+            "_id": prepare_id_filter(workspace_id),
+            "user_id": user_id,
+            "deleted_at": None,
+        }
     )
 
     if not workspace_dict:
@@ -66,6 +88,7 @@ async def get_workspace(workspace_id: str, user_id: str) -> WorkspaceResponse:
         id=workspace.id,
         user_id=workspace.user_id,
         name=workspace.name,
+        parent_id=workspace.parent_id,
         created_at=workspace.created_at,
         updated_at=workspace.updated_at,
     )
@@ -77,7 +100,11 @@ async def update_workspace(
     db = await get_database()
 
     workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
+        {
+            "_id": prepare_id_filter(workspace_id),
+            "user_id": user_id,
+            "deleted_at": None,
+        }
     )
 
     if not workspace_dict:
@@ -100,16 +127,23 @@ async def update_workspace(
         id=workspace.id,
         user_id=workspace.user_id,
         name=workspace.name,
+        parent_id=workspace.parent_id,
         created_at=workspace.created_at,
         updated_at=workspace.updated_at,
     )
 
 
-async def clone_workspace(workspace_id: str, user_id: str) -> WorkspaceResponse:
+async def clone_workspace(
+    workspace_id: str, user_id: str, full_copy: bool = False
+) -> WorkspaceResponse:
     db = await get_database()
 
     workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
+        {
+            "_id": prepare_id_filter(workspace_id),
+            "user_id": user_id,
+            "deleted_at": None,
+        }
     )
 
     if not workspace_dict:
@@ -119,119 +153,192 @@ async def clone_workspace(workspace_id: str, user_id: str) -> WorkspaceResponse:
 
     source_workspace = Workspace(**convert_objectid_to_str(workspace_dict))
 
+    layers = []
+    if not full_copy:
+        # Copy-on-write: reference the source's videos instead of copying them
+        videos = await db.videos.find(
+            {"workspace_id": workspace_id}, {"_id": 1}
+        ).to_list(None)
+        if videos:
+            layers.append(
+                WorkspaceLayer(
+                    workspace_id=workspace_id,
+                    video_ids=[str(video["_id"]) for video in videos],
+                )
+            )
+        layers.extend(source_workspace.layers)
+
     new_workspace = Workspace(
         user_id=user_id,
         name=f"{source_workspace.name} (Copy)",
+        parent_id=workspace_id,
+        layers=layers,
     )
 
     new_workspace_dict = new_workspace.model_dump(by_alias=True, exclude={"id"})
     result = await db.workspaces.insert_one(new_workspace_dict)
     new_workspace_id = str(result.inserted_id)
 
-    videos = await db.videos.find({"workspace_id": workspace_id}).to_list(None)
-
-    video_id_mapping = {}
-
-    if videos:
-        old_video_ids = [str(video["_id"]) for video in videos]
-
-        cloned_videos = []
-        for video in videos:
-            cloned_video = {
-                "workspace_id": new_workspace_id,
-                "filename": video["filename"],
-                "file_path": video["file_path"],
-                "file_size": video["file_size"],
-                "duration": video.get("duration"),
-                "thumbnail_path": video.get("thumbnail_path"),
-                "processing_status": video.get("processing_status", "completed"),
-                "created_at": datetime.now(timezone.utc),
-                "processed_at": video.get("processed_at"),
-            }
-            cloned_videos.append(cloned_video)
-
-        if cloned_videos:
-            result = await db.videos.insert_many(cloned_videos)
-            video_id_mapping = {
-                old_id: str(new_id)
-                for old_id, new_id in zip(old_video_ids, result.inserted_ids)
-            }
-
-    if video_id_mapping:
-        old_video_ids = list(video_id_mapping.keys())
-        context_units = await db.context_units.find(
-            {"video_id": {"$in": old_video_ids}}
-        ).to_list(None)
+    if full_copy:
+        await _copy_workspace_contents(db, source_workspace, new_workspace_id)
+
+    new_workspace_dict["id"] = new_workspace_id
+    return WorkspaceResponse(**new_workspace_dict)
 
-        if context_units:
-            cloned_context_units = []
-            for context in context_units:
-                old_video_id = context["video_id"]
-                new_video_id = video_id_mapping.get(old_video_id)
 
-                if new_video_id:
-                    cloned_context = {
+async def _copy_workspace_contents(
+    db, source_workspace: Workspace, new_workspace_id: str
+) -> None:
+    """Materialize a full copy of every video visible in the source."""
+    # Inherited videos are copied from the collections that hold them
+    sources = [(source_workspace.id, {"workspace_id": source_workspace.id})]
+    for layer in source_workspace.layers:
+        sources.append(
+            (
+                layer.workspace_id,
+                {"_id": {"$in": [prepare_id_filter(vid) for vid in layer.video_ids]}},
+            )
+        )
+
+    for collection_workspace_id, video_filter in sources:
+        await _copy_videos(db, collection_workspace_id, video_filter, new_workspace_id)
+
+
+async def _copy_videos(
+    db, workspace_id: str, video_filter: dict, new_workspace_id: str
+) -> None:
+    """
+    Copy videos and their context units inside MongoDB ($merge), then stream
+    the old -> new context id pairs to the vector store in chunks. Only the
+    video id mapping is held in memory, never the context units.
+    """
+    chunk_size = settings.bulk_chunk_size
+
+    # Copies keep their source id in `copied_from` until the vectors are in
+    await db.videos.aggregate(
+        [
+            {"$match": video_filter},
+            {
+                "$set": {
+                    "copied_from": {"$toString": "$_id"},
+                    "workspace_id": new_workspace_id,
+                    "created_at": "$$NOW",
+                }
+            },
+            {"$unset": ["_id", "released_from"]},
+            {"$merge": {"into": "videos", "whenNotMatched": "insert"}},
+        ]
+    ).to_list(None)
+
+    video_id_mapping = {
+        video["copied_from"]: str(video["_id"])
+        async for video in db.videos.find(
+            {"workspace_id": new_workspace_id, "copied_from": {"$exists": True}},
+            {"copied_from": 1},
+        )
+    }
+    if not video_id_mapping:
+        return
+
+    total = await db.context_units.count_documents(
+        {"video_id": {"$in": list(video_id_mapping)}}
+    )
+    for old_video_id, new_video_id in video_id_mapping.items():
+        await db.context_units.aggregate(
+            [
+                {"$match": {"video_id": old_video_id}},
+                {
+                    "$set": {
+                        "copied_from": {"$toString": "$_id"},
                         "video_id": new_video_id,
-                        "video_path": context["video_path"],
-                        "text": context["text"],
-                        "start_time": context["start_time"],
-                        "end_time": context["end_time"],
                     }
-                    cloned_context_units.append(cloned_context)
-
-        if cloned_context_units:
-            result = await db.context_units.insert_many(cloned_context_units)
+                },
+                {"$unset": "_id"},
+                {"$merge": {"into": "context_units", "whenNotMatched": "insert"}},
+            ]
+        ).to_list(None)
 
-            # Build context_id mapping (old -> new)
+    # Copy embeddings chunk by chunk (no re-embedding)
+    loop = asyncio.get_running_loop()
+    new_video_ids = list(video_id_mapping.values())
+    copied = 0
+
+    async def copy_vectors(context_id_mapping):
+        nonlocal copied
+        await loop.run_in_executor(
+            None,
+            get_vector_store().clone_workspace_collection,
+            workspace_id,
+            new_workspace_id,
+            context_id_mapping,
+            video_id_mapping,
+        )
+        copied += len(context_id_mapping)
+        bulk_units_processed_total.labels(operation="clone").inc(
+            len(context_id_mapping)
+        )
+        print(f"Cloning into {new_workspace_id}: {copied}/{total} context units")
+
+    context_id_mapping = {}
+    cursor = db.context_units.find(
+        {"video_id": {"$in": new_video_ids}, "copied_from": {"$exists": True}},
+        {"copied_from": 1},
+    ).batch_size(chunk_size)
+    async for context in cursor:
+        context_id_mapping[context["copied_from"]] = str(context["_id"])
+        if len(context_id_mapping) >= chunk_size:
+            await copy_vectors(context_id_mapping)
             context_id_mapping = {}
-            for i, old_context in enumerate(context_units):
-                old_id = str(old_context["_id"])
-                new_id = str(result.inserted_ids[i])
-                context_id_mapping[old_id] = new_id
-
-            # Fast clone vector embeddings (copy embeddings, no re-embedding)
-            loop = asyncio.get_running_loop()
-            await loop.run_in_executor(
-                None,
-                vector_store.clone_workspace_collection,
-                workspace_id,
-                new_workspace_id,
-                context_id_mapping,
-                video_id_mapping,
-            )
+    if context_id_mapping:
+        await copy_vectors(context_id_mapping)
 
-    new_workspace_dict["id"] = new_workspace_id
-    return WorkspaceResponse(**new_workspace_dict)
+    await db.context_units.update_many(
+        {"video_id": {"$in": new_video_ids}}, {"$unset": {"copied_from": ""}}
+    )
+    await db.videos.update_many(
+        {"workspace_id": new_workspace_id}, {"$unset": {"copied_from": ""}}
+    )
 
 
 async def delete_workspace(workspace_id: str, user_id: str) -> dict:
     db = await get_database()
 
-    workspace_dict = await db.workspaces.find_one(
-        {"_id": prepare_id_filter(workspace_id), "user_id": user_id}
+    await verify_workspace_access(workspace_id, user_id)
+
+    # Hidden immediately; the reaper removes the data in the background
+    await db.workspaces.update_one(
+        {"_id": prepare_id_filter(workspace_id)},
+        {"$set": {"deleted_at": datetime.now(timezone.utc)}},
     )
+    invalidate_workspace_access(workspace_id)
+    invalidate_layers(workspace_id)
+    await bump_visibility_epoch()
+    reaper.wake()
 
-    if not workspace_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found"
-        )
+    return {"message": "Workspace deleted successfully"}
+
+
+async def purge_workspace(workspace_id: str) -> None:
+    """Physical removal of a tombstoned workspace (run by the reaper)."""
+    db = await get_database()
 
     videos = await db.videos.find({"workspace_id": workspace_id}, {"_id": 1}).to_list(
         None
     )
     video_ids = [str(v["_id"]) for v in videos]
 
-    if video_ids:
-        await delete_videos_batch(workspace_id, video_ids)
+    # Videos that clones inherited are released, the rest tombstoned
+    await delete_own_videos(workspace_id, video_ids)
 
     await db.qa.delete_many({"workspace_id": workspace_id})
+    await conversation_memory.reset(workspace_id)
 
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(
-        None, vector_store.delete_workspace_collection, workspace_id
-    )
-    await loop.run_in_executor(None, delete_workspace_files, workspace_id)
+    invalidate_layers(workspace_id)
+    inherited_video_ids = (await get_workspace_layers(workspace_id)).inherited_video_ids
 
     await db.workspaces.delete_one({"_id": prepare_id_filter(workspace_id)})
+    invalidate_layers(workspace_id)
 
-    return {"message": "Workspace deleted successfully"}
+    # Without this workspace's references, released videos may now be unused
+    await collect_released_videos(inherited_video_ids)
+    await drop_orphaned_storage(workspace_id)
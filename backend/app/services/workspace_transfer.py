@@ -0,0 +1,633 @@
+"""
+Compact workspace export/import, to move a workspace between servers
+without re-running refinement or embedding.
+
+An export is a zip with:
+
+    manifest.json              format, counts, models and the sha256 and
+                               size of every other member
+    videos.jsonl               video documents
+    videos/<video_id>/<file>   video files (optional)
+    context_units.jsonl        context units, grouped by video
+    qa.jsonl                   question/answer history
+    embeddings/<model>.f16     contiguous float16 rows (little-endian)
+    embeddings/<model>.ids     id index: the context unit id of each row
+
+Rows follow the order of context_units.jsonl (units without a vector are
+skipped), so both sides stream the units and the vectors side by side in
+chunks of BULK_CHUNK_SIZE and a workspace never has to fit in memory.
+
+Import checks every checksum before writing anything, then bulk-inserts
+into a new workspace and stores the vectors as they are. Only models the
+archive lacks, or units without a row, are embedded.
+
+Also usable from the command line for migrations:
+
+    python -m app.services.workspace_transfer export <workspace_id> out.zip
+    python -m app.services.workspace_transfer import out.zip --user <user_id>
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import numpy as np
+from bson import ObjectId, json_util
+from fastapi import HTTPException, UploadFile, status
+from app.config import get_settings
+from app.database import get_database
+from app.models.context_unit import ContextUnit
+from app.models.workspace import Workspace
+from app.schemas.workspace import WorkspaceResponse
+from app.services.access_service import verify_workspace_access
+from app.services.reaper import reaper
+from app.services.vector_store import EMBEDDING_MODELS, get_vector_store
+from app.services.video_service import executor
+from app.services.workspace_layers import get_workspace_layers
+from app.utils.db_helpers import prepare_id_filter
+from app.utils.metrics import bulk_units_processed_total
+from app.utils.storage import extract_video_thumbnail, save_video_from_archive
+
+settings = get_settings()
+
+FORMAT = "workspace-export"
+VERSION = 1
+VECTOR_DTYPE = "<f2"  # float16, little-endian
+READ_BLOCK = 1 << 20
+
+# Bookkeeping of this server that must not travel with the documents
+LOCAL_FIELDS = (
+    "released_from",
+    "deleted_from",
+    "deleted_at",
+    "copied_from",
+    "reap_token",
+    "reap_after",
+    "reap_attempts",
+    "reap_error",
+)
+
+
+def _jsonl(docs: List[Dict]) -> bytes:
+    return "".join(json_util.dumps(doc) + "\n" for doc in docs).encode("utf-8")
+
+
+def _read_lines(stream: io.TextIOBase, limit: int) -> List[str]:
+    lines = []
+    while len(lines) < limit:
+        line = stream.readline()
+        if not line:
+            break
+        if line.strip():
+            lines.append(line)
+    return lines
+
+
+async def _chunks(cursor, size: int) -> AsyncIterator[List[Dict]]:
+    chunk = []
+    async for doc in cursor.batch_size(size):
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _HashedMember:
+    """A zip member being written, hashed on the way."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.sha256.update(data)
+        self.size += len(data)
+        self.stream.write(data)
+
+
+class ExportWriter:
+    def __init__(self, path: str):
+        self.zip = zipfile.ZipFile(path, "w", allowZip64=True)
+        self.files: Dict[str, Dict] = {}
+
+    @contextmanager
+    def member(self, name: str, compress: bool = True):
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        # Vectors and videos do not compress; storing them keeps reads cheap
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with self.zip.open(info, "w", force_zip64=True) as stream:
+            member = _HashedMember(stream)
+            yield member
+        self.files[name] = {"sha256": member.sha256.hexdigest(), "size": member.size}
+
+    def add_file(self, name: str, path: str):
+        with self.member(name, compress=False) as out, open(path, "rb") as f:
+            for block in iter(lambda: f.read(READ_BLOCK), b""):
+                out.write(block)
+
+    def close(self, manifest: Optional[Dict] = None):
+        if manifest is not None:
+            manifest = {**manifest, "files": self.files}
+            self.zip.writestr("manifest.json", json.dumps(manifest, indent=2))
+        self.zip.close()
+
+
+async def export_workspace(
+    workspace_id: str, path: str, include_videos: bool = True
+) -> Dict:
+    """Write a workspace (inherited videos included) to `path`; returns the manifest."""
+    db = await get_database()
+    loop = asyncio.get_running_loop()
+    chunk_size = settings.bulk_chunk_size
+
+    def run(fn, *args):
+        return loop.run_in_executor(executor, fn, *args)
+
+    workspace = await db.workspaces.find_one(
+        {"_id": prepare_id_filter(workspace_id), "deleted_at": None}
+    )
+    if not workspace:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found"
+        )
+    layers = await get_workspace_layers(workspace_id)
+
+    archive = await run(ExportWriter, path)
+    try:
+        videos = (
+            await db.videos.find(layers.video_filter()).sort("_id", 1).to_list(None)
+        )
+        for video in videos:
+            for field in LOCAL_FIELDS:
+                video.pop(field, None)
+            video["workspace_id"] = workspace_id
+        video_ids = [str(video["_id"]) for video in videos]
+
+        with archive.member("videos.jsonl") as out:
+            await run(out.write, _jsonl(videos))
+
+        video_files = {}
+        if include_videos:
+            for video in videos:
+                file_path = video.get("file_path")
+                if file_path and os.path.exists(file_path):
+                    name = f"videos/{video['_id']}/{Path(file_path).name}"
+                    await run(archive.add_file, name, file_path)
+                    video_files[str(video["_id"])] = name
+
+        # Vectors are fetched in the same pass as their units so the rows
+        # match the units exactly; they are spooled to disk and copied in after
+        spools = {model: _VectorSpool() for model in EMBEDDING_MODELS}
+        vector_store = get_vector_store()
+        unit_count = 0
+        try:
+            with archive.member("context_units.jsonl") as out:
+                for video_id in video_ids:
+                    cursor = db.context_units.find({"video_id": video_id}).sort(
+                        "_id", 1
+                    )
+                    async for chunk in _chunks(cursor, chunk_size):
+                        await run(out.write, _jsonl(chunk))
+                        unit_count += len(chunk)
+
+                        ids = [str(unit["_id"]) for unit in chunk]
+                        for model, spool in spools.items():
+                            vectors = await run(
+                                vector_store.get_embeddings,
+                                workspace_id,
+                                ids,
+                                model,
+                                layers.collection_ids,
+                            )
+                            await run(spool.write, ids, vectors)
+
+            models = {}
+            for model, spool in spools.items():
+                await run(spool.copy_into, archive, model)
+                models[model] = spool.info()
+                missing = unit_count - spool.count
+                if missing:
+                    print(
+                        f"Export {workspace_id}: {missing} units have no {model} vector"
+                    )
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+        qa_count = 0
+        with archive.member("qa.jsonl") as out:
+            cursor = db.qa.find({"workspace_id": workspace_id}).sort("created_at", 1)
+            async for chunk in _chunks(cursor, chunk_size):
+                await run(out.write, _jsonl(chunk))
+                qa_count += len(chunk)
+
+        manifest = {
+            "format": FORMAT,
+            "version": VERSION,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "workspace": {"id": workspace_id, "name": workspace["name"]},
+            "counts": {
+                "videos": len(videos),
+                "context_units": unit_count,
+                "qa": qa_count,
+            },
+            "embedding_models": models,
+            "video_files": video_files,
+        }
+        await run(archive.close, manifest)
+    except BaseException:
+        archive.close()
+        Path(path).unlink(missing_ok=True)
+        raise
+
+    print(
+        f"Exported workspace {workspace_id}: {len(videos)} videos, "
+        f"{unit_count} context units, {qa_count} QA"
+    )
+    return manifest
+
+
+class _VectorSpool:
+    """One model's float16 rows and id index, on disk until the zip takes them."""
+
+    def __init__(self):
+        self.vectors = tempfile.TemporaryFile()
+        self.ids = tempfile.TemporaryFile()
+        self.dim: Optional[int] = None
+        self.count = 0
+
+    def write(self, ids: List[str], vectors: Dict[str, np.ndarray]):
+        present = [cid for cid in ids if cid in vectors]
+        if not present:
+            return
+        matrix = np.stack([vectors[cid] for cid in present]).astype(VECTOR_DTYPE)
+        self.dim = self.dim or matrix.shape[1]
+        self.vectors.write(matrix.tobytes())
+        self.ids.write("".join(f"{cid}\n" for cid in present).encode())
+        self.count += len(present)
+
+    def copy_into(self, archive: ExportWriter, model: str):
+        for name, spool, compress in (
+            (f"embeddings/{model}.f16", self.vectors, False),
+            (f"embeddings/{model}.ids", self.ids, True),
+        ):
+            spool.seek(0)
+            with archive.member(name, compress=compress) as out:
+                for block in iter(lambda: spool.read(READ_BLOCK), b""):
+                    out.write(block)
+
+    def info(self) -> Dict:
+        return {"dtype": "float16", "dim": self.dim, "count": self.count}
+
+    def close(self):
+        self.vectors.close()
+        self.ids.close()
+
+
+def verify_archive(path: str) -> Dict:
+    """Check the format and every checksum; returns the manifest."""
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise ValueError("Archive is not a zip file")
+
+    with archive:
+        try:
+            manifest = json.loads(archive.read("manifest.json"))
+        except KeyError:
+            raise ValueError("Archive has no manifest.json")
+        if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+            raise ValueError(
+                f"Unsupported export format {manifest.get('format')!r} "
+                f"version {manifest.get('version')!r}"
+            )
+
+        for name, expected in manifest["files"].items():
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with archive.open(name) as stream:
+                    for block in iter(lambda: stream.read(READ_BLOCK), b""):
+                        digest.update(block)
+                        size += len(block)
+            except KeyError:
+                raise ValueError(f"{name} is missing")
+            except (zipfile.BadZipFile, zlib.error) as e:
+                raise ValueError(f"{name} is corrupt: {e}")
+            if digest.hexdigest() != expected["sha256"] or size != expected["size"]:
+                raise ValueError(f"Checksum mismatch for {name}")
+
+    return manifest
+
+
+class _VectorReader:
+    """Reads one model's rows in order, alongside its id index."""
+
+    def __init__(self, archive: zipfile.ZipFile, model: str, dim: int):
+        self.dim = dim
+        self.vectors = archive.open(f"embeddings/{model}.f16")
+        self.ids = io.TextIOWrapper(
+            archive.open(f"embeddings/{model}.ids"), encoding="utf-8"
+        )
+        self._next = self._read_id()
+
+    def _read_id(self) -> Optional[str]:
+        return self.ids.readline().strip() or None
+
+    def take(self, wanted: Set[str]) -> Dict[str, List[float]]:
+        """The next rows, as long as they belong to `wanted`."""
+        ids = []
+        while self._next is not None and self._next in wanted:
+            ids.append(self._next)
+            self._next = self._read_id()
+        if not ids:
+            return {}
+
+        data = self.vectors.read(len(ids) * self.dim * np.dtype(VECTOR_DTYPE).itemsize)
+        matrix = np.frombuffer(data, dtype=VECTOR_DTYPE).reshape(len(ids), self.dim)
+        return dict(zip(ids, matrix.astype(np.float32).tolist()))
+
+    def close(self):
+        self.vectors.close()
+        self.ids.close()
+
+
+async def import_workspace(
+    path: str, user_id: str, name: Optional[str] = None
+) -> WorkspaceResponse:
+    """Create a new workspace for `user_id` from an export archive."""
+    db = await get_database()
+    loop = asyncio.get_running_loop()
+
+    try:
+        manifest = await loop.run_in_executor(executor, verify_archive, path)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid workspace export: {e}",
+        )
+
+    workspace = Workspace(user_id=user_id, name=name or manifest["workspace"]["name"])
+    workspace_dict = workspace.model_dump(by_alias=True, exclude={"id"})
+    result = await db.workspaces.insert_one(workspace_dict)
+    workspace_id = str(result.inserted_id)
+
+    try:
+        await _import_contents(db, path, manifest, workspace_id)
+    except BaseException:
+        # The reaper removes whatever was written so far
+        await db.workspaces.update_one(
+            {"_id": result.inserted_id},
+            {"$set": {"deleted_at": datetime.now(timezone.utc)}},
+        )
+        reaper.wake()
+        raise
+
+    counts = manifest["counts"]
+    print(
+        f"Imported workspace {workspace_id}: {counts['videos']} videos, "
+        f"{counts['context_units']} context units, {counts['qa']} QA"
+    )
+    workspace_dict["id"] = workspace_id
+    return WorkspaceResponse(**workspace_dict)
+
+
+async def _import_contents(db, path: str, manifest: Dict, workspace_id: str):
+    loop = asyncio.get_running_loop()
+    chunk_size = settings.bulk_chunk_size
+    vector_store = get_vector_store()
+
+    def run(fn, *args):
+        return loop.run_in_executor(executor, fn, *args)
+
+    archive = await run(zipfile.ZipFile, path)
+    readers: Dict[str, _VectorReader] = {}
+    try:
+        # Old video id -> (new id, file path on this server)
+        video_map: Dict[str, Tuple[str, str]] = {}
+        videos = []
+        with io.TextIOWrapper(archive.open("videos.jsonl"), encoding="utf-8") as f:
+            lines = await run(_read_lines, f, manifest["counts"]["videos"] + 1)
+        for line in lines:
+            video = json_util.loads(line)
+            old_id = str(video.pop("_id"))
+            for field in LOCAL_FIELDS:
+                video.pop(field, None)
+            new_id = ObjectId()
+
+            member = manifest["video_files"].get(old_id)
+            if member:
+                video["file_path"], video["file_size"] = await run(
+                    save_video_from_archive, workspace_id, path, member, str(new_id)
+                )
+                thumbnail = await run(
+                    extract_video_thumbnail,
+                    video["file_path"],
+                    workspace_id,
+                    str(new_id),
+                )
+                video["thumbnail_path"] = (thumbnail or (None, None))[0]
+
+            video.update(_id=new_id, workspace_id=workspace_id)
+            videos.append(video)
+            video_map[old_id] = (str(new_id), video["file_path"])
+        if videos:
+            await db.videos.insert_many(videos)
+        new_video_ids = [new_id for new_id, _ in video_map.values()]
+
+        for model, info in manifest["embedding_models"].items():
+            if model not in EMBEDDING_MODELS:
+                print(f"Import {workspace_id}: skipping vectors of unknown {model}")
+            elif info["count"]:
+                readers[model] = await run(_VectorReader, archive, model, info["dim"])
+
+        imported = 0
+        total = manifest["counts"]["context_units"]
+        with io.TextIOWrapper(
+            archive.open("context_units.jsonl"), encoding="utf-8"
+        ) as f:
+            while True:
+                lines = await run(_read_lines, f, chunk_size)
+                if not lines:
+                    break
+
+                units = [json_util.loads(line) for line in lines]
+                old_ids = [str(unit["_id"]) for unit in units]
+                wanted = set(old_ids)
+                vectors = {
+                    model: await run(reader.take, wanted)
+                    for model, reader in readers.items()
+                }
+
+                # `copied_from` lets the QA history be remapped below
+                by_video: Dict[str, List[Tuple[Dict, str]]] = {}
+                for unit, old_id in zip(units, old_ids):
+                    new_video_id, video_path = video_map[unit["video_id"]]
+                    unit.update(
+                        _id=ObjectId(),
+                        video_id=new_video_id,
+                        video_path=video_path,
+                        copied_from=old_id,
+                    )
+                    by_video.setdefault(new_video_id, []).append((unit, old_id))
+                await db.context_units.insert_many(units, ordered=False)
+
+                for video_id, group in by_video.items():
+                    # Precomputed per model when the archive has every row
+                    embeddings = {
+                        model: [rows[old_id] for _, old_id in group]
+                        for model, rows in vectors.items()
+                        if all(old_id in rows for _, old_id in group)
+                    }
+                    context_units = [
+                        ContextUnit(
+                            _id=str(unit["_id"]),
+                            video_id=video_id,
+                            video_path=unit["video_path"],
+                            text=unit["text"],
+                            start_time=unit["start_time"],
+                            end_time=unit["end_time"],
+                        )
+                        for unit, _ in group
+                    ]
+                    await run(
+                        vector_store.upsert_context_units,
+                        workspace_id,
+                        video_id,
+                        context_units[0].video_path,
+                        context_units,
+                        embeddings,
+                    )
+
+                imported += len(units)
+                bulk_units_processed_total.labels(operation="import").inc(len(units))
+                print(
+                    f"Importing into {workspace_id}: {imported}/{total} context units"
+                )
+
+        with io.TextIOWrapper(archive.open("qa.jsonl"), encoding="utf-8") as f:
+            while True:
+                lines = await run(_read_lines, f, chunk_size)
+                if not lines:
+                    break
+
+                qas = [json_util.loads(line) for line in lines]
+                old_refs = list(
+                    {cid for qa in qas for cid in qa.get("source_context_ids", [])}
+                )
+                context_id_mapping = {
+                    unit["copied_from"]: str(unit["_id"])
+                    async for unit in db.context_units.find(
+                        {
+                            "video_id": {"$in": new_video_ids},
+                            "copied_from": {"$in": old_refs},
+                        },
+                        {"copied_from": 1},
+                    )
+                }
+                for qa in qas:
+                    qa.update(
+                        _id=ObjectId(),
+                        workspace_id=workspace_id,
+                        source_context_ids=[
+                            context_id_mapping[cid]
+                            for cid in qa.get("source_context_ids", [])
+                            if cid in context_id_mapping
+                        ],
+                    )
+                await db.qa.insert_many(qas, ordered=False)
+
+        await db.context_units.update_many(
+            {"video_id": {"$in": new_video_ids}}, {"$unset": {"copied_from": ""}}
+        )
+    finally:
+        for reader in readers.values():
+            reader.close()
+        archive.close()
+
+
+async def export_workspace_file(
+    workspace_id: str, user_id: str, include_videos: bool = True
+) -> Tuple[str, str]:
+    """Export to a temporary file; returns its path and a download name."""
+    await verify_workspace_access(workspace_id, user_id)
+
+    export_dir = Path(settings.import_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(
+        prefix=f"export_{workspace_id}_", suffix=".zip", dir=export_dir
+    )
+    os.close(fd)
+
+    manifest = await export_workspace(workspace_id, path, include_videos)
+    return path, f"{manifest['workspace']['name']}.zip"
+
+
+async def import_workspace_upload(
+    archive: UploadFile, user_id: str, name: Optional[str] = None
+) -> WorkspaceResponse:
+    import_dir = Path(settings.import_dir)
+    import_dir.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="workspace_", suffix=".zip", dir=import_dir)
+
+    def save_archive():
+        with os.fdopen(fd, "wb") as buffer:
+            for block in iter(lambda: archive.file.read(READ_BLOCK), b""):
+                buffer.write(block)
+
+    try:
+        await asyncio.get_running_loop().run_in_executor(executor, save_archive)
+        return await import_workspace(path, user_id, name)
+    finally:
+        Path(path).unlink(missing_ok=True)
+
+
+async def _cli(args):
+    from app.database import connect_to_mongo, close_mongo_connection
+
+    await connect_to_mongo()
+    try:
+        if args.command == "export":
+            await export_workspace(args.workspace_id, args.path, not args.no_videos)
+        else:
+            workspace = await import_workspace(args.path, args.user, args.name)
+            print(f"New workspace id: {workspace.id}")
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Workspace export/import")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write a workspace archive")
+    export_parser.add_argument("workspace_id")
+    export_parser.add_argument("path")
+    export_parser.add_argument(
+        "--no-videos", action="store_true", help="Leave the video files out"
+    )
+
+    import_parser = commands.add_parser("import", help="Create a workspace from one")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--user", required=True, help="Owner's user id")
+    import_parser.add_argument("--name", help="Workspace name (default: exported)")
+
+    asyncio.run(_cli(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    main()
@@ -0,0 +1,38 @@
+"""
+Helper functions for fire-and-forget work on the event loop
+"""
+
+import asyncio
+from typing import Coroutine, Set
+
+# Strong references so pending tasks are not garbage collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _on_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background task {task.get_name()} failed: {task.exception()}")
+
+
+def run_in_background(coro: Coroutine, name: str = None) -> asyncio.Task:
+    """
+    Schedule a coroutine without awaiting it.
+
+    Args:
+        coro: Coroutine to run
+        name: Task name used in error logs
+
+    Returns:
+        The scheduled task
+    """
+    task = asyncio.get_running_loop().create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def drain_background_tasks():
+    """Wait for pending background writes (used on shutdown)."""
+    if _background_tasks:
+        await asyncio.gather(*list(_background_tasks), return_exceptions=True)
@@ -0,0 +1,206 @@
+"""
+Opt-in event-loop stall detector for catching blocking calls in coroutines
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, Optional, Tuple
+from app.utils.metrics import event_loop_lag_seconds
+from app.config import get_settings
+
+settings = get_settings()
+
+# Frames kept per sample, innermost last
+STACK_DEPTH = 20
+
+
+def _route_label(scope: Dict) -> str:
+    # Route templates once routing ran, so ids do not split the report
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+class LoopMonitor:
+    """
+    Detects event-loop stalls and samples what is blocking it.
+
+    A heartbeat task ticks every `interval`. A watchdog thread samples the
+    loop thread's stack whenever the heartbeat is late by more than
+    `threshold`, and attributes the sample to the request whose task is
+    running (tracked by LoopMonitorMiddleware).
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        # Task -> ASGI scope of the request it serves
+        self._task_scopes: Dict[asyncio.Task, Dict] = {}
+        # Endpoint blamed by the watchdog for the stall in progress
+        self._stall_endpoint: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat is not None
+
+    def reset(self):
+        with self._lock:
+            self.stalls = 0
+            self.max_lag = 0.0
+            self.endpoints: Dict[str, Dict[str, float]] = {}
+            self.samples: Counter[Tuple[str, Tuple[str, ...]]] = Counter()
+
+    def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+
+        self._heartbeat = self._loop.create_task(
+            self._beat(), name="loop_monitor_heartbeat"
+        )
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+        print(f"Event-loop monitor started (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._stopped.set()
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat = None
+
+    def track(self, task: asyncio.Task, scope: Dict):
+        self._task_scopes[task] = scope
+
+    def untrack(self, task: asyncio.Task):
+        self._task_scopes.pop(task, None)
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+
+            lag = now - expected
+            event_loop_lag_seconds.observe(max(lag, 0.0))
+            if lag > self.threshold:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float):
+        endpoint = self._stall_endpoint or "unknown"
+        self._stall_endpoint = None
+
+        with self._lock:
+            self.stalls += 1
+            self.max_lag = max(self.max_lag, lag)
+            stats = self.endpoints.setdefault(
+                endpoint, {"stalls": 0, "blocked_seconds": 0.0, "max_lag": 0.0}
+            )
+            stats["stalls"] += 1
+            stats["blocked_seconds"] += lag
+            stats["max_lag"] = max(stats["max_lag"], lag)
+
+        print(f"Event loop blocked for {lag * 1000:.0f} ms ({endpoint})")
+
+    def _current_endpoint(self) -> str:
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "callback"
+        scope = self._task_scopes.get(task)
+        if scope is not None:
+            return _route_label(scope)
+        return f"task:{task.get_name()}"
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            if time.monotonic() - self._last_beat <= self.interval + self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            try:
+                endpoint = self._current_endpoint()
+            except RuntimeError:
+                # Task bookkeeping changed under us; blame it on the next sample
+                continue
+
+            stack = tuple(
+                f"{f.filename}:{f.lineno} in {f.name}"
+                for f in traceback.extract_stack(frame)[-STACK_DEPTH:]
+            )
+            self._stall_endpoint = endpoint
+            with self._lock:
+                self.samples[(endpoint, stack)] += 1
+
+    def report(self, top: int = 20) -> Dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "threshold": self.threshold,
+                "stalls": self.stalls,
+                "max_lag": self.max_lag,
+                "endpoints": sorted(
+                    (
+                        {"endpoint": endpoint, **stats}
+                        for endpoint, stats in self.endpoints.items()
+                    ),
+                    key=lambda e: e["blocked_seconds"],
+                    reverse=True,
+                ),
+                "stacks": [
+                    {"endpoint": endpoint, "samples": count, "stack": list(stack)}
+                    for (endpoint, stack), count in self.samples.most_common(top)
+                ],
+            }
+
+
+class LoopMonitorMiddleware:
+    """ASGI middleware mapping the task serving each request to its scope."""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        task = asyncio.current_task()
+        self.monitor.track(task, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.untrack(task)
+
+
+loop_monitor = LoopMonitor(
+    threshold=settings.loop_stall_threshold,
+    interval=settings.loop_monitor_interval,
+)
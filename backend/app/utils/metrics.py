@@ -0,0 +1,130 @@
+"""
+Prometheus metrics shared across services
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+password_hash_seconds = Histogram(
+    "password_hash_seconds",
+    "Time spent hashing or verifying a password",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+
+admission_active_requests = Gauge(
+    "ask_active_requests", "Questions currently being answered"
+)
+
+admission_queue_depth = Gauge("ask_queue_depth", "Questions waiting for an answer slot")
+
+admission_rejections_total = Counter(
+    "ask_rejections_total",
+    "Questions rejected by admission control",
+    ["reason"],
+)
+
+admission_wait_seconds = Histogram(
+    "ask_queue_wait_seconds",
+    "Time questions spent waiting for an answer slot",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+stage_seconds = Histogram(
+    "qa_stage_seconds",
+    "Time spent in each stage of answering a question",
+    ["stage"],
+    buckets=(
+        0.001,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+    ),
+)
+
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event-loop heartbeat woke up (loop monitor only)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+bulk_units_processed_total = Counter(
+    "bulk_units_processed_total",
+    "Context units (clone, import) or videos (delete) processed by bulk operations",
+    ["operation"],
+)
+
+reaper_backlog = Gauge(
+    "reaper_backlog", "Tombstoned items waiting to be reaped", ["kind"]
+)
+
+reaper_reaped_total = Counter(
+    "reaper_reaped_total", "Tombstoned items physically removed", ["kind"]
+)
+
+reaper_failures_total = Counter(
+    "reaper_failures_total", "Reap attempts that failed and were rescheduled", ["kind"]
+)
+
+model_load_seconds = Gauge(
+    "model_load_seconds", "Time the last load of each model took", ["model"]
+)
+
+
+class _RuntimeCollector:
+    """Reads cache counters and executor queues at scrape time."""
+
+    def __init__(self):
+        self.caches: Dict[str, object] = {}
+        self.executors: Dict[str, ThreadPoolExecutor] = {}
+
+    def collect(self):
+        hits = CounterMetricFamily(
+            "cache_hits", "Lookups answered from an in-process cache", labels=["cache"]
+        )
+        misses = CounterMetricFamily(
+            "cache_misses",
+            "Lookups an in-process cache could not answer",
+            labels=["cache"],
+        )
+        entries = GaugeMetricFamily(
+            "cache_entries", "Entries held by an in-process cache", labels=["cache"]
+        )
+        for name, cache in self.caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            entries.add_metric([name], len(cache))
+
+        queue_depth = GaugeMetricFamily(
+            "executor_queue_depth",
+            "Tasks waiting for a thread in an executor",
+            labels=["executor"],
+        )
+        for name, executor in self.executors.items():
+            queue_depth.add_metric([name], executor._work_queue.qsize())
+
+        return [hits, misses, entries, queue_depth]
+
+
+_runtime_collector = _RuntimeCollector()
+REGISTRY.register(_runtime_collector)
+
+
+def register_cache(name: str, cache) -> None:
+    """Export `hits`, `misses` and `len()` of a cache."""
+    _runtime_collector.caches[name] = cache
+
+
+def register_executor(name: str, executor: ThreadPoolExecutor) -> None:
+    _runtime_collector.executors[name] = executor
@@ -0,0 +1,60 @@
+"""
+Small staged pipeline on the event loop
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[[T], Awaitable[None]]
+    workers: int = 1
+
+
+async def run_pipeline(
+    items: Iterable[T],
+    stages: List[Stage],
+    on_error: Callable[[T, str, Exception], Awaitable[None]],
+    queue_size: int = 2,
+):
+    """
+    Push items through the stages in order. Each stage runs `workers` items
+    at once and the bounded queues between stages keep a fast stage from
+    running far ahead of a slow one, so different items are in different
+    stages at the same time. An item whose stage raises is handed to
+    `on_error` and goes no further.
+    """
+    queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+
+    async def feed():
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0].workers):
+            await queues[0].put(None)
+
+    async def worker(index: int):
+        stage = stages[index]
+        while True:
+            item = await queues[index].get()
+            if item is None:
+                return
+            try:
+                await stage.run(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await on_error(item, stage.name, e)
+                continue
+            if index + 1 < len(stages):
+                await queues[index + 1].put(item)
+
+    async def run_stage(index: int):
+        await asyncio.gather(*(worker(index) for _ in range(stages[index].workers)))
+        if index + 1 < len(stages):
+            for _ in range(stages[index + 1].workers):
+                await queues[index + 1].put(None)
+
+    await asyncio.gather(feed(), *(run_stage(i) for i in range(len(stages))))
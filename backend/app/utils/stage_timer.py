@@ -0,0 +1,57 @@
+"""
+Per-request stage timing
+"""
+
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from app.utils.metrics import stage_seconds
+
+# Stage -> seconds for the request being served (set by the metrics middleware)
+_current_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = (
+    contextvars.ContextVar("current_stages", default=None)
+)
+
+
+def start_stage_recording(
+    stages: Optional[Dict[str, float]] = None,
+) -> Dict[str, float]:
+    """Record this context's stages into `stages` (a fresh dict by default)."""
+    if stages is None:
+        stages = {}
+    _current_stages.set(stages)
+    return stages
+
+
+def current_stages() -> Dict[str, float]:
+    """Stages recorded so far for this request (a fresh dict outside one)."""
+    stages = _current_stages.get()
+    if stages is None:
+        stages = start_stage_recording()
+    return stages
+
+
+@contextmanager
+def stage(name: str, stages: Optional[Dict[str, float]] = None):
+    """
+    Time a block into the stage histogram and the request's stage dict.
+
+    Repeated or parallel blocks of the same stage add up.
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        stage_seconds.labels(stage=name).observe(elapsed)
+        if stages is None:
+            stages = _current_stages.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + elapsed
+
+
+def bind_context(func: Callable, *args) -> Callable:
+    """Carry the request's stage recording into run_in_executor threads."""
+    return functools.partial(contextvars.copy_context().run, func, *args)
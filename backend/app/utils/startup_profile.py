@@ -0,0 +1,40 @@
+"""
+Startup-time profile: how long imports, connections and model loads took
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready_after: float = None
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def mark_ready(self):
+        if self.ready_after is None:
+            self.ready_after = time.perf_counter() - self.started_at
+
+    def report(self) -> Dict:
+        return {
+            "phases": dict(
+                sorted(self.phases.items(), key=lambda item: item[1], reverse=True)
+            ),
+            "ready_after": self.ready_after,
+        }
+
+
+startup_profile = StartupProfile()
@@ -1,9 +1,9 @@
 import os
 import shutil
-from pathlib import Path
+import zipfile
+from pathlib import Path, PurePosixPath
 from typing import Tuple, Optional
 from fastapi import UploadFile
-import cv2
 from app.config import get_settings
 
 settings = get_settings()
@@ -36,6 +36,24 @@ async def save_video_file(workspace_id: str, file: UploadFile) -> Tuple[str, int
     return str(file_path).replace("\\", "/"), file_size
 
 
+def save_video_from_archive(
+    workspace_id: str, archive_path: str, member: str, video_id: str
+) -> Tuple[str, int]:
+    """Copy one video out of a zip archive into the workspace's upload dir."""
+    workspace_dir = ensure_upload_dir() / workspace_id
+    workspace_dir.mkdir(parents=True, exist_ok=True)
+
+    # Only the base name, so member paths cannot escape the upload dir, and
+    # prefixed with the video id so it cannot overwrite another upload
+    file_path = workspace_dir / f"{video_id}_{PurePosixPath(member).name}"
+
+    with zipfile.ZipFile(archive_path) as archive:
+        with archive.open(member) as source, open(file_path, "wb") as buffer:
+            shutil.copyfileobj(source, buffer)
+
+    return str(file_path).replace("\\", "/"), file_path.stat().st_size
+
+
 def delete_video_file(file_path: str):
     if os.path.exists(file_path):
         os.remove(file_path)
@@ -63,6 +81,9 @@ def delete_workspace_files(workspace_id: str):
 def extract_video_thumbnail(
     video_path: str, workspace_id: str, video_id: str
 ) -> Optional[str]:
+    # OpenCV is only needed at upload time, keep it out of startup
+    import cv2
+
     try:
         thumbnail_dir = ensure_thumbnail_dir()
         workspace_thumbnail_dir = thumbnail_dir / workspace_id
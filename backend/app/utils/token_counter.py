@@ -0,0 +1,21 @@
+"""
+Helper functions for estimating prompt sizes
+"""
+
+import math
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """
+    Cheap token estimate for budget decisions.
+
+    Args:
+        text: Text to measure
+        chars_per_token: Average characters per token of the target tokenizer
+
+    Returns:
+        Estimated number of tokens
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / chars_per_token)
@@ -0,0 +1,349 @@
+"""
+End-to-end load test of the API with local stand-ins for Gemini and MongoDB.
+
+Boots the FastAPI app in-process (no network), seeds synthetic workspaces,
+drives /ask for each retriever type (with and without reranker), video
+upload and history at a fixed concurrency, and writes a JSON baseline with
+QPS, latency percentiles and per-stage breakdowns.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test --sizes 100,1000 --concurrency 8 \\
+        --output benchmarks/baseline.json
+
+Embedding models (and the reranker, unless --no-reranker) are the real ones,
+so only Gemini and MongoDB are simulated.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+TOPICS = [
+    ("mạng nơ-ron", "lan truyền ngược", "hàm kích hoạt", "trọng số"),
+    ("word2vec", "vector từ", "king queen", "không gian nhúng"),
+    ("gradient descent", "tốc độ học", "hàm mất mát", "cực tiểu"),
+    ("transformer", "attention", "encoder decoder", "mã hóa vị trí"),
+    ("cây quyết định", "entropy", "information gain", "cắt tỉa"),
+    ("SVM", "siêu phẳng", "kernel", "lề cực đại"),
+    ("k-means", "tâm cụm", "khoảng cách Euclid", "hội tụ"),
+    ("CNN", "tích chập", "pooling", "bộ lọc"),
+    ("RNN", "LSTM", "chuỗi thời gian", "vanishing gradient"),
+    ("xác suất", "Bayes", "phân phối chuẩn", "kỳ vọng"),
+]
+
+QUESTION_TEMPLATES = [
+    "{0} là gì và liên quan thế nào tới {1}?",
+    "Giải thích {2} trong bài giảng về {0}",
+    "Tại sao {3} quan trọng khi học {0}?",
+    "So sánh {1} và {2}",
+]
+
+RETRIEVER_TYPES = ["vector", "bm25", "hybrid", "ensemble"]
+
+
+def configure_environment(args) -> Path:
+    """Settings are read at import time, so this runs before importing app."""
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="vqa-bench-"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    os.environ.setdefault("MONGODB_URL", "mongodb://stand-in")
+    os.environ.setdefault("MONGODB_DATABASE", "benchmark")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("GEMINI_API_KEYS", "stand-in")
+    os.environ["UPLOAD_DIR"] = str(work_dir / "videos")
+    os.environ["CHROMA_PERSIST_DIR"] = str(work_dir / "chroma_db")
+
+    if not args.keep_admission_limits:
+        # Measure the pipeline, not the per-user shedding of one bench user
+        os.environ["ASK_MAX_CONCURRENT"] = str(max(args.concurrency, 16))
+        os.environ["ASK_MAX_PER_USER"] = str(args.concurrency)
+        os.environ["ASK_MAX_QUEUE"] = str(args.concurrency * 4)
+
+    # main.py mounts ./storage relative to the working directory
+    os.chdir(work_dir)
+    sys.path.insert(0, str(BACKEND_DIR))
+    return work_dir
+
+
+def synthetic_units(n_units: int, rng: random.Random) -> List[Dict]:
+    units = []
+    for i in range(n_units):
+        topic = TOPICS[rng.randrange(len(TOPICS))]
+        terms = rng.sample(topic, 3)
+        text = (
+            f"Trong phần này giảng viên trình bày {terms[0]}, "
+            f"liên hệ với {terms[1]} và minh họa bằng ví dụ về {terms[2]}. "
+            f"Đoạn {i} nhấn mạnh cách áp dụng {topic[0]} trong thực tế."
+        )
+        units.append({"text": text, "start_time": i * 10.0, "end_time": i * 10.0 + 10})
+    return units
+
+
+def synthetic_questions(n: int, rng: random.Random) -> List[str]:
+    return [
+        rng.choice(QUESTION_TEMPLATES).format(*rng.choice(TOPICS)) for _ in range(n)
+    ]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(
+    name: str, latencies: List[float], statuses: Dict, stages: Dict, wall: float
+) -> Dict:
+    latencies = sorted(latencies)
+    ok = statuses.get(200, 0) + statuses.get(201, 0)
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "wall_seconds": wall,
+        "qps": len(latencies) / wall if wall > 0 else 0.0,
+        "latency": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "stages": {
+            stage: {
+                "mean": sum(values) / len(values),
+                "p95": percentile(sorted(values), 0.95),
+            }
+            for stage, values in sorted(stages.items())
+        },
+    }
+
+
+async def run_scenario(
+    name: str,
+    total: int,
+    concurrency: int,
+    make_request: Callable[[int], Awaitable],
+) -> Dict:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = defaultdict(int)
+    stages: Dict[str, List[float]] = defaultdict(list)
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start_time = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start_time)
+            statuses[response.status_code] += 1
+            if response.status_code == 200 and "timing" in response.text:
+                timing = response.json().get("timing") or {}
+                for stage, seconds in timing.get("stages", {}).items():
+                    stages[stage].append(seconds)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    result = summarize(name, latencies, statuses, stages, wall)
+    print(
+        f"{name:<40} {result['qps']:8.2f} qps  "
+        f"p50 {result['latency']['p50'] * 1000:8.1f} ms  "
+        f"p95 {result['latency']['p95'] * 1000:8.1f} ms  "
+        f"p99 {result['latency']['p99'] * 1000:8.1f} ms  "
+        f"ok {result['ok']}/{result['requests']}"
+    )
+    return result
+
+
+async def seed_workspace(client, headers, size: int, units_per_video: int, rng):
+    response = await client.post(
+        "/api/workspaces/", json={"name": f"bench-{size}"}, headers=headers
+    )
+    response.raise_for_status()
+    workspace_id = response.json()["id"]
+
+    units = synthetic_units(size, rng)
+    for v, start in enumerate(range(0, size, units_per_video)):
+        await upload(
+            client, headers, workspace_id, units[start : start + units_per_video], v
+        )
+
+    return workspace_id
+
+
+async def upload(
+    client, headers, workspace_id: str, units: List[Dict], n: int, check: bool = True
+):
+    response = await client.post(
+        f"/api/workspaces/{workspace_id}/videos",
+        files={"video_file": (f"video_{n}.mp4", b"\x00" * 1024, "video/mp4")},
+        data={"context_units": json.dumps(units)},
+        headers=headers,
+    )
+    if check:
+        response.raise_for_status()
+    return response
+
+
+async def main(args) -> Dict:
+    import httpx
+    from benchmarks.stand_ins import install_fake_generator, install_mongo_stand_in
+    from app.main import app
+    from app.utils.background import drain_background_tasks
+
+    rng = random.Random(args.seed)
+    fake = install_fake_generator(
+        args.generator_latency, args.generator_jitter, args.seed
+    )
+    await install_mongo_stand_in()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        response = await client.post(
+            "/api/auth/login", json={"username": "bench", "password": "bench"}
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        rerank_modes = [False] if args.no_reranker else [False, True]
+        results = []
+
+        for size in args.sizes:
+            print(f"Seeding workspace with {size} context units...")
+            workspace_id = await seed_workspace(
+                client, headers, size, args.units_per_video, rng
+            )
+            questions = synthetic_questions(args.requests, rng)
+
+            for retriever_type in args.retrievers:
+                for use_reranker in rerank_modes:
+
+                    def ask(
+                        i, retriever_type=retriever_type, use_reranker=use_reranker
+                    ):
+                        return client.post(
+                            f"/api/workspaces/{workspace_id}/ask",
+                            json={
+                                "question": questions[i],
+                                "retriever_type": retriever_type,
+                                "use_reranker": use_reranker,
+                                "use_history": args.use_history,
+                            },
+                            headers=headers,
+                        )
+
+                    name = f"ask size={size} {retriever_type}" + (
+                        " +rerank" if use_reranker else ""
+                    )
+                    result = await run_scenario(
+                        name, args.requests, args.concurrency, ask
+                    )
+                    results.append({**result, "workspace_size": size})
+
+            def history(i):
+                return client.get(
+                    f"/api/workspaces/{workspace_id}/history",
+                    params={"limit": 50},
+                    headers=headers,
+                )
+
+            result = await run_scenario(
+                f"history size={size}", args.requests, args.concurrency, history
+            )
+            results.append({**result, "workspace_size": size})
+
+            def upload_one(i):
+                return upload(
+                    client,
+                    headers,
+                    workspace_id,
+                    synthetic_units(args.upload_units, rng),
+                    10_000 + i,
+                    check=False,
+                )
+
+            result = await run_scenario(
+                f"upload size={size}",
+                max(1, args.requests // 10),
+                args.concurrency,
+                upload_one,
+            )
+            results.append({**result, "workspace_size": size})
+
+        await drain_background_tasks()
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "generator_calls": fake.calls,
+        "scenarios": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=[100, 1000],
+        help="Comma-separated context units per seeded workspace",
+    )
+    parser.add_argument(
+        "--retrievers",
+        type=lambda s: s.split(","),
+        default=RETRIEVER_TYPES,
+        help="Comma-separated retriever types to drive /ask with",
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--units-per-video", type=int, default=50)
+    parser.add_argument("--upload-units", type=int, default=20)
+    parser.add_argument(
+        "--generator-latency", type=float, default=0.3, help="Fake Gemini seconds"
+    )
+    parser.add_argument("--generator-jitter", type=float, default=0.1)
+    parser.add_argument("--no-reranker", action="store_true")
+    parser.add_argument("--use-history", action="store_true")
+    parser.add_argument(
+        "--keep-admission-limits",
+        action="store_true",
+        help="Keep ASK_* limits instead of raising them to the concurrency",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Storage directory (default: temp dir)")
+    parser.add_argument("--output", help="Write the JSON baseline here")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    output = Path(args.output).resolve() if args.output else None
+    configure_environment(args)
+
+    baseline = asyncio.run(main(args))
+
+    if output:
+        output.write_text(json.dumps(baseline, indent=2, ensure_ascii=False))
+        print(f"Baseline written to {output}")
+    else:
+        print(json.dumps(baseline, indent=2, ensure_ascii=False))
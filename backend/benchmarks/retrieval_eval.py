@@ -0,0 +1,261 @@
+"""
+Offline retrieval evaluation: quality and latency of every retriever setup.
+
+Runs each labeled question through the real get_retriever / reranker_service
+stack (against the MongoDB and Chroma data configured in .env) and reports
+recall@k, MRR and nDCG@k with p50/p95 latency and memory per configuration.
+
+Labeled set (JSONL, one question per line):
+
+    {"workspace_id": "...", "question": "...",
+     "relevant_ids": ["<context unit id>", ...],
+     "relevant_ranges": [{"video_id": "...", "start": 120.0, "end": 180.0}]}
+
+Each listed id and each range is one relevant item. A retrieved context
+finds the items whose id it has or whose range (same video) it overlaps,
+and every item is credited at most once, however many contexts find it. Questions are used as-is (no LLM query
+refinement), so results isolate the retrieval stack.
+
+Run from the backend directory:
+
+    python -m benchmarks.retrieval_eval labels.jsonl --output eval.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import resource
+import sys
+import time
+import tracemalloc
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.load_test import percentile  # noqa: E402
+from app.database import connect_to_mongo, close_mongo_connection  # noqa: E402
+from app.services.retrievers import FUSION_METHODS, get_retriever  # noqa: E402
+from app.services.reranker_service import get_reranker_service  # noqa: E402
+from app.services.rag_service import RERANK_RETRIEVAL_COUNT, FINAL_COUNT  # noqa: E402
+from app.services.vector_store import EMBEDDING_MODELS  # noqa: E402
+
+CUTOFFS = (1, 3, 5, 8)
+
+
+def load_labels(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        labels = [json.loads(line) for line in f if line.strip()]
+    for label in labels:
+        label.setdefault("relevant_ids", [])
+        label.setdefault("relevant_ranges", [])
+    return labels
+
+
+def matched_items(ctx: Dict, label: Dict) -> Set[Tuple[str, object]]:
+    """Label items (listed ids and range indexes) a retrieved context satisfies."""
+    items: Set[Tuple[str, object]] = set()
+    if ctx["id"] in label["relevant_ids"]:
+        items.add(("id", ctx["id"]))
+    metadata = ctx["metadata"]
+    for i, r in enumerate(label["relevant_ranges"]):
+        if (
+            r["video_id"] == metadata["video_id"]
+            and metadata["start_time"] < r["end"]
+            and metadata["end_time"] > r["start"]
+        ):
+            items.add(("range", i))
+    return items
+
+
+def score_ranking(matches: List[Set], n_relevant: int) -> Dict[str, float]:
+    """
+    Recall@k, MRR and nDCG@k of one ranked list.
+
+    `matches` holds the label items each result satisfies. Every item is
+    credited once: a result only gains when it finds an item no earlier
+    result found, so several units overlapping one range count as one hit.
+    """
+    scores = {}
+    n_relevant = max(n_relevant, 1)
+
+    found: Set = set()
+    found_at: List[int] = []  # items found within the first i + 1 results
+    gains: List[int] = []
+    for items in matches:
+        new = items - found
+        found |= new
+        found_at.append(len(found))
+        gains.append(1 if new else 0)
+
+    for k in CUTOFFS:
+        top = min(k, len(matches))
+        scores[f"recall@{k}"] = (found_at[top - 1] if top else 0) / n_relevant
+
+        dcg = sum(1 / math.log2(i + 2) for i, gain in enumerate(gains[:k]) if gain)
+        ideal = sum(1 / math.log2(i + 2) for i in range(min(n_relevant, k)))
+        scores[f"ndcg@{k}"] = dcg / ideal
+
+    first_hit = next((i for i, items in enumerate(matches) if items), None)
+    scores["mrr"] = 1 / (first_hit + 1) if first_hit is not None else 0.0
+    return scores
+
+
+def configurations(args) -> List[Tuple[str, Optional[str], str, bool]]:
+    """(retriever_type, embedding_model, fusion_method, use_reranker) tuples."""
+    models = args.models or list(EMBEDDING_MODELS.keys())
+    configs = []
+    for retriever_type, use_reranker in product(args.retrievers, args.reranker):
+        if retriever_type == "bm25":
+            configs.append((retriever_type, None, "rrf", use_reranker))
+        elif retriever_type == "vector":
+            configs.extend(
+                (retriever_type, model, "rrf", use_reranker) for model in models
+            )
+        elif retriever_type == "hybrid":
+            configs.extend(
+                (retriever_type, model, fusion, use_reranker)
+                for model in models
+                for fusion in args.fusion
+            )
+        else:
+            configs.extend(
+                (retriever_type, None, fusion, use_reranker) for fusion in args.fusion
+            )
+    return configs
+
+
+def config_name(retriever_type, embedding_model, fusion_method, use_reranker) -> str:
+    parts = [retriever_type]
+    if embedding_model:
+        parts.append(embedding_model)
+    if retriever_type in ("hybrid", "ensemble"):
+        parts.append(fusion_method)
+    if use_reranker:
+        parts.append("rerank")
+    return "/".join(parts)
+
+
+async def evaluate_config(config, labels: List[Dict]) -> Dict:
+    retriever_type, embedding_model, fusion_method, use_reranker = config
+    retriever = get_retriever(
+        retriever_type, embedding_model or "dangvantuan", fusion_method
+    )
+    retrieval_count = RERANK_RETRIEVAL_COUNT if use_reranker else FINAL_COUNT
+
+    latencies: List[float] = []
+    totals: Dict[str, float] = {}
+
+    tracemalloc.start()
+    for label in labels:
+        start_time = time.perf_counter()
+        contexts = await retriever.query_similar_contexts(
+            label["workspace_id"], label["question"], retrieval_count
+        )
+        if use_reranker and contexts:
+            contexts = get_reranker_service().rerank(
+                label["question"], contexts, FINAL_COUNT
+            )
+        latencies.append(time.perf_counter() - start_time)
+
+        matches = [matched_items(ctx, label) for ctx in contexts]
+        n_relevant = len(label["relevant_ids"]) + len(label["relevant_ranges"])
+        for metric, value in score_ranking(matches, n_relevant).items():
+            totals[metric] = totals.get(metric, 0.0) + value
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "config": config_name(*config),
+        "retriever_type": retriever_type,
+        "embedding_model": embedding_model,
+        "fusion_method": fusion_method,
+        "use_reranker": use_reranker,
+        "metrics": {metric: value / len(labels) for metric, value in totals.items()},
+        "latency": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "mean": sum(latencies) / len(latencies),
+        },
+        "memory": {
+            "python_peak_mb": python_peak / 2**20,
+            # ru_maxrss is KiB on Linux; it never goes down, so it shows
+            # the largest footprint reached up to and including this config
+            "process_max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            / 1024,
+        },
+    }
+
+
+async def main(args) -> Dict:
+    labels = load_labels(args.labels)
+    if not labels:
+        raise SystemExit("No labeled questions found")
+
+    await connect_to_mongo()
+    try:
+        results = []
+        for config in configurations(args):
+            if args.warmup:
+                # Model loading and collection opening are not part of the numbers
+                await evaluate_config(config, labels[:1])
+            result = await evaluate_config(config, labels)
+            results.append(result)
+            metrics = result["metrics"]
+            print(
+                f"{result['config']:<32} "
+                f"R@5 {metrics['recall@5']:.3f}  MRR {metrics['mrr']:.3f}  "
+                f"nDCG@8 {metrics['ndcg@8']:.3f}  "
+                f"p50 {result['latency']['p50'] * 1000:7.1f} ms  "
+                f"p95 {result['latency']['p95'] * 1000:7.1f} ms"
+            )
+    finally:
+        await close_mongo_connection()
+
+    return {"questions": len(labels), "cutoffs": list(CUTOFFS), "results": results}
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("labels", help="Labeled questions (JSONL)")
+    parser.add_argument(
+        "--retrievers",
+        type=lambda s: s.split(","),
+        default=["vector", "bm25", "hybrid", "ensemble"],
+    )
+    parser.add_argument(
+        "--models",
+        type=lambda s: s.split(","),
+        help="Embedding models (default: all configured)",
+    )
+    parser.add_argument(
+        "--fusion",
+        type=lambda s: s.split(","),
+        default=["rrf"],
+        help=f"Fusion methods for hybrid/ensemble: {', '.join(FUSION_METHODS)}",
+    )
+    parser.add_argument(
+        "--reranker",
+        type=lambda s: [{"off": False, "on": True}[x] for x in s.split(",")],
+        default=[False, True],
+        help="Comma-separated: off, on",
+    )
+    parser.add_argument(
+        "--no-warmup", dest="warmup", action="store_false", help="Skip warm-up query"
+    )
+    parser.add_argument("--output", help="Write the JSON report here")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"Report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,71 @@
+"""
+Local stand-ins for the external services the app talks to
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+from typing import Optional
+
+# Phrases the fake generator recognises in the app's prompts
+_QUESTION_LINE = re.compile(r"Câu hỏi hiện tại: (.+)")
+_SUMMARY_MARKER = "Tóm tắt mới:"
+_ANSWER_MARKER = "Ngữ cảnh từ video:"
+_REFINE_INPUT = "Nội dung cần diễn giải:"
+
+
+class FakeGenerator:
+    """
+    Deterministic stand-in for Gemini with configurable latency.
+
+    Latency is `latency` seconds plus uniform jitter in [0, jitter], drawn
+    from a seeded RNG so runs are repeatable. Responses depend only on the
+    prompt: refinement returns the question, answers cite the first context.
+    """
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def respond(self, prompt: str) -> str:
+        if _ANSWER_MARKER in prompt:
+            digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+            return f"Câu trả lời mô phỏng {digest} [1]."
+        if _SUMMARY_MARKER in prompt:
+            return prompt.split("Lượt mới:", 1)[-1].split("Yêu cầu:", 1)[0].strip()
+        if _REFINE_INPUT in prompt:
+            # Ingestion refinement: keep the unit text so retrieval stays meaningful
+            return prompt.split(_REFINE_INPUT, 1)[1].split("Nội dung đã diễn giải:")[0]
+        match = _QUESTION_LINE.search(prompt)
+        return match.group(1).strip() if match else prompt[-200:]
+
+    async def generate_content(self, prompt: str) -> Optional[str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        return self.respond(prompt).strip()
+
+
+def install_fake_generator(latency: float, jitter: float, seed: int = 0):
+    """Route every Gemini call (answers, refinement, summaries) to a fake."""
+    from app.services.gemini_service import GeminiService
+
+    fake = FakeGenerator(latency, jitter, seed)
+
+    async def generate_content(self, prompt: str) -> Optional[str]:
+        return await fake.generate_content(prompt)
+
+    GeminiService.generate_content = generate_content
+    return fake
+
+
+async def install_mongo_stand_in():
+    """Point the app's database at an in-process mongomock client."""
+    from mongomock_motor import AsyncMongoMockClient
+    from app.database import db, ensure_indexes
+
+    db.client = AsyncMongoMockClient()
+    await ensure_indexes()
+    return db.client
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings are read at import time, so these are set before importing app
+os.environ.setdefault("MONGODB_URL", "mongodb://stand-in")
+os.environ.setdefault("MONGODB_DATABASE", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("GEMINI_API_KEYS", "stand-in")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("bson")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from app.services import access_service  # noqa: E402
+
+
+def test_tombstone_on_another_worker_drops_cached_access(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+
+    async def get_database():
+        return db
+
+    monkeypatch.setattr(access_service, "get_database", get_database)
+
+    async def scenario():
+        result = await db.workspaces.insert_one({"user_id": "u1", "deleted_at": None})
+        workspace_id = str(result.inserted_id)
+        await access_service.verify_workspace_access(workspace_id, "u1")
+
+        # Another worker tombstones it: only Mongo changes, not our cache
+        await db.workspaces.update_one(
+            {"_id": result.inserted_id}, {"$set": {"deleted_at": "now"}}
+        )
+        await access_service.bump_visibility_epoch()
+
+        with pytest.raises(access_service.HTTPException) as raised:
+            await access_service.verify_workspace_access(workspace_id, "u1")
+        return raised.value.status_code
+
+    assert asyncio.run(scenario()) == 404
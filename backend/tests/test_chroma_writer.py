@@ -0,0 +1,42 @@
+from app.services import chroma_writer
+from app.services.chroma_writer import ChromaWriter
+
+
+def test_payloads_are_prepared_before_the_process_lock(tmp_path, monkeypatch):
+    events = []
+    in_lock = []
+
+    class RecordingLock:
+        def __enter__(self):
+            in_lock.append(True)
+
+        def __exit__(self, *exc):
+            in_lock.pop()
+
+    monkeypatch.setattr(
+        chroma_writer.WorkspaceWriter, "_process_lock", lambda self: RecordingLock()
+    )
+
+    def prepare(workspace_id, kind, payloads):
+        events.append(("prepare", bool(in_lock), len(payloads)))
+        if any(p["ids"] == ["bad"] for p in payloads):
+            raise ValueError("cannot embed")
+        return [{**p, "embeddings": {"m": [[1.0]] * len(p["ids"])}} for p in payloads]
+
+    def apply(workspace_id, kind, payloads):
+        events.append(("apply", bool(in_lock), [p["ids"] for p in payloads]))
+        assert all("embeddings" in p for p in payloads)
+
+    writer = ChromaWriter(str(tmp_path), apply, prepare, wait=0.2)
+    futures = [
+        writer.submit("w1", "add", ids=[cid], texts=["t"], metadatas=[{}])
+        for cid in ("a", "bad", "b")
+    ]
+
+    assert futures[0].result(timeout=5) is None
+    assert futures[2].result(timeout=5) is None
+    assert isinstance(futures[1].exception(timeout=5), ValueError)
+
+    assert all(not locked for kind, locked, _ in events if kind == "prepare")
+    assert all(locked for kind, locked, _ in events if kind == "apply")
+    assert ("apply", True, [["a"], ["b"]]) in events
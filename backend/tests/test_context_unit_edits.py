@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("bson")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from app.schemas.context_unit import ContextUnitEdit, ContextUnitsUpdate  # noqa: E402
+from app.services import video_service  # noqa: E402
+
+
+class FailingVectorStore:
+    """Records vector writes; the first re-embed fails."""
+
+    def __init__(self):
+        self.upserts = []
+        self.deletes = []
+
+    def upsert_context_units(self, workspace_id, video_id, video_path, units):
+        self.upserts.append([(unit.id, unit.text) for unit in units])
+        if len(self.upserts) == 1:
+            raise RuntimeError("embedding failed")
+
+    def update_context_metadata(self, workspace_id, video_id, video_path, units):
+        pass
+
+    def delete_context_units(self, workspace_id, ids):
+        self.deletes.append(list(ids))
+
+
+class NoLayers:
+    def owner_of(self, video_id):
+        return None
+
+
+def test_failed_reembed_leaves_units_as_they_were(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    vector_store = FailingVectorStore()
+
+    async def get_database():
+        return db
+
+    async def allow(*args):
+        return None
+
+    async def get_workspace_layers(workspace_id):
+        return NoLayers()
+
+    async def shared_video_ids(video_ids):
+        return []
+
+    monkeypatch.setattr(video_service, "get_database", get_database)
+    monkeypatch.setattr(video_service, "verify_workspace_access", allow)
+    monkeypatch.setattr(video_service, "get_workspace_layers", get_workspace_layers)
+    monkeypatch.setattr(video_service, "shared_video_ids", shared_video_ids)
+    monkeypatch.setattr(video_service, "get_vector_store", lambda: vector_store)
+
+    async def scenario():
+        video = await db.videos.insert_one({"workspace_id": "w1", "file_path": "a.mp4"})
+        video_id = str(video.inserted_id)
+        unit = await db.context_units.insert_one(
+            {
+                "video_id": video_id,
+                "video_path": "a.mp4",
+                "text": "old text",
+                "start_time": 0.0,
+                "end_time": 1.0,
+            }
+        )
+        update = ContextUnitsUpdate(
+            upsert=[
+                ContextUnitEdit(id=str(unit.inserted_id), text="new text"),
+                ContextUnitEdit(text="added", start_time=1.0, end_time=2.0),
+            ]
+        )
+
+        with pytest.raises(RuntimeError):
+            await video_service.update_context_units(video_id, "w1", "u1", update)
+        return str(unit.inserted_id), await db.context_units.find().to_list(None)
+
+    unit_id, units = asyncio.run(scenario())
+
+    # Mongo was never written, and the vectors got the old text back
+    assert [(str(u["_id"]), u["text"]) for u in units] == [(unit_id, "old text")]
+    assert vector_store.upserts[-1] == [(unit_id, "old text")]
+    assert len(vector_store.deletes) == 1
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("bson")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from app.services import conversation_memory as memory_module  # noqa: E402
+
+
+class EchoGenerator:
+    """Folds a turn by appending the question to the previous summary."""
+
+    chars_per_token = 4.0
+
+    def __init__(self, on_generate=None):
+        self.on_generate = on_generate
+
+    async def generate_content(self, prompt: str) -> str:
+        if self.on_generate:
+            on_generate, self.on_generate = self.on_generate, None
+            await on_generate()
+        previous = prompt.split("Tóm tắt hiện tại:\n")[1].split("\n")[0]
+        question = prompt.split("Người dùng: ")[1].split("\n")[0]
+        return f"{previous} {question}".replace("(chưa có) ", "")
+
+
+def test_turns_from_two_workers_are_both_kept(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+
+    async def get_database():
+        return db
+
+    monkeypatch.setattr(memory_module, "get_database", get_database)
+    worker_a = memory_module.ConversationMemory()
+    worker_b = memory_module.ConversationMemory()
+
+    async def scenario():
+        await db.conversation_summaries.create_index("workspace_id", unique=True)
+        generator = EchoGenerator()
+        monkeypatch.setattr(memory_module, "get_generator", lambda _: generator)
+        await worker_a.record_turn("w1", "q1", "a1")
+        # Worker B caches the summary, then worker A moves it on
+        assert await worker_b.get_summary("w1") == "q1"
+        await worker_a.record_turn("w1", "q2", "a2")
+        assert await worker_b.get_summary("w1") == "q1 q2"
+
+        # Worker A commits q4 while worker B is still folding q3
+        generator.on_generate = lambda: worker_a.record_turn("w1", "q4", "a4")
+        await worker_b.record_turn("w1", "q3", "a3")
+        return await worker_a.get_summary("w1")
+
+    assert asyncio.run(scenario()) == "q1 q2 q4 q3"
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import zipfile
+
+import pytest
+
+pytest.importorskip("bson")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from app.models.import_job import ImportJob, ImportVideo  # noqa: E402
+from app.services import import_service  # noqa: E402
+
+
+class FakeTokenizer:
+    name = "whitespace"
+
+    def tokenize(self, text):
+        return text.lower().split()
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert_context_units(
+        self, workspace_id, video_id, video_path, context_units, embeddings=None
+    ):
+        self.upserts.append((video_id, [u.text for u in context_units], embeddings))
+
+
+def write_archive(path):
+    rows = [
+        {"video": "l1.mp4", "text": "first unit", "start_time": 0, "end_time": 5},
+        {"video": "l1.mp4", "text": "second unit", "start_time": 5, "end_time": 9},
+        {
+            "video": "l2.mp4",
+            "text": "given vectors",
+            "start_time": 0,
+            "end_time": 3,
+            "embeddings": {"halong": [0.5, 0.25]},
+        },
+    ]
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("l1.mp4", b"video-1")
+        archive.writestr("l2.mp4", b"video-2")
+        archive.writestr(
+            "context_units.jsonl", "\n".join(json.dumps(row) for row in rows)
+        )
+
+
+def test_archive_runs_through_every_stage(tmp_path, monkeypatch):
+    archive_path = str(tmp_path / "import.zip")
+    write_archive(archive_path)
+
+    vector_store = FakeVectorStore()
+
+    async def fake_refine(texts):
+        return [f"refined {text}" for text in texts]
+
+    def fake_save(workspace_id, path, member, video_id):
+        target = tmp_path / member
+        with zipfile.ZipFile(path) as archive:
+            target.write_bytes(archive.read(member))
+        return str(target), target.stat().st_size
+
+    monkeypatch.setattr(import_service, "get_tokenizer", lambda: FakeTokenizer())
+    monkeypatch.setattr(import_service, "get_vector_store", lambda: vector_store)
+    monkeypatch.setattr(import_service, "refine_texts", fake_refine)
+    monkeypatch.setattr(import_service, "save_video_from_archive", fake_save)
+    monkeypatch.setattr(
+        import_service, "extract_video_thumbnail", lambda *args: (None, 1.0)
+    )
+
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        manifest, units_by_video = import_service.inspect_archive(archive_path)
+        job = ImportJob(
+            workspace_id="ws1",
+            user_id="u1",
+            archive_path=archive_path,
+            manifest=manifest,
+            status="running",
+            videos=[ImportVideo(filename=name) for name in units_by_video],
+        ).model_dump(by_alias=True, exclude={"id"})
+        job["_id"] = (await db.imports.insert_one(job)).inserted_id
+
+        await import_service._ImportRun(db, job).run(job["videos"], units_by_video)
+
+        stored = await db.imports.find_one({"_id": job["_id"]})
+        units = await db.context_units.find().to_list(None)
+        videos = await db.videos.find().to_list(None)
+        return stored, units, videos
+
+    stored, units, videos = asyncio.run(scenario())
+
+    assert [v["stage"] for v in stored["videos"]] == ["embedded", "embedded"]
+    assert not any(v.get("error") for v in stored["videos"])
+    assert {v["processing_status"] for v in videos} == {"completed"}
+
+    # Refined unless the archive brought its own vectors
+    assert sorted(u["text"] for u in units) == [
+        "given vectors",
+        "refined first unit",
+        "refined second unit",
+    ]
+    embeddings_by_text = {
+        tuple(texts): embeddings for _, texts, embeddings in vector_store.upserts
+    }
+    assert embeddings_by_text[("given vectors",)] == {"halong": [[0.5, 0.25]]}
+    assert embeddings_by_text[("refined first unit", "refined second unit")] == {}
+
+
+def test_nested_videos_sharing_a_file_name_are_rejected(tmp_path):
+    archive_path = str(tmp_path / "import.zip")
+    rows = [
+        {"video": "a/intro.mp4", "text": "one", "start_time": 0, "end_time": 1},
+        {"video": "b/intro.mp4", "text": "two", "start_time": 0, "end_time": 1},
+    ]
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("a/intro.mp4", b"video-a")
+        archive.writestr("b/intro.mp4", b"video-b")
+        archive.writestr(
+            "context_units.jsonl", "\n".join(json.dumps(row) for row in rows)
+        )
+
+    with pytest.raises(ValueError, match="intro.mp4"):
+        import_service.inspect_archive(archive_path)
+
+
+def test_heartbeat_renews_lease_while_running(monkeypatch):
+    monkeypatch.setattr(import_service, "HEARTBEAT_SECONDS", 0.01)
+
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        result = await db.imports.insert_one(
+            {"status": "running", "heartbeat_at": None}
+        )
+        heartbeat = asyncio.create_task(
+            import_service._heartbeat(db, result.inserted_id)
+        )
+        await asyncio.sleep(0.05)
+        heartbeat.cancel()
+        return await db.imports.find_one({"_id": result.inserted_id})
+
+    job = asyncio.run(scenario())
+    assert job["heartbeat_at"] is not None
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("bson")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from app.services import temporal_index as temporal_module  # noqa: E402
+
+
+def test_merged_window_carries_its_stored_units(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+
+    async def get_database():
+        return db
+
+    monkeypatch.setattr(temporal_module, "get_database", get_database)
+
+    async def scenario():
+        result = await db.context_units.insert_many(
+            [
+                {
+                    "video_id": "v1",
+                    "video_path": "v1.mp4",
+                    "text": f"unit {i}",
+                    "start_time": i * 10.0,
+                    "end_time": i * 10.0 + 10,
+                }
+                for i in range(3)
+            ]
+        )
+        ids = [str(oid) for oid in result.inserted_ids]
+        hit = {
+            "id": ids[1],
+            "text": "unit 1",
+            "distance": 0.1,
+            "metadata": {
+                "video_id": "v1",
+                "video_path": "v1.mp4",
+                "start_time": 10.0,
+                "end_time": 20.0,
+            },
+        }
+        index = temporal_module.TemporalIndex()
+        return ids, await index.expand([hit], neighbors=1)
+
+    ids, expanded = asyncio.run(scenario())
+
+    assert len(expanded) == 1
+    window = expanded[0]
+    assert window["text"] == "unit 0\nunit 1\nunit 2"
+    assert [unit["id"] for unit in window["units"]] == ids
+    assert [unit["text"] for unit in window["units"]] == ["unit 0", "unit 1", "unit 2"]
+    assert window["units"][2]["end_time"] == 30.0
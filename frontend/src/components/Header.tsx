@@ -82,12 +82,16 @@ export function Header() {
 											value: 'hybrid',
 											label: 'Hybrid',
 										},
+										{
+											value: 'ensemble',
+											label: 'Ensemble',
+										},
 									]}
 								/>
 							</Form.Item>
 						</div>
 
-						{retrieverType !== 'bm25' && (
+						{retrieverType !== 'bm25' && retrieverType !== 'ensemble' && (
 							<Form.Item label='Embedding Model'>
 								<Select
 									value={embeddingModel}